@@ -0,0 +1,176 @@
+"""ACT text search pieces shared by the app and the offline index builders.
+
+api/index.py serves /api/act/search and /act-protocols/pdf-highlights from
+these; scripts/act_text_index.py and scripts/act_word_index.py write the
+static indexes with the same tokenizer and ActTextIndex. Nothing here imports
+Flask or touches app state, so the build scripts can use it without loading
+the app. The leading underscore keeps Vercel from deploying this file as a
+function of its own.
+"""
+import bisect
+import math
+import re
+from pathlib import Path
+
+BASE_DIR = Path(__file__).parent.parent
+
+SEARCH_TOKEN_RE = re.compile(r'[a-z0-9]+')
+SEARCH_STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it its of on or that the this to was were which with'.split()
+)
+SEARCH_BM25_K1 = 1.2
+SEARCH_BM25_B = 0.75
+SEARCH_MAX_EXPANSIONS = 20
+
+ACT_SEARCH_PATH = BASE_DIR / 'static/data/act-protocol-search.json'
+ACT_TEXT_INDEX_DIR = BASE_DIR / 'static/data/act-text-index'
+ACT_WORD_INDEX_DIR = BASE_DIR / 'static/data/act-protocol-words'
+ACT_PHRASE_WEIGHT = 2.0
+ACT_TITLE_BONUS = 5.0
+
+
+def search_tokens(text):
+    """Lower-cased [a-z0-9]+ tokens, as produced from normalize_text() output in
+    scripts/build-act-*-index.py (its punctuation and whitespace folding never
+    survives tokenization, so it is skipped here), minus stopwords."""
+    return [token for token in SEARCH_TOKEN_RE.findall((text or '').lower()) if token not in SEARCH_STOPWORDS]
+
+
+class ActTextIndex:
+    """Positional inverted index over the pages of every ACT protocol PDF."""
+
+    def __init__(self, protocols, pages, postings):
+        self.protocols = protocols  # [{'id', 'title', 'category', 'file', 'tags'}]
+        self.titles = [set(search_tokens(' '.join([p['id'] or '', p['title'] or '', *(p['tags'] or ())])))
+                       for p in protocols]
+        self.pages = pages  # [(protocol index, page number, token count)]
+        self.postings = postings  # term -> [(page id, (positions...))]
+        self.vocabulary = sorted(postings)
+        self.average_length = (sum(length for _, _, length in pages) / len(pages)) if pages else 1.0
+
+    @classmethod
+    def build(cls, records):
+        protocols, pages, postings = [], [], {}
+        for record in records:
+            protocol_index = len(protocols)
+            protocols.append({key: record.get(key) for key in ('id', 'title', 'category', 'file', 'tags')})
+            for page in record.get('pages', ()):
+                page_id = len(pages)
+                positions = {}
+                tokens = SEARCH_TOKEN_RE.findall(page.get('text', '').lower())
+                for position, token in enumerate(tokens):
+                    positions.setdefault(token, []).append(position)
+                for token, found in positions.items():
+                    postings.setdefault(token, []).append((page_id, tuple(found)))
+                pages.append((protocol_index, page['page'], len(tokens)))
+        return cls(protocols, pages, postings)
+
+    def idf(self, df):
+        return math.log(1 + (len(self.pages) - df + 0.5) / (df + 0.5))
+
+    def bm25(self, tf, page_id):
+        norm = SEARCH_BM25_K1 * (1 - SEARCH_BM25_B + SEARCH_BM25_B * self.pages[page_id][2] / self.average_length)
+        return tf * (SEARCH_BM25_K1 + 1) / (tf + norm)
+
+    def prefix_terms(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        matches = []
+        for term in self.vocabulary[start:start + SEARCH_MAX_EXPANSIONS]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def phrase_positions(self, tokens):
+        """{page id: [start positions]} of every occurrence of tokens as a consecutive phrase."""
+        if not tokens or any(token not in self.postings for token in tokens):
+            return {}
+        rarest = min(range(len(tokens)), key=lambda i: len(self.postings[tokens[i]]))
+        candidates = {page_id: {p - rarest for p in positions} for page_id, positions in self.postings[tokens[rarest]]}
+        for offset, token in enumerate(tokens):
+            if offset == rarest or not candidates:
+                continue
+            shifted = {}
+            for page_id, positions in self.postings[token]:
+                starts = candidates.get(page_id)
+                if starts:
+                    kept = starts.intersection(p - offset for p in positions)
+                    if kept:
+                        shifted[page_id] = kept
+            candidates = shifted
+        return {page_id: sorted(starts) for page_id, starts in candidates.items()}
+
+    def search(self, query, phrases=(), accept=None):
+        """Score pages for query; phrases are extra token lists (e.g. alias names) that count as exact matches.
+
+        Returns {page id: (score, first matched position)}.
+        """
+        tokens = search_tokens(query)
+        scores, anchors = {}, {}
+        for i, token in enumerate(tokens):
+            terms = [token] if token in self.postings else []
+            if not terms and i == len(tokens) - 1 and len(token) >= 2:
+                terms = self.prefix_terms(token)
+            best = {}
+            for term in terms:
+                idf = self.idf(len(self.postings[term]))
+                for page_id, positions in self.postings[term]:
+                    score = idf * self.bm25(len(positions), page_id)
+                    if score > best.get(page_id, (0.0,))[0]:
+                        best[page_id] = (score, positions[0])
+            for page_id, (score, position) in best.items():
+                scores[page_id] = scores.get(page_id, 0.0) + score
+                anchors[page_id] = min(anchors.get(page_id, position), position)
+        exact = [tokens] if len(tokens) > 1 else []
+        bonus = {}
+        for phrase in [*exact, *phrases]:
+            found = self.phrase_positions(phrase)
+            idf = self.idf(len(found))
+            for page_id, starts in found.items():
+                score = ACT_PHRASE_WEIGHT * idf * self.bm25(len(starts), page_id)
+                if score > bonus.get(page_id, (0.0,))[0]:
+                    bonus[page_id] = (score, starts[0])
+        for page_id, (score, position) in bonus.items():
+            scores[page_id] = scores.get(page_id, 0.0) + score
+            anchors[page_id] = position
+        if accept is not None:
+            scores = {page_id: score for page_id, score in scores.items() if accept(self.protocols[self.pages[page_id][0]])}
+        return {page_id: (score, anchors[page_id]) for page_id, score in scores.items()}
+
+    def rank_protocols(self, query, page_scores):
+        """[(protocol index, score, [(page score, page id, position)])], best first.
+
+        A protocol scores its best page plus a bonus for the share of query
+        terms in its id, title or tags.
+        """
+        tokens = set(search_tokens(query))
+        by_protocol = {}
+        for page_id, (score, position) in page_scores.items():
+            by_protocol.setdefault(self.pages[page_id][0], []).append((score, page_id, position))
+        ranked = []
+        for protocol_index, pages in by_protocol.items():
+            pages.sort(key=lambda page: (-page[0], page[1]))
+            title_share = len(tokens & self.titles[protocol_index]) / len(tokens) if tokens else 0.0
+            ranked.append((protocol_index, pages[0][0] + ACT_TITLE_BONUS * title_share, pages))
+        ranked.sort(key=lambda item: (-item[1], item[0]))
+        return ranked
+
+
+def act_word_boxes(page, textpage=None):
+    """{'width', 'height', 'words'} for a PyMuPDF page; words without searchable text are dropped."""
+    import fitz
+    words, lines = [], {}
+    matrix = page.rotation_matrix
+    for x0, y0, x1, y1, text, block, line, _ in page.get_text('words', textpage=textpage):
+        if not SEARCH_TOKEN_RE.search(text.lower()):
+            continue
+        rect = fitz.Rect(x0, y0, x1, y1) * matrix
+        line_id = lines.setdefault((block, line), len(lines))
+        words.append([round(rect.x0, 1), round(rect.y0, 1), round(rect.x1, 1), round(rect.y1, 1), line_id, text])
+    return {'width': round(page.rect.width, 2), 'height': round(page.rect.height, 2), 'words': words}
+
+
+def act_word_index_path(web_path, out_dir=None):
+    """Word-box file of a PDF under out_dir (default ACT_WORD_INDEX_DIR), mirroring static/protocols/act/."""
+    relative = Path(web_path.lstrip('/')).relative_to('static/protocols/act')
+    return (out_dir or ACT_WORD_INDEX_DIR) / relative.parent / f'{relative.stem}.json'
@@ -1,14 +1,49 @@
 # api/index.py
 
+import bisect
+import contextlib
+import functools
+import gzip
+import hashlib
+import heapq
+import math
 import os
 import json
+import mmap
+import random
 import re
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_from_directory, send_file
+import struct
+import tarfile
+import tempfile
+import threading
+import time
+from flask import Flask, Response, g, render_template, request, jsonify, redirect, url_for, send_from_directory, send_file, stream_with_context
 from pathlib import Path
-from urllib.parse import unquote
-from collections import OrderedDict
+from urllib.parse import quote, unquote
+from collections import Counter, OrderedDict, namedtuple
 from io import BytesIO
 
+from api._act_text import (  # noqa: F401 - ACT_TEXT_INDEX_DIR and act_word_boxes are re-exported
+    ACT_SEARCH_PATH,
+    ACT_TEXT_INDEX_DIR,
+    ACT_WORD_INDEX_DIR,
+    SEARCH_BM25_B,
+    SEARCH_BM25_K1,
+    SEARCH_MAX_EXPANSIONS,
+    SEARCH_TOKEN_RE,
+    ActTextIndex,
+    act_word_boxes,
+    act_word_index_path,
+    search_tokens,
+)
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is used when brotli is not installed
+    brotli = None
+
+PROCESS_STARTED_AT = time.perf_counter()
+
 app = Flask(__name__, template_folder='../templates', static_folder='../static')
 
 # Get the base directory
@@ -16,17 +51,6 @@ BASE_DIR = Path(__file__).parent.parent
 MODULES_DIR = BASE_DIR / 'modules'
 
 
-def resolve_act_protocol_pdf(web_path):
-    decoded = unquote(web_path or '')
-    if not decoded.startswith('/static/protocols/act/') or not decoded.lower().endswith('.pdf'):
-        return None
-    candidate = (BASE_DIR / decoded.lstrip('/')).resolve()
-    allowed_root = (BASE_DIR / 'static/protocols/act').resolve()
-    if allowed_root not in candidate.parents or not candidate.exists():
-        return None
-    return candidate
-
-
 # Category metadata
 CATEGORY_METADATA = {
     'Adult_Health': {
@@ -194,39 +218,458 @@ ADULT_HEALTH_MODULES = {
     }
 }
 
-# ==================== QUESTION COUNT HELPERS ====================
+# ==================== COMPILED QUESTION BANKS ====================
+#
+# scripts/build-question-banks.py compiles each modules/<Category>/<module>.json
+# into modules/.compiled/<Category>/<module>.qbank:
+#
+#   magic | u32 header length | header JSON | record table | question array
+#
+# The header holds the bank's top-level metadata, the question ids, interned
+# category/book/type strings and the source file's size and SHA-256. The
+# question array is the bank's questions as one compact JSON array; each
+# record row stores the byte span of one question inside it plus its
+# category/book/type string refs. Bulk loads parse the array in a single
+# json.loads call (CPython's C decoder beats assembling questions field by
+# field in Python), while a single question can be decoded from its span
+# and category lookups never touch question text. An artifact whose source
+# hash no longer matches is ignored and the loader falls back to the JSON.
+# QuestionBankStore.load() reads fresh artifacts in place of the source JSON.
+
+COMPILED_DIR = MODULES_DIR / '.compiled'
+COMPILED_MAGIC = b'QBANK1\n'
+COMPILED_RECORD = struct.Struct('<IIiii')
+COMPILED_INTERNED_FIELDS = ('category', 'book', 'type')
+
+
+# scripts/find-duplicate-questions.py records the content address of every
+# question stored verbatim in more than one bank (e.g. CFRN_Question_Bank.json
+# repeats the five CFRN domain files). QuestionBankStore uses it to keep one
+# shared copy of each such question in memory.
+CONTENT_KEYS_PATH = COMPILED_DIR / 'question-content-keys.json'
+
+
+def question_content_key(question):
+    """Content address of a question: a hash of its canonical JSON encoding."""
+    encoded = json.dumps(question, sort_keys=True, separators=(',', ':'), ensure_ascii=True)
+    return hashlib.sha256(encoded.encode('ascii')).hexdigest()[:24]
+
+
+def compiled_bank_path(source_path):
+    try:
+        relative = Path(source_path).resolve().relative_to(MODULES_DIR.resolve())
+    except ValueError:
+        return None
+    return COMPILED_DIR / relative.with_suffix('.qbank')
+
+
+def encode_compiled_bank(source_bytes):
+    """Compile the raw bytes of a module JSON file into the .qbank format."""
+    data = json.loads(source_bytes.decode('utf-8'))
+    questions = data if isinstance(data, list) else data.get('questions', [])
+    strings, string_refs = [], {}
+
+    def intern(value):
+        if not isinstance(value, str):
+            return -1
+        if value not in string_refs:
+            string_refs[value] = len(strings)
+            strings.append(value)
+        return string_refs[value]
+
+    array = bytearray(b'[')
+    records = []
+    for position, q in enumerate(questions):
+        if position:
+            array.extend(b',')
+        encoded = json.dumps(q, separators=(',', ':')).encode('ascii')
+        records.append(COMPILED_RECORD.pack(
+            len(array), len(encoded), *(intern(q.get(key)) for key in COMPILED_INTERNED_FIELDS),
+        ))
+        array.extend(encoded)
+    array.extend(b']')
+
+    header = {
+        'version': 1,
+        'source_size': len(source_bytes),
+        'source_sha256': hashlib.sha256(source_bytes).hexdigest(),
+        'container': 'list' if isinstance(data, list) else 'dict',
+        'meta': None if isinstance(data, list) else {k: v for k, v in data.items() if k != 'questions'},
+        'meta_keys': None if isinstance(data, list) else list(data.keys()),
+        'ids': [q.get('id') for q in questions],
+        'strings': strings,
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('ascii')
+    return b''.join([COMPILED_MAGIC, struct.pack('<I', len(header_bytes)), header_bytes, *records, bytes(array)])
+
+
+class CompiledQuestionBank:
+    """Read-only view over a .qbank buffer (bytes or mmap); questions are decoded on access."""
+
+    def __init__(self, buffer):
+        if bytes(buffer[:len(COMPILED_MAGIC)]) != COMPILED_MAGIC:
+            raise ValueError('Not a compiled question bank')
+        start = len(COMPILED_MAGIC)
+        (header_len,) = struct.unpack_from('<I', buffer, start)
+        start += 4
+        self.header = json.loads(bytes(buffer[start:start + header_len]))
+        self.ids = self.header['ids']
+        self.strings = self.header['strings']
+        self._buffer = buffer
+        self._records_start = start + header_len
+        self._array_start = self._records_start + COMPILED_RECORD.size * len(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _record(self, position):
+        return COMPILED_RECORD.unpack_from(self._buffer, self._records_start + COMPILED_RECORD.size * position)
+
+    def _column(self, field):
+        column = COMPILED_INTERNED_FIELDS.index(field) + 2
+        strings = self.strings
+        return [strings[row[column]] if row[column] >= 0 else None
+                for row in COMPILED_RECORD.iter_unpack(self._buffer[self._records_start:self._array_start])]
+
+    def categories(self):
+        return self._column('category')
+
+    def books(self):
+        return self._column('book')
+
+    def question(self, position):
+        offset, length = self._record(position)[:2]
+        start = self._array_start + offset
+        return json.loads(bytes(self._buffer[start:start + length]))
+
+    def questions(self):
+        return json.loads(bytes(self._buffer[self._array_start:]))
+
+    def is_fresh(self, source_path):
+        """True if the artifact was compiled from source_path as it is now.
+
+        A size mismatch is decided from os.stat alone; otherwise the source
+        hash comes from file_digest, which re-hashes only when the file's
+        mtime/size differ from the last time it was hashed.
+        """
+        return (self.header['source_size'] == os.stat(source_path).st_size
+                and self.header['source_sha256'] == file_digest(source_path))
+
+    def to_data(self):
+        questions = self.questions()
+        if self.header['container'] == 'list':
+            return questions
+        meta = self.header['meta']
+        return {key: questions if key == 'questions' else meta[key] for key in self.header['meta_keys']}
 
-_QNUM_RE = re.compile(r'^Q\d+$')
 
+def map_file(path):
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
 
-def get_valid_question_count(json_path):
-    if not json_path.exists():
-        return 0
+
+def load_compiled_question_bank(source_path):
+    """Return the fresh CompiledQuestionBank for source_path, or None to fall back to JSON.
+
+    The artifact is memory-mapped rather than read, so only the pages holding
+    the header, record table and the questions actually decoded become
+    resident, and the kernel can drop them again under memory pressure.
+    """
+    artifact = compiled_bank_path(source_path)
+    if artifact is None or not artifact.exists():
+        return None
     try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        questions = data if isinstance(data, list) else data.get('questions', [])
-        valid = [q for q in questions if _QNUM_RE.match(str(q.get('id', '')))]
-        return len(valid) if valid else len(questions)
+        compiled = CompiledQuestionBank(map_file(artifact))
+        if not compiled.is_fresh(source_path):
+            print(f"[compiled] Stale artifact ignored: {artifact}")
+            return None
+        return compiled
     except Exception as e:
-        print(f"[get_valid_question_count] Error reading {json_path}: {e}")
-        return 0
+        print(f"[compiled] Error reading {artifact}: {e}")
+        return None
 
 
-def get_cfrn_valid_count():
-    total = 0
+# ==================== QUESTION BANK STORE ====================
+
+class QuestionBankStore:
+    """Process-wide cache of parsed module and generated data JSON files.
+
+    Each file is parsed once per process and revalidated by mtime/size, so
+    warm requests share the same in-memory object instead of re-running the
+    JSON decoder. Values derived from a file (indexes, compiled artifacts)
+    are cached alongside it and dropped when it changes. Callers must treat
+    returned data as read-only.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._shared = {}
+        self._content_keys = None
+        self.hits = 0
+        self.misses = 0
+        self.shared_copies = 0
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def _entry(self, path):
+        key = str(path)
+        signature = self._signature(path)
+        entry = self._entries.get(key)
+        if entry is None or entry['signature'] != signature:
+            # The old entry is dropped, not closed: indexes handed to in-flight
+            # requests keep its mapping alive until they are done with it.
+            entry = {'signature': signature, 'derived': {}}
+            self._entries[key] = entry
+        return entry
+
+    def load(self, path):
+        with self._lock:
+            entry = self._entry(path)
+            if 'data' in entry:
+                self.hits += 1
+                return entry['data']
+            self.misses += 1
+            if 'compiled' not in entry:
+                entry['compiled'] = load_compiled_question_bank(path)
+            if entry['compiled'] is not None:
+                data = entry['compiled'].to_data()
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            entry['data'] = self._share_duplicates(path, data)
+            return entry['data']
+
+    def _bank_content_keys(self, path):
+        """{position: content key} for path's cross-bank duplicates, if recorded for this version."""
+        try:
+            bank = Path(path).resolve().relative_to(MODULES_DIR.resolve()).with_suffix('').as_posix()
+        except ValueError:
+            return None
+        if not CONTENT_KEYS_PATH.exists():
+            return None
+        signature = self._signature(CONTENT_KEYS_PATH)
+        if self._content_keys is None or self._content_keys[0] != signature:
+            with open(CONTENT_KEYS_PATH, 'r', encoding='utf-8') as f:
+                self._content_keys = (signature, json.load(f).get('banks', {}))
+        recorded = self._content_keys[1].get(bank)
+        if not recorded or recorded.get('source_sha256') != file_digest(path):
+            return None
+        return recorded['keys']
+
+    def _share_duplicates(self, path, data):
+        """Replace questions duplicated in other banks with one shared instance each."""
+        try:
+            keys = self._bank_content_keys(path)
+        except Exception as e:
+            print(f"[QuestionBankStore] Ignoring content keys for {path}: {e}")
+            return data
+        if not keys:
+            return data
+        questions = questions_of(data)
+        for position, key in keys.items():
+            position = int(position)
+            if position >= len(questions):
+                continue
+            shared = self._shared.setdefault(key, questions[position])
+            if shared is not questions[position]:
+                questions[position] = shared
+                self.shared_copies += 1
+        return data
+
+    def compiled(self, path):
+        """Return the fresh CompiledQuestionBank for path, or None."""
+        with self._lock:
+            entry = self._entry(path)
+            if 'compiled' not in entry:
+                entry['compiled'] = load_compiled_question_bank(path)
+            return entry['compiled']
+
+    def derived(self, path, name, builder, version=None):
+        """Return builder(path), computed once per version of path.
+
+        version names another input the value depends on; the value is
+        rebuilt in place when it changes, so only the latest one is kept.
+        """
+        with self._lock:
+            entry = self._entry(path)
+            cached = entry['derived'].get(name)
+            if cached is None or cached[0] != version:
+                cached = entry['derived'][name] = (version, builder(path))
+            return cached[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._shared.clear()
+            self.hits = 0
+            self.misses = 0
+            self.shared_copies = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'compiled': sum(1 for entry in self._entries.values() if entry.get('compiled')),
+                'shared_questions': len(self._shared),
+                'shared_copies': self.shared_copies,
+            }
+
+
+QUESTION_BANKS = QuestionBankStore()
+
+
+def load_module_json(path):
+    return QUESTION_BANKS.load(path)
+
+
+def questions_of(data):
+    return data if isinstance(data, list) else data.get('questions', [])
+
+
+# ==================== QUESTION BANK INDEX ====================
+
+_QNUM_RE = re.compile(r'^Q\d+$')
+
+NCLEX_MASTER_PATH = MODULES_DIR / 'NCLEX' / 'NCLEX_Comprehensive_Master_Categorized.json'
+CCRN_COMPREHENSIVE_PATH = MODULES_DIR / 'Nursing_Certifications' / 'CCRN_Comprehensive.json'
+CFRN_LEGACY_PATH = MODULES_DIR / 'Nursing_Certifications' / 'CFRN_Question_Bank.json'
+ADULT_HEALTH_PATH = MODULES_DIR / 'Adult_Health' / 'Adult_Health.json'
+QUESTION_INDEX_DECODED_LIMIT = 512
+
+
+class QuestionBankIndex:
+    """Category positions and counts for one bank, built in a single pass.
+
+    Only the category and id columns are needed to build it, so banks with a
+    compiled artifact are indexed without parsing question text. Lookups by
+    category or id decode just the selected records from the memory-mapped
+    artifact, keeping the most recent QUESTION_INDEX_DECODED_LIMIT; the full
+    question list is loaded the first time `questions` is read.
+    """
+
+    def __init__(self, categories, ids, load_questions, load_question=None):
+        self._load_questions = load_questions
+        self._load_question = load_question
+        self._questions = None
+        self._decoded = OrderedDict()
+        self._decoded_lock = threading.Lock()
+        self.size = len(ids)
+        self.by_category = {}
+        self.by_id = {}
+        valid = 0
+        for position, (category, question_id) in enumerate(zip(categories, ids)):
+            self.by_category.setdefault(category, []).append(position)
+            self.by_id.setdefault(question_id, position)
+            if _QNUM_RE.match(question_id):
+                valid += 1
+        self.category_counts = {cat: len(positions) for cat, positions in self.by_category.items()}
+        self.valid_count = valid if valid else self.size
+
+    @classmethod
+    def build(cls, path):
+        compiled = QUESTION_BANKS.compiled(path)
+        if compiled is not None:
+            ids = ['' if i is None else str(i) for i in compiled.ids]
+            return cls(compiled.categories(), ids,
+                       lambda: questions_of(QUESTION_BANKS.load(path)),
+                       compiled.question)
+        questions = questions_of(QUESTION_BANKS.load(path))
+        return cls([q.get('category') for q in questions],
+                   [str(q.get('id', '')) for q in questions],
+                   lambda: questions)
+
+    @property
+    def questions(self):
+        if self._questions is None:
+            self._questions = self._load_questions()
+        return self._questions
+
+    def question(self, position):
+        if self._questions is not None or self._load_question is None:
+            return self.questions[position]
+        with self._decoded_lock:
+            question = self._decoded.get(position)
+            if question is not None:
+                self._decoded.move_to_end(position)
+                return question
+        question = self._load_question(position)
+        with self._decoded_lock:
+            self._decoded[position] = question
+            while len(self._decoded) > QUESTION_INDEX_DECODED_LIMIT:
+                self._decoded.popitem(last=False)
+        return question
+
+    def count(self, category):
+        return self.category_counts.get(category, 0)
+
+    def questions_in(self, category):
+        return [self.question(i) for i in self.by_category.get(category, ())]
+
+    def questions_by_id(self, ids):
+        return [self.question(self.by_id[str(i)]) for i in ids if str(i) in self.by_id]
+
+
+def get_bank_index(path):
+    """Return the cached QuestionBankIndex for path, or None if it cannot be read."""
+    if not path.exists():
+        return None
+    try:
+        return QUESTION_BANKS.derived(path, 'index', QuestionBankIndex.build)
+    except Exception as e:
+        print(f"[get_bank_index] Error reading {path}: {e}")
+        return None
+
+
+def get_cfrn_domain_indexes():
+    indexes = OrderedDict()
     for domain, filename in CFRN_DOMAIN_FILES.items():
-        path = MODULES_DIR / 'Nursing_Certifications' / filename
-        total += get_valid_question_count(path)
+        indexes[domain] = get_bank_index(MODULES_DIR / 'Nursing_Certifications' / filename)
+    return indexes
+
+
+# ==================== FILE DIGESTS ====================
+
+_FILE_DIGESTS = {}
+_FILE_DIGESTS_LOCK = threading.Lock()
+
+
+def file_digest(path):
+    """SHA-256 of a file's bytes, recomputed only when its mtime/size changes."""
+    stat = os.stat(path)
+    key = str(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    with _FILE_DIGESTS_LOCK:
+        cached = _FILE_DIGESTS.get(key)
+        if cached and cached[0] == signature:
+            return cached[1]
+    digest = hashlib.sha256(Path(path).read_bytes()).hexdigest()
+    with _FILE_DIGESTS_LOCK:
+        _FILE_DIGESTS[key] = (signature, digest)
+    return digest
+
+
+# ==================== QUESTION COUNT HELPERS ====================
+
+def get_valid_question_count(json_path):
+    index = get_bank_index(json_path)
+    return index.valid_count if index else 0
+
+
+def get_cfrn_valid_count():
+    total = sum(index.valid_count for index in get_cfrn_domain_indexes().values() if index)
     if total == 0:
-        fallback = MODULES_DIR / 'Nursing_Certifications' / 'CFRN_Question_Bank.json'
-        total = get_valid_question_count(fallback)
+        total = get_valid_question_count(CFRN_LEGACY_PATH)
     return total
 
 
 def get_ccrn_valid_count():
-    path = MODULES_DIR / 'Nursing_Certifications' / 'CCRN_Comprehensive.json'
-    return get_valid_question_count(path)
+    return get_valid_question_count(CCRN_COMPREHENSIVE_PATH)
 
 
 # ==================== EXISTING HELPERS ====================
@@ -261,8 +704,7 @@ def get_quiz_info(category, module):
     if not module_path.exists():
         return None
     try:
-        with open(module_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_module_json(module_path)
         is_fill_blank = 'Fill_In_The_Blank' in module
         return {
             'name': module,
@@ -275,6 +717,13 @@ def get_quiz_info(category, module):
         return None
 
 
+def resolve_module_path(category, module):
+    """Return the JSON path for a category/module pair, or None if it is not a known module."""
+    if category not in get_categories() or module not in get_modules_in_category(category):
+        return None
+    return MODULES_DIR / category / f'{module}.json'
+
+
 def get_category_quizzes(category):
     modules = get_modules_in_category(category)
     quizzes = {'multiple-choice': [], 'fill-in-the-blank': []}
@@ -286,12 +735,11 @@ def get_category_quizzes(category):
 
 
 def load_nclex_master_questions():
-    master_path = MODULES_DIR / 'NCLEX' / 'NCLEX_Comprehensive_Master_Categorized.json'
+    master_path = NCLEX_MASTER_PATH
     if not master_path.exists():
         return []
     try:
-        with open(master_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_module_json(master_path)
         return data.get('questions', [])
     except Exception as e:
         print(f"Error loading NCLEX master questions: {e}")
@@ -299,10 +747,10 @@ def load_nclex_master_questions():
 
 
 def get_nclex_category_stats():
-    questions = load_nclex_master_questions()
+    index = get_bank_index(NCLEX_MASTER_PATH)
     stats = {}
     for cat in NCLEX_CATEGORIES.keys():
-        count = sum(1 for q in questions if q.get('category') == cat)
+        count = index.count(cat) if index else 0
         stats[cat] = {
             'count': count,
             'weight': NCLEX_CATEGORIES[cat],
@@ -315,8 +763,7 @@ def _load_questions_from_file(path):
     if not path.exists():
         return []
     try:
-        with open(path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_module_json(path)
         if isinstance(data, list):
             return data
         return data.get('questions', [])
@@ -347,8 +794,7 @@ def load_cfrn_domain_questions(domain_name):
 
 
 def _load_cfrn_legacy():
-    path = MODULES_DIR / 'Nursing_Certifications' / 'CFRN_Question_Bank.json'
-    questions = _load_questions_from_file(path)
+    questions = _load_questions_from_file(CFRN_LEGACY_PATH)
     print(f"[CFRN] Legacy bank loaded: {len(questions)} questions")
     return questions
 
@@ -372,46 +818,60 @@ def load_cfrn_questions():
     return all_questions
 
 
+def get_cfrn_category_index(category_name):
+    """Return the index holding category_name: its domain file, else the legacy bank."""
+    domain_name = category_name.split(';')[0].strip()
+    index = get_cfrn_domain_indexes().get(domain_name)
+    return index if index else get_bank_index(CFRN_LEGACY_PATH)
+
+
 def get_cfrn_category_stats():
-    questions = load_cfrn_questions()
+    indexes = [index for index in get_cfrn_domain_indexes().values() if index]
+    if not indexes:
+        legacy = get_bank_index(CFRN_LEGACY_PATH)
+        indexes = [legacy] if legacy else []
     stats = OrderedDict()
     for cat in CFRN_CATEGORIES:
-        count = sum(1 for q in questions if q.get('category') == cat)
-        stats[cat] = count
+        stats[cat] = sum(index.count(cat) for index in indexes)
     return stats
 
 
 def get_cfrn_domain_totals():
     domain_totals = OrderedDict()
-    for domain in CFRN_DOMAINS:
-        questions = load_cfrn_domain_questions(domain)
-        domain_totals[domain] = len(questions)
+    legacy = None
+    for domain, index in get_cfrn_domain_indexes().items():
+        if index:
+            domain_totals[domain] = index.size
+            continue
+        if legacy is None:
+            legacy = get_bank_index(CFRN_LEGACY_PATH)
+        domain_totals[domain] = sum(
+            count for cat, count in (legacy.category_counts.items() if legacy else ())
+            if cat and (cat.startswith(domain + ';') or cat == domain)
+        )
     grand_total = get_cfrn_valid_count()
     return domain_totals, grand_total
 
 
 def load_ccrn_comprehensive_questions():
-    path = MODULES_DIR / 'Nursing_Certifications' / 'CCRN_Comprehensive.json'
-    return _load_questions_from_file(path)
+    return _load_questions_from_file(CCRN_COMPREHENSIVE_PATH)
 
 
 def get_ccrn_category_stats():
-    questions = load_ccrn_comprehensive_questions()
+    index = get_bank_index(CCRN_COMPREHENSIVE_PATH)
     stats = {}
     for cat in CCRN_CATEGORIES:
-        count = sum(1 for q in questions if q.get('category') == cat)
-        stats[cat] = count
+        stats[cat] = index.count(cat) if index else 0
     return stats
 
 
 def load_adult_health_questions():
-    adult_health_path = MODULES_DIR / 'Adult_Health' / 'Adult_Health.json'
+    adult_health_path = ADULT_HEALTH_PATH
     if not adult_health_path.exists():
         print(f"[Adult Health] File not found: {adult_health_path}")
         return []
     try:
-        with open(adult_health_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        data = load_module_json(adult_health_path)
         return data.get('questions', [])
     except Exception as e:
         print(f"Error loading Adult Health questions: {e}")
@@ -427,40 +887,758 @@ def extract_chapter_number(category_str):
     return None
 
 
+def adult_health_module_keys(module_num):
+    """The (book, chapter) pairs that make up an Adult Health module."""
+    keys = set()
+    for f in ADULT_HEALTH_MODULES[module_num]['filters']:
+        for ch in f['chapters']:
+            for chapter in (ch, ch.zfill(2), ch.lstrip('0')):
+                keys.add((f['book'], chapter))
+    return keys
+
+
 def filter_adult_health_questions(questions, module_num):
     if module_num not in ADULT_HEALTH_MODULES:
         return []
-    module_def = ADULT_HEALTH_MODULES[module_num]
-    filters = module_def['filters']
-    filtered = []
-    for q in questions:
-        q_book = q.get('book', '')
-        q_category = q.get('category', '')
-        q_chapter = extract_chapter_number(q_category)
-        for f in filters:
-            if q_book == f['book']:
-                for ch in f['chapters']:
-                    if q_chapter == ch or q_chapter == ch.zfill(2) or q_chapter == ch.lstrip('0'):
-                        filtered.append(q)
-                        break
-                else:
-                    continue
-                break
-    return filtered
+    keys = adult_health_module_keys(module_num)
+    return [q for q in questions
+            if (q.get('book', ''), extract_chapter_number(q.get('category', ''))) in keys]
+
+
+class AdultHealthMembership:
+    """Adult Health module membership, computed once per version of the bank.
+
+    Questions are grouped by (book, chapter) in one pass over the book and
+    category columns (the compiled artifact's, when present), so each module
+    resolves to question positions by set lookup and the comprehensive quiz
+    is a union of those positions.
+    """
+
+    def __init__(self, books, categories, ids):
+        self.by_chapter = {}
+        for position, (book, category) in enumerate(zip(books, categories)):
+            chapter = extract_chapter_number(category)
+            if chapter:
+                self.by_chapter.setdefault((book or '', chapter), []).append(position)
+        self.modules = {}
+        for module_num in ADULT_HEALTH_MODULES:
+            positions = set()
+            for key in adult_health_module_keys(module_num):
+                positions.update(self.by_chapter.get(key, ()))
+            self.modules[module_num] = sorted(positions)
+        self.ids = ids
+
+    @classmethod
+    def build(cls, path):
+        compiled = QUESTION_BANKS.compiled(path)
+        if compiled is not None:
+            return cls(compiled.books(), compiled.categories(), compiled.ids)
+        questions = questions_of(QUESTION_BANKS.load(path))
+        return cls([q.get('book', '') for q in questions], [q.get('category', '') for q in questions],
+                   [q.get('id') for q in questions])
+
+    def module_positions(self, module_num):
+        return self.modules.get(module_num, [])
+
+    def combined_positions(self, question_at):
+        """Every module's positions in module order, dropping repeated ids (or stems when id-less)."""
+        combined, seen = [], set()
+        for positions in self.modules.values():
+            for position in positions:
+                key = self.ids[position]
+                if key is None:
+                    key = question_at(position).get('stem', '')
+                if key not in seen:
+                    seen.add(key)
+                    combined.append(position)
+        return combined
+
+
+def get_adult_health_membership():
+    if not ADULT_HEALTH_PATH.exists():
+        print(f"[Adult Health] File not found: {ADULT_HEALTH_PATH}")
+        return None
+    try:
+        return QUESTION_BANKS.derived(ADULT_HEALTH_PATH, 'adult_health_membership', AdultHealthMembership.build)
+    except Exception as e:
+        print(f"Error loading Adult Health questions: {e}")
+        return None
+
+
+def get_adult_health_module_questions(module_num):
+    membership = get_adult_health_membership()
+    index = get_bank_index(ADULT_HEALTH_PATH)
+    if membership is None or index is None:
+        return []
+    return [index.question(position) for position in membership.module_positions(module_num)]
+
+
+def get_adult_health_comprehensive_questions():
+    membership = get_adult_health_membership()
+    index = get_bank_index(ADULT_HEALTH_PATH)
+    if membership is None or index is None:
+        return []
+    return [index.question(position) for position in membership.combined_positions(index.question)]
 
 
 def get_adult_health_module_stats():
-    questions = load_adult_health_questions()
+    membership = get_adult_health_membership()
     stats = {}
     for module_num, module_def in ADULT_HEALTH_MODULES.items():
-        filtered = filter_adult_health_questions(questions, module_num)
         stats[module_num] = {
             'name': module_def['name'],
-            'count': len(filtered)
+            'count': len(membership.module_positions(module_num)) if membership else 0
         }
     return stats
 
 
+# ==================== QUIZ SAMPLING ====================
+
+# The client still prefers least-attempted / unmastered questions, so the
+# server ships a seeded pool a few times larger than the requested length.
+QUIZ_SAMPLE_POOL_FACTOR = 3
+
+
+def parse_quiz_seed(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def allocate_quotas(group_sizes, count, weights=None):
+    """Split count across groups by weight (default: group size), capped by group size."""
+    if weights:
+        raw = {key: weights.get(key, 0) for key in group_sizes}
+    else:
+        raw = dict(group_sizes)
+    total_weight = sum(raw.values()) or 1
+    ideal = {key: count * raw[key] / total_weight for key in group_sizes}
+    quotas = {key: min(int(ideal[key]), size) for key, size in group_sizes.items()}
+    remaining = count - sum(quotas.values())
+    order = sorted(group_sizes, key=lambda key: (ideal[key] - quotas[key], raw[key]), reverse=True)
+    while remaining > 0:
+        progressed = False
+        for key in order:
+            if remaining == 0:
+                break
+            if quotas[key] < group_sizes[key]:
+                quotas[key] += 1
+                remaining -= 1
+                progressed = True
+        if not progressed:
+            break
+    return quotas
+
+
+def sample_questions(questions, count, seed, weights=None):
+    """Return a seeded sample of count questions, stratified by category when present."""
+    if count >= len(questions):
+        return list(questions)
+    rng = random.Random(seed)
+    by_category = OrderedDict()
+    for q in questions:
+        by_category.setdefault(q.get('category'), []).append(q)
+    if len(by_category) <= 1:
+        return rng.sample(questions, count)
+    quotas = allocate_quotas({cat: len(group) for cat, group in by_category.items()}, count, weights)
+    selected = []
+    for cat, group in by_category.items():
+        selected.extend(rng.sample(group, quotas[cat]))
+    rng.shuffle(selected)
+    return selected
+
+
+def assemble_exam_positions(by_category, count, seed, weights):
+    """Seeded exam of count bank positions whose category mix follows weights.
+
+    by_category maps category -> bank positions (a QuestionBankIndex's arrays).
+    Quotas are the largest-remainder split of count across the weighted
+    categories, so every exam of a given length has the same blueprint; only
+    the positions drawn within each category depend on the seed.
+    """
+    groups = {cat: by_category[cat] for cat in weights if by_category.get(cat)}
+    quotas = allocate_quotas({cat: len(positions) for cat, positions in groups.items()}, count, weights)
+    rng = random.Random(seed)
+    selected = []
+    for cat, positions in groups.items():
+        selected.extend(rng.sample(positions, quotas[cat]))
+    rng.shuffle(selected)
+    return selected
+
+
+def sample_quiz_data(quiz_data, weights=None):
+    """Trim quiz_data to the quiz_length requested in the URL.
+
+    Returns (quiz_data, seed); seed is None when nothing was sampled. The
+    client-side new/answered/missed filter needs the whole bank, so requests
+    carrying &filter= are left untouched.
+    """
+    quiz_length = request.args.get('quiz_length', '')
+    if not quiz_length.isdigit() or int(quiz_length) < 1 or request.args.get('filter'):
+        return quiz_data, None
+    questions = quiz_data.get('questions', [])
+    pool_size = int(quiz_length) * QUIZ_SAMPLE_POOL_FACTOR
+    if pool_size >= len(questions):
+        return quiz_data, None
+    seed = parse_quiz_seed(request.args.get('seed'))
+    if seed is None:
+        seed = random.randrange(1, 2 ** 31)
+    sampled = dict(quiz_data)
+    sampled['questions'] = sample_questions(questions, pool_size, seed, weights)
+    sampled['total_questions'] = len(questions)
+    return sampled, seed
+
+
+# ==================== QUESTION SEARCH ====================
+#
+# search_tokens() and the BM25 constants are shared with ACT text search and
+# come from api/_act_text.py.
+
+# Field weights fold stem/options/rationale/category into one BM25F-style term frequency.
+SEARCH_FIELD_WEIGHTS = (('stem', 3), ('question', 3), ('options', 2), ('category', 2), ('rationale', 1))
+SEARCH_PREFIX_PENALTY = 0.8
+SEARCH_TYPO_PENALTY = 0.6
+
+
+def flatten_text(value):
+    if isinstance(value, str):
+        return value
+    if isinstance(value, dict):
+        return ' '.join(flatten_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return ' '.join(flatten_text(v) for v in value)
+    return ''
+
+
+def deletion_variants(term):
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+
+def within_one_edit(a, b):
+    """Damerau-Levenshtein distance <= 1 (one insert, delete, substitute or adjacent swap)."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) == len(b):
+        return (a[i + 1:] == b[i + 1:]
+                or (i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]))
+    return a[i:] == b[i + 1:]
+
+
+class QuestionSearchIndex:
+    """BM25 inverted index over every question bank in modules/.
+
+    Postings store each (term, question) pair's precomputed BM25 term-frequency
+    component, so a query only multiplies by IDF and sums. Query terms missing
+    from the vocabulary are expanded to terms one edit away; the last query
+    term is also expanded as a prefix for type-ahead.
+    """
+
+    def __init__(self, docs, postings):
+        self.docs = docs  # (category, module, position, question_category, book)
+        self.postings = postings
+        self.vocabulary = sorted(postings)
+        self._deletions = {}
+        for term in self.vocabulary:
+            if len(term) >= 4:
+                for variant in deletion_variants(term):
+                    self._deletions.setdefault(variant, []).append(term)
+
+    @classmethod
+    def build(cls, banks):
+        """banks: iterable of (category, module, questions)."""
+        docs, doc_terms, lengths = [], [], []
+        for category, module, questions in banks:
+            for position, question in enumerate(questions):
+                if not isinstance(question, dict):
+                    continue
+                counts = Counter()
+                for field, weight in SEARCH_FIELD_WEIGHTS:
+                    value = question.get(field)
+                    if value:
+                        field_counts = Counter(search_tokens(flatten_text(value)))
+                        if weight != 1:
+                            field_counts = Counter({token: n * weight for token, n in field_counts.items()})
+                        counts.update(field_counts)
+                docs.append((category, module, position, question.get('category'), question.get('book')))
+                doc_terms.append(counts)
+                lengths.append(sum(counts.values()))
+        average = (sum(lengths) / len(lengths)) if lengths else 1.0
+        postings = {}
+        for doc_id, counts in enumerate(doc_terms):
+            norm = SEARCH_BM25_K1 * (1 - SEARCH_BM25_B + SEARCH_BM25_B * lengths[doc_id] / average)
+            for term, tf in counts.items():
+                impact = tf * (SEARCH_BM25_K1 + 1) / (tf + norm)
+                postings.setdefault(term, []).append((doc_id, impact))
+        return cls(docs, postings)
+
+    def idf(self, term):
+        df = len(self.postings.get(term, ()))
+        return math.log(1 + (len(self.docs) - df + 0.5) / (df + 0.5))
+
+    def prefix_terms(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        matches = []
+        for term in self.vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            if term != prefix:
+                matches.append(term)
+        matches.sort(key=lambda term: -len(self.postings[term]))
+        return matches[:SEARCH_MAX_EXPANSIONS]
+
+    def typo_terms(self, term):
+        if len(term) < 4:
+            return []
+        candidates = set(self._deletions.get(term, ()))
+        for variant in deletion_variants(term):
+            if variant in self.postings:
+                candidates.add(variant)
+            candidates.update(self._deletions.get(variant, ()))
+        candidates.discard(term)
+        matches = [candidate for candidate in candidates if within_one_edit(term, candidate)]
+        matches.sort(key=lambda candidate: -len(self.postings[candidate]))
+        return matches[:SEARCH_MAX_EXPANSIONS]
+
+    def expand(self, tokens, prefix=True):
+        """Map each query token to [(index term, weight)]."""
+        expanded = []
+        for i, token in enumerate(tokens):
+            terms = [(token, 1.0)] if token in self.postings else []
+            if not terms:
+                terms = [(term, SEARCH_TYPO_PENALTY) for term in self.typo_terms(token)]
+            if prefix and i == len(tokens) - 1 and len(token) >= 2:
+                seen = {term for term, _ in terms}
+                terms += [(term, SEARCH_PREFIX_PENALTY) for term in self.prefix_terms(token) if term not in seen]
+            expanded.append(terms)
+        return expanded
+
+    def search(self, query, limit=20, offset=0, accept=None, prefix=True):
+        """Return (total, [(score, doc)]) ranked by BM25; accept(doc) filters candidates."""
+        scores = {}
+        for terms in self.expand(search_tokens(query), prefix=prefix):
+            if len(terms) == 1:
+                term, weight = terms[0]
+                idf = self.idf(term) * weight
+                get = scores.get
+                for doc_id, impact in self.postings[term]:
+                    scores[doc_id] = get(doc_id, 0.0) + idf * impact
+                continue
+            # Expansions of one query token count once: keep each question's best.
+            best = {}
+            for term, weight in terms:
+                idf = self.idf(term) * weight
+                for doc_id, impact in self.postings[term]:
+                    score = idf * impact
+                    if score > best.get(doc_id, 0.0):
+                        best[doc_id] = score
+            for doc_id, score in best.items():
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+        if accept is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if accept(self.docs[doc_id])}
+        ranked = heapq.nlargest(offset + limit, scores.items(), key=lambda item: (item[1], -item[0]))
+        return len(scores), [(score, self.docs[doc_id]) for doc_id, score in ranked[offset:]]
+
+
+_SEARCH_INDEX = {'signature': None, 'index': None}
+_SEARCH_INDEX_LOCK = threading.Lock()
+
+
+def search_bank_paths():
+    return [(category, module, MODULES_DIR / category / f'{module}.json')
+            for category in get_categories() for module in get_modules_in_category(category)]
+
+
+def get_question_search_index():
+    """Build the search index once per process; rebuild if any bank file changes."""
+    paths = search_bank_paths()
+    signature = tuple((str(path), *QuestionBankStore._signature(path)) for _, _, path in paths)
+    with _SEARCH_INDEX_LOCK:
+        if _SEARCH_INDEX['signature'] != signature:
+            banks = []
+            for category, module, path in paths:
+                try:
+                    banks.append((category, module, questions_of(load_module_json(path))))
+                except Exception as e:
+                    print(f"[Search] Skipping {path}: {e}")
+            _SEARCH_INDEX['index'] = QuestionSearchIndex.build(banks)
+            _SEARCH_INDEX['signature'] = signature
+        return _SEARCH_INDEX['index']
+
+
+# ==================== SPACED REPETITION ====================
+#
+# /api/next-questions schedules a bank with SM-2. The client keeps its own
+# review log; it posts it as [[id, grade, reviewed_at], ...], where grade is
+# 0-5 (or true/false for right/wrong) and reviewed_at is in epoch seconds.
+# The server replays the log into per-question card state. It then serves
+# the most overdue cards first, then unseen questions, then cards due soonest.
+# Unseen questions follow a per-bank order computed once per bank version.
+# That order spreads each category evenly through the bank. Filling N slots
+# is therefore a heap selection over the reviewed cards plus a walk of the
+# precomputed order, with no reshuffle of the whole bank.
+
+SM2_INITIAL_EASE = 2.5
+SM2_MIN_EASE = 1.3
+SM2_PASS_GRADE = 3
+SM2_BOOLEAN_GRADES = {True: 4, False: 1}
+DAY_SECONDS = 86400
+NEXT_QUESTIONS_DEFAULT_COUNT = 10
+NEXT_QUESTIONS_MAX_COUNT = 100
+REVIEW_HISTORY_MAX_ENTRIES = 20000
+
+CardState = namedtuple('CardState', 'reps interval ease reviewed_at due')
+
+
+def sm2_review(state, grade, reviewed_at):
+    """Return the CardState after grading a card (state None for a first review)."""
+    reps, interval, ease = (0, 0, SM2_INITIAL_EASE) if state is None else state[:3]
+    if grade < SM2_PASS_GRADE:
+        reps, interval = 0, 1
+    else:
+        reps += 1
+        interval = 1 if reps == 1 else 6 if reps == 2 else max(1, round(interval * ease))
+    ease = max(SM2_MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return CardState(reps, interval, ease, reviewed_at, reviewed_at + interval * DAY_SECONDS)
+
+
+def parse_review_history(raw):
+    """Validate a posted review log into [(id, grade, reviewed_at)] sorted by time."""
+    if raw is None:
+        return []
+    if not isinstance(raw, list) or len(raw) > REVIEW_HISTORY_MAX_ENTRIES:
+        raise ValueError(f'history must be a list of at most {REVIEW_HISTORY_MAX_ENTRIES} reviews')
+    reviews = []
+    for entry in raw:
+        if not isinstance(entry, list) or len(entry) != 3:
+            raise ValueError('each review must be [id, grade, reviewed_at]')
+        question_id, grade, reviewed_at = entry
+        if isinstance(grade, bool):
+            grade = SM2_BOOLEAN_GRADES[grade]
+        if not isinstance(grade, int) or not 0 <= grade <= 5:
+            raise ValueError('grade must be 0-5 or a boolean')
+        if isinstance(reviewed_at, bool) or not isinstance(reviewed_at, (int, float)):
+            raise ValueError('reviewed_at must be epoch seconds')
+        reviews.append((str(question_id), grade, float(reviewed_at)))
+    reviews.sort(key=lambda review: review[2])
+    return reviews
+
+
+class ReviewScheduleIndex:
+    """Per-bank scheduling order: unseen questions interleaved across categories.
+
+    Each question is keyed by its rank within its category divided by the
+    category's size. Sorting on that key spreads every category evenly from
+    the front of the order to the back. A category-sized seeded shuffle
+    varies the picks within each category.
+    """
+
+    def __init__(self, bank_index, seed):
+        rng = random.Random(seed)
+        keyed = []
+        for category_rank, positions in enumerate(bank_index.by_category.values()):
+            positions = list(positions)
+            rng.shuffle(positions)
+            size = len(positions)
+            keyed.extend(((rank + 0.5) / size, category_rank, position) for rank, position in enumerate(positions))
+        keyed.sort()
+        self.new_order = [position for _, _, position in keyed]
+        self.by_id = bank_index.by_id
+        self.size = bank_index.size
+
+    @classmethod
+    def build(cls, path):
+        bank_index = get_bank_index(path)
+        if bank_index is None:
+            raise ValueError(f'Unable to index {path}')
+        return cls(bank_index, Path(path).name)
+
+    def replay(self, reviews):
+        """Card state per bank position after replaying reviews; ids outside the bank are ignored."""
+        states = {}
+        for question_id, grade, reviewed_at in reviews:
+            position = self.by_id.get(question_id)
+            if position is not None:
+                states[position] = sm2_review(states.get(position), grade, reviewed_at)
+        return states
+
+    def next_positions(self, states, count, now):
+        """Up to count (position, kind) pairs: overdue cards, then unseen, then soonest due."""
+        due = [(position, state) for position, state in states.items() if state.due <= now]
+        # Most overdue relative to its interval first, so a lapsed card
+        # outranks a mature card that is a day late.
+        chosen = [(position, 'due') for position, _ in heapq.nsmallest(
+            count, due, key=lambda item: (-(now - item[1].due) / (item[1].interval * DAY_SECONDS), item[0]))]
+        if len(chosen) < count:
+            for position in self.new_order:
+                if position not in states:
+                    chosen.append((position, 'new'))
+                    if len(chosen) == count:
+                        break
+        if len(chosen) < count:
+            ahead = [(position, state) for position, state in states.items() if state.due > now]
+            chosen.extend((position, 'ahead') for position, _ in heapq.nsmallest(
+                count - len(chosen), ahead, key=lambda item: (item[1].due, item[0])))
+        return chosen, len(due)
+
+
+def get_review_schedule_index(path):
+    return QUESTION_BANKS.derived(path, 'review_schedule', ReviewScheduleIndex.build)
+
+
+# ==================== ADAPTIVE TESTING ====================
+#
+# /api/cat/next runs a computerized adaptive test over a bank under the
+# Rasch (1PL) model: P(correct) = 1 / (1 + exp(-(theta - b))). Each
+# question's difficulty b comes from modules/.compiled/item-difficulty.json
+# when scripts/calibrate-item-difficulty.py has fitted it from aggregated
+# attempt counts. Otherwise b is a heuristic over the question's form, centred
+# on the bank's mean. Under 1PL the most informative item is the one whose
+# b is nearest theta. Each category therefore keeps its items sorted by b,
+# and selection bisects to theta and walks outward. Like the NCLEX, the
+# test stops once the 95% confidence interval around theta clears the
+# passing standard (after a minimum length), at a maximum length, or when
+# the pool runs out.
+
+ITEM_DIFFICULTY_PATH = COMPILED_DIR / 'item-difficulty.json'
+CAT_EXAMS = {
+    'NCLEX': {'path': NCLEX_MASTER_PATH, 'weights': NCLEX_CATEGORIES,
+              'min_items': 85, 'max_items': 150, 'passing_theta': 0.0},
+    'CFRN': {'path': CFRN_LEGACY_PATH, 'weights': None,
+             'min_items': 50, 'max_items': 150, 'passing_theta': 0.0},
+}
+CAT_CONFIDENCE_Z = 1.96
+CAT_PRIOR_SD = 1.0
+CAT_RANDOMESQUE = 3
+CAT_DIFFICULTY_LIMIT = 3.0
+CAT_HARD_CUE_RE = re.compile(
+    r'\b(?:first|priority|prioritize|most important|best|except|not|least|further teaching|most likely)\b')
+CAT_COGNITIVE_LEVELS = {'remembering': -0.5, 'understanding': -0.25, 'applying': 0.0,
+                        'analyzing': 0.5, 'evaluating': 0.75, 'creating': 0.75}
+
+
+def heuristic_difficulty(question):
+    """Seed difficulty (logits, uncentred) from a question's form when no calibration exists."""
+    correct = question.get('correct')
+    correct_count = len(correct) if isinstance(correct, list) else 1
+    score = 0.0
+    if correct_count > 1 or question.get('type') in ('multi_select', 'select_all_that_apply'):
+        score += 1.0 + 0.25 * max(0, correct_count - 2)
+    level = str(question.get('level_of_cognitive_ability') or '').strip().lower()
+    score += CAT_COGNITIVE_LEVELS.get(level, 0.0)
+    stem = str(question.get('stem') or question.get('question') or '').lower()
+    score += 0.5 * math.tanh((len(stem.split()) - 25) / 25)
+    if CAT_HARD_CUE_RE.search(stem):
+        score += 0.4
+    options = question.get('options') or ()
+    score += 0.2 * max(0, len(options) - 4)
+    return score
+
+
+def load_item_difficulties(path):
+    """Calibrated {id: b} for the bank at path from ITEM_DIFFICULTY_PATH, or {}."""
+    if not ITEM_DIFFICULTY_PATH.exists():
+        return {}
+    try:
+        bank = Path(path).resolve().relative_to(MODULES_DIR.resolve()).with_suffix('').as_posix()
+        calibrated = load_module_json(ITEM_DIFFICULTY_PATH).get('banks', {}).get(bank, {})
+        return {str(question_id): float(b) for question_id, b in calibrated.items()}
+    except (ValueError, TypeError, AttributeError) as e:
+        print(f"[CAT] Ignoring {ITEM_DIFFICULTY_PATH}: {e}")
+        return {}
+
+
+class CatItemIndex:
+    """Item difficulties of one bank, sorted per category for nearest-theta lookup."""
+
+    def __init__(self, categories, ids, difficulties):
+        self.ids = ids
+        self.difficulties = difficulties
+        self.category_of = categories
+        grouped = {}
+        for position, category in enumerate(categories):
+            grouped.setdefault(category, []).append((difficulties[position], position))
+        self.sorted_items = {}
+        self.sorted_difficulties = {}
+        for category, items in grouped.items():
+            items.sort()
+            self.sorted_items[category] = [position for _, position in items]
+            self.sorted_difficulties[category] = [b for b, _ in items]
+        self.by_id = {}
+        for position, question_id in enumerate(ids):
+            self.by_id.setdefault(question_id, position)
+
+    @classmethod
+    def build(cls, path):
+        questions = questions_of(QUESTION_BANKS.load(path))
+        calibrated = load_item_difficulties(path)
+        seeded = [heuristic_difficulty(q) for q in questions]
+        mean = sum(seeded) / len(seeded) if seeded else 0.0
+        ids = [str(q.get('id', '')) for q in questions]
+        difficulties = []
+        for question_id, score in zip(ids, seeded):
+            b = calibrated.get(question_id, score - mean)
+            difficulties.append(max(-CAT_DIFFICULTY_LIMIT, min(CAT_DIFFICULTY_LIMIT, b)))
+        return cls([q.get('category') for q in questions], ids, difficulties)
+
+    def nearest(self, category, theta, administered, count):
+        """Up to count unadministered positions in category with b closest to theta."""
+        difficulties = self.sorted_difficulties.get(category, [])
+        items = self.sorted_items.get(category, [])
+        right = bisect.bisect_left(difficulties, theta)
+        left = right - 1
+        found = []
+        while len(found) < count and (left >= 0 or right < len(items)):
+            take_right = left < 0 or (right < len(items)
+                                      and difficulties[right] - theta <= theta - difficulties[left])
+            if take_right:
+                position, right = items[right], right + 1
+            else:
+                position, left = items[left], left - 1
+            if position not in administered:
+                found.append(position)
+        return found
+
+    def next_category(self, weights, administered):
+        """The category furthest below its weighted share that still has unused items."""
+        counts = Counter(self.category_of[position] for position in administered)
+        available = [cat for cat in weights if len(self.sorted_items.get(cat, ())) > counts[cat]]
+        if not available:
+            return None
+        total = sum(weights[cat] for cat in available) or 1
+        next_count = len(administered) + 1
+        return max(available, key=lambda cat: (weights[cat] / total * next_count - counts[cat], weights[cat]))
+
+
+def estimate_ability(difficulties, outcomes, prior_sd=CAT_PRIOR_SD):
+    """MAP ability estimate and its standard error under 1PL with a N(0, prior_sd) prior."""
+    theta = 0.0
+    information = 1 / prior_sd ** 2
+    for _ in range(25):
+        gradient = -theta / prior_sd ** 2
+        information = 1 / prior_sd ** 2
+        for b, correct in zip(difficulties, outcomes):
+            p = 1 / (1 + math.exp(-(theta - b)))
+            gradient += (1 if correct else 0) - p
+            information += p * (1 - p)
+        step = gradient / information
+        theta += max(-1.0, min(1.0, step))
+        if abs(step) < 1e-6:
+            break
+    return theta, 1 / math.sqrt(information)
+
+
+def cat_stop_reason(administered, theta, se, exam, remaining):
+    if administered >= exam['max_items']:
+        return 'max_items'
+    if remaining == 0:
+        return 'pool_exhausted'
+    if administered >= exam['min_items'] and abs(theta - exam['passing_theta']) >= CAT_CONFIDENCE_Z * se:
+        return 'confidence'
+    return None
+
+
+def get_cat_item_index(path):
+    # The calibration file's signature versions the index, so recalibrating
+    # rebuilds it without touching the bank.
+    signature = QuestionBankStore._signature(ITEM_DIFFICULTY_PATH) if ITEM_DIFFICULTY_PATH.exists() else None
+    return QUESTION_BANKS.derived(path, 'cat_items', CatItemIndex.build, version=signature)
+
+
+# ==================== ANSWER GRADING ====================
+#
+# /api/grade scores a whole quiz in one request against answer keys built
+# once per bank version. A select question's key is a bitmask of its correct
+# option indices, so the check is one integer comparison. A blank's key is
+# one frozenset of normalized accepted answers per blank, so each blank is a
+# set lookup. Matching mirrors static/quiz-script.js: an exact option set for
+# select types, and case/whitespace-insensitive equality per blank.
+
+GRADE_MAX_ANSWERS = 500
+FILL_BLANK_TYPES = frozenset({'fill_in_the_blank', 'multi_fill_in_the_blank'})
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_blank_answer(text):
+    return WHITESPACE_RE.sub(' ', str(text).lower().strip()) if text is not None else ''
+
+
+def option_mask(values):
+    """Bitmask of option indices from letters ('A', 'c') or integer indices; None if any is invalid."""
+    if isinstance(values, (str, int)) and not isinstance(values, bool):
+        values = [values]
+    if not isinstance(values, list):
+        return None
+    mask = 0
+    for value in values:
+        if isinstance(value, str) and len(value) == 1 and value.isalpha():
+            index = ord(value.upper()) - ord('A')
+        elif isinstance(value, int) and not isinstance(value, bool):
+            index = value
+        else:
+            return None
+        if not 0 <= index < 64:
+            return None
+        mask |= 1 << index
+    return mask
+
+
+def question_answer_key(question):
+    """('select', mask) or ('blank', (frozenset, ...)), or None when no answer is defined."""
+    raw = question.get('correct')
+    if raw is None:
+        raw = question.get('correctAnswer', question.get('answer'))
+    if raw is None or raw == []:
+        return None
+    is_blank = question.get('type') in FILL_BLANK_TYPES or (isinstance(raw, list) and isinstance(raw[0], list))
+    if is_blank:
+        blanks = raw if isinstance(raw, list) and isinstance(raw[0], list) else [raw if isinstance(raw, list) else [raw]]
+        return 'blank', tuple(frozenset(normalize_blank_answer(answer) for answer in blank) for blank in blanks)
+    mask = option_mask(raw)
+    return ('select', mask) if mask else None
+
+
+class AnswerKeyIndex:
+    """Answer key and category of every question in one bank, by id."""
+
+    def __init__(self, questions):
+        self.keys = {}
+        self.categories = {}
+        for question in questions:
+            question_id = str(question.get('id', ''))
+            if question_id in self.keys:
+                continue
+            self.keys[question_id] = question_answer_key(question)
+            self.categories[question_id] = question.get('category')
+
+    @classmethod
+    def build(cls, path):
+        return cls(questions_of(QUESTION_BANKS.load(path)))
+
+    def grade(self, question_id, response):
+        """(correct, per-blank results or None), or None for unknown ids and keyless questions."""
+        key = self.keys.get(question_id)
+        if key is None:
+            return None
+        kind, expected = key
+        if kind == 'select':
+            return option_mask(response) == expected, None
+        if not isinstance(response, list):
+            response = [response]
+        blanks = [index < len(response) and normalize_blank_answer(response[index]) in accepted
+                  for index, accepted in enumerate(expected)]
+        return all(blanks) and len(response) == len(expected), blanks
+
+
+def get_answer_key_index(path):
+    return QUESTION_BANKS.derived(path, 'answer_keys', AnswerKeyIndex.build)
+
+
 # ==================== ROUTES ====================
 
 @app.route('/api/pwa-version')
@@ -475,25 +1653,6 @@ def pwa_version():
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
     return response
 
-@app.route('/')
-def home():
-    try:
-        return render_template('home.html')
-    except Exception as e:
-        print(f"Error in home route: {e}")
-        return jsonify({'error': str(e)}), 500
-
-
-@app.route('/nurse-study-hub')
-def nurse_study_hub():
-    try:
-        categories = get_categories()
-        return render_template('nurse-study-hub.html', categories=categories)
-    except Exception as e:
-        print(f"Error in nurse_study_hub route: {e}")
-        return jsonify({'error': str(e)}), 500
-
-
 @app.route('/act-protocols')
 def act_protocols():
     try:
@@ -534,6 +1693,898 @@ def act_protocol_pdf_error(message, status=400):
     return jsonify({'success': False, 'error': message}), status
 
 
+# ==================== ACT PDF DOCUMENTS ====================
+#
+# Opening one protocol in the viewer asks for its info, a preview and tiles
+# for every page, and highlights. Each of those requests names the same PDF.
+# Requested paths are looked up in an allowlist built once from
+# act-protocols.json, and rebuilt when that file changes. That replaces
+# decoding, resolving and stat-ing the path on every request. Open
+# fitz.Document handles are kept in a small LRU keyed by path and
+# mtime/size, so a page request skips re-opening and re-parsing the PDF.
+
+ACT_PROTOCOLS_PATH = BASE_DIR / 'static/data/act-protocols.json'
+ACT_PROTOCOLS_ROOT = BASE_DIR / 'static/protocols/act'
+ACT_DOCUMENT_POOL_SIZE = 16
+
+
+def load_act_protocol_allowlist(path):
+    """PDF web path -> resolved file, for every manifest protocol whose PDF exists."""
+    root = ACT_PROTOCOLS_ROOT.resolve()
+    allowed = {}
+    for protocol in load_module_json(path):
+        web_path = protocol.get('file') or ''
+        if not web_path.startswith('/static/protocols/act/') or not web_path.lower().endswith('.pdf'):
+            continue
+        candidate = (BASE_DIR / web_path.lstrip('/')).resolve()
+        if root in candidate.parents and candidate.is_file():
+            allowed[web_path] = candidate
+    return allowed
+
+
+def get_act_protocol_allowlist():
+    return QUESTION_BANKS.derived(ACT_PROTOCOLS_PATH, 'pdf_allowlist', load_act_protocol_allowlist)
+
+
+def resolve_act_protocol_pdf(web_path):
+    """Resolved path of a listed ACT protocol PDF, or None."""
+    allowed = get_act_protocol_allowlist()
+    return allowed.get(web_path) or allowed.get(unquote(web_path or ''))
+
+
+# MuPDF shares its allocator and font/glyph caches between documents, so
+# PyMuPDF is not thread-safe even on separate fitz.Document objects. Every
+# fitz call (open, render, text extraction, close) runs under this lock.
+FITZ_LOCK = threading.RLock()
+
+
+class _PooledDocument:
+    __slots__ = ('signature', 'document', 'users', 'evicted')
+
+    def __init__(self, signature):
+        self.signature = signature
+        self.document = None
+        self.users = 0
+        self.evicted = False
+
+    def close(self):
+        if self.document is not None:
+            self.document.close()
+            self.document = None
+
+
+class PdfDocumentPool:
+    """Bounded LRU of open fitz.Document handles keyed by path and mtime/size.
+
+    document() holds FITZ_LOCK from opening the handle until the caller is
+    done with it, so MuPDF work is serialized across the whole process, not
+    just per PDF. An evicted or outdated handle that is still in use (the
+    lock is reentrant) is closed when its last user releases it.
+    """
+
+    def __init__(self, max_documents):
+        self._entries = OrderedDict()
+        self.max_documents = max_documents
+        self.opens = 0
+        self.hits = 0
+
+    @staticmethod
+    def _retire(entry):
+        entry.evicted = True
+        if not entry.users:
+            entry.close()
+
+    @contextlib.contextmanager
+    def document(self, path):
+        import fitz
+        key = str(path)
+        signature = QuestionBankStore._signature(path)
+        with FITZ_LOCK:
+            entry = self._entries.get(key)
+            if entry is not None and entry.signature == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                if entry is not None:
+                    self._retire(self._entries.pop(key))
+                entry = self._entries[key] = _PooledDocument(signature)
+                while len(self._entries) > self.max_documents:
+                    self._retire(self._entries.popitem(last=False)[1])
+            if entry.document is None:
+                entry.document = fitz.open(path)
+                self.opens += 1
+            entry.users += 1
+            try:
+                yield entry.document
+            finally:
+                entry.users -= 1
+                if entry.evicted and not entry.users:
+                    entry.close()
+
+    def clear(self):
+        with FITZ_LOCK:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            for entry in entries:
+                self._retire(entry)
+
+    def stats(self):
+        with FITZ_LOCK:
+            return {
+                'documents': len(self._entries),
+                'max_documents': self.max_documents,
+                'opens': self.opens,
+                'hits': self.hits,
+            }
+
+
+ACT_DOCUMENTS = PdfDocumentPool(ACT_DOCUMENT_POOL_SIZE)
+
+
+# ==================== ACT PDF RENDER CACHE ====================
+#
+# /act-protocols/pdf-page renders a whole page, or one PDF_TILE_PIXELS square
+# tile of it (a PyMuPDF clip rect), as PNG or JPEG. The viewer first shows a
+# small low-scale JPEG preview of each page, then fills in detail with tiles
+# as the page scrolls into view, so a slow connection never waits on a full
+# scale-2 PNG before showing anything.
+
+PDF_RENDER_SCALE_STEP = 0.25
+PDF_RENDER_MIN_SCALE = 0.5
+PDF_RENDER_MAX_SCALE = 3.0
+PDF_TILE_PIXELS = 512
+PDF_IMAGE_MIMETYPES = {'png': 'image/png', 'jpeg': 'image/jpeg'}
+PDF_JPEG_QUALITY = 75
+PDF_JPEG_QUALITY_STEP = 5
+PDF_RENDER_MEMORY_BYTES = 48 * 1024 * 1024
+PDF_RENDER_DISK_BYTES = 256 * 1024 * 1024
+PDF_RENDER_DISK_DIR = Path(
+    os.environ.get('ACT_PDF_RENDER_CACHE_DIR') or Path(tempfile.gettempdir()) / 'act-pdf-render-cache'
+)
+
+
+def quantize_pdf_scale(scale):
+    scale = min(PDF_RENDER_MAX_SCALE, max(PDF_RENDER_MIN_SCALE, scale))
+    return round(scale / PDF_RENDER_SCALE_STEP) * PDF_RENDER_SCALE_STEP
+
+
+def quantize_jpeg_quality(quality):
+    quality = min(95, max(20, quality))
+    return round(quality / PDF_JPEG_QUALITY_STEP) * PDF_JPEG_QUALITY_STEP
+
+
+def parse_pdf_tile(value):
+    """'column,row' -> (column, row); None when value is empty. Raises ValueError."""
+    if not value:
+        return None
+    column, row = (int(part) for part in value.split(','))
+    if column < 0 or row < 0:
+        raise ValueError('negative tile index')
+    return column, row
+
+
+def pdf_tile_clip(page_rect, scale, column, row):
+    """(x0, y0, x1, y1) in PDF points of one tile at scale, or None if it lies off the page."""
+    side = PDF_TILE_PIXELS / scale
+    x0 = page_rect.x0 + column * side
+    y0 = page_rect.y0 + row * side
+    if x0 >= page_rect.x1 or y0 >= page_rect.y1:
+        return None
+    return x0, y0, min(x0 + side, page_rect.x1), min(y0 + side, page_rect.y1)
+
+
+def render_pdf_image(pdf_path, page_number, scale, fmt='png', quality=PDF_JPEG_QUALITY, tile=None):
+    """Rasterise a page, or one tile of it; None when the page or tile does not exist."""
+    import fitz
+    with ACT_DOCUMENTS.document(pdf_path) as doc:
+        if page_number > doc.page_count:
+            return None
+        page = doc.load_page(page_number - 1)
+        clip = None
+        if tile is not None:
+            clip = pdf_tile_clip(page.rect, scale, *tile)
+            if clip is None:
+                return None
+            clip = fitz.Rect(clip)
+        pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip, alpha=False)
+        return pix.tobytes('jpeg', jpg_quality=quality) if fmt == 'jpeg' else pix.tobytes('png')
+
+
+def pdf_render_key(pdf_path, page_number, scale, fmt='png', variant=''):
+    """Content-addressed cache key; it doubles as the response's strong ETag."""
+    key = f'{file_digest(pdf_path)[:24]}-p{page_number}-s{scale:g}-{fmt}'
+    return f'{key}-{variant}' if variant else key
+
+
+class RenderCache:
+    """Size-bounded LRU of rendered page bytes in memory, backed by a disk tier.
+
+    The disk tier lives in a temp directory, so on serverless hosts it only
+    survives for the lifetime of a warm instance; locally it survives
+    restarts. Both tiers evict least-recently-used entries past their budget.
+    """
+
+    DISK_PRUNE_TARGET = 0.9
+
+    def __init__(self, max_bytes, disk_dir=None, disk_max_bytes=0):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self.max_bytes = max_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+        self._disk_lock = threading.Lock()
+        self._disk_bytes = sum(size for _, size, _ in self._disk_files()) if self.disk_max_bytes else 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def _remember(self, key, data):
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        if len(data) > self.max_bytes:
+            return
+        self._entries[key] = data
+        self._bytes += len(data)
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+        data = self._read_disk(key)
+        with self._lock:
+            if data is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, data)
+            return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+        self._write_disk(key, data)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self.disk_dir / key
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except OSError:
+            return None
+
+    def _write_disk(self, key, data):
+        if not self.disk_dir or not self.disk_max_bytes:
+            return
+        try:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            path = self.disk_dir / key
+            tmp_path = self.disk_dir / f'.{key}.{os.getpid()}.{threading.get_ident()}.tmp'
+            tmp_path.write_bytes(data)
+            try:
+                replaced = path.stat().st_size
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+            with self._disk_lock:
+                self._disk_bytes += len(data) - replaced
+                if self._disk_bytes > self.disk_max_bytes:
+                    self._prune_disk()
+        except OSError as e:
+            print(f"[RenderCache] Disk write failed for {key}: {e}")
+
+    def _disk_files(self):
+        """[(mtime, size, path)] of the disk tier; one directory scan."""
+        if not self.disk_dir or not self.disk_dir.is_dir():
+            return []
+        files = []
+        for path in self.disk_dir.iterdir():
+            if path.name.startswith('.'):
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _prune_disk(self):
+        """Evict least-recently-used files down to DISK_PRUNE_TARGET of the budget.
+
+        Writes keep _disk_bytes as a running total, so the directory is only
+        scanned here, once the total passes disk_max_bytes; the scan also
+        corrects the total for files other processes added or removed.
+        Pruning below the budget leaves room for the next writes.
+        """
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        target = self.disk_max_bytes * self.DISK_PRUNE_TARGET
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        self._disk_bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = self.disk_hits = self.misses = self.not_modified = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'disk_bytes': self._disk_bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'not_modified': self.not_modified,
+            }
+
+
+PDF_RENDER_CACHE = RenderCache(PDF_RENDER_MEMORY_BYTES, PDF_RENDER_DISK_DIR, PDF_RENDER_DISK_BYTES)
+
+
+def cached_image_response(data, mimetype, download_name, etag):
+    response = send_file(BytesIO(data), mimetype=mimetype, download_name=download_name)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'public, max-age=604800'
+    return response
+
+
+def not_modified_response(etag, cache_control='public, max-age=604800'):
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+# ==================== HTTP CACHING ====================
+#
+# Quiz pages and JSON APIs are pure functions of the request URL, the bank
+# files they read and the app's code/templates, so a strong ETag over those
+# inputs lets revisits revalidate with a 304 before anything is loaded or
+# rendered. Compressible bodies are gzip- or brotli-encoded per
+# Accept-Encoding; bodies that carry an ETag are compressed once and cached.
+# Landing pages also keep their rendered HTML keyed by that ETag, so a
+# request whose banks are unchanged skips Jinja entirely.
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'text/html', 'text/css', 'text/plain', 'application/json', 'application/x-ndjson',
+    'application/javascript', 'text/javascript',
+})
+COMPRESS_MIN_BYTES = 1024
+COMPRESSED_BODY_CACHE_BYTES = 32 * 1024 * 1024
+COMPRESSED_BODIES = RenderCache(COMPRESSED_BODY_CACHE_BYTES)
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+TEMPLATES_DIR = BASE_DIR / 'templates'
+RENDERED_PAGE_CACHE_BYTES = 16 * 1024 * 1024
+RENDERED_PAGES = RenderCache(RENDERED_PAGE_CACHE_BYTES)
+PAGE_CACHE_ENV_VAR = 'QUIZ_PAGE_CACHE'
+
+
+def no_bank_paths(**_):
+    return []
+
+
+def all_bank_paths(**_):
+    return [MODULES_DIR / category / f'{module}.json'
+            for category in get_categories() for module in get_modules_in_category(category)]
+
+
+def module_bank_paths(category, module, **_):
+    path = resolve_module_path(unquote(category), unquote(module))
+    if path is None:
+        raise FileNotFoundError(f'{category}/{module}')
+    return [path]
+
+
+def fill_blank_bank_paths(category, module, **_):
+    module = unquote(module)
+    if 'Fill_In_The_Blank' not in module:
+        module = f'{module}_Fill_In_The_Blank'
+    return module_bank_paths(category, module)
+
+
+def cfrn_bank_paths(**_):
+    paths = [MODULES_DIR / 'Nursing_Certifications' / filename for filename in CFRN_DOMAIN_FILES.values()]
+    return [path for path in (*paths, CFRN_LEGACY_PATH) if path.exists()]
+
+
+def app_code_digest():
+    """Digest of this module and every template; any deploy that changes output changes it."""
+    digests = [file_digest(__file__)]
+    digests.extend(file_digest(path) for path in sorted(TEMPLATES_DIR.glob('*.html')))
+    return hashlib.sha256(''.join(digests).encode('ascii')).hexdigest()
+
+
+def response_etag(paths):
+    parts = [app_code_digest(), request.full_path, *(file_digest(path) for path in paths)]
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+
+def matching_etag(etag):
+    """The If-None-Match entry naming etag or one of its content-encoded variants, if any."""
+    if_none_match = request.if_none_match
+    for candidate in (etag, f'{etag}-gzip', f'{etag}-br'):
+        if if_none_match.contains(candidate):
+            return candidate
+    return None
+
+
+def quiz_request_is_deterministic():
+    """Quiz pages are cacheable unless sample_quiz_data() would draw a fresh random seed."""
+    quiz_length = request.args.get('quiz_length', '')
+    sampling = quiz_length.isdigit() and int(quiz_length) >= 1 and not request.args.get('filter')
+    return not sampling or parse_quiz_seed(request.args.get('seed')) is not None
+
+
+def page_cache_enabled():
+    """Rendered-page caching is on unless Flask debug is on or QUIZ_PAGE_CACHE is falsy."""
+    if app.debug:
+        return False
+    return os.environ.get(PAGE_CACHE_ENV_VAR, '').strip().lower() not in ('0', 'false', 'no', 'off')
+
+
+def cached_page_bytes(response):
+    """A rendered page as one cache value: the view's headers as a JSON line, then the body."""
+    headers = [(key, value) for key, value in response.headers.items() if key != 'Content-Length']
+    return json.dumps(headers, separators=(',', ':')).encode('utf-8') + b'\n' + response.get_data()
+
+
+def cached_page_response(data):
+    headers, _, body = data.partition(b'\n')
+    return app.response_class(body, headers=json.loads(headers))
+
+
+def conditional_get(banks=all_bank_paths, deterministic=None, body_cache=None):
+    """Tag 200 responses with a strong ETag over the banks they read; answer matches with 304.
+
+    banks(**view_args) returns the bank files the view depends on. When
+    deterministic() is False the view runs untouched. With a body_cache,
+    200 HTML bodies and the headers the view set are stored under their ETag
+    and served without calling the view until a bank, template or the URL
+    changes.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if deterministic is not None and not deterministic():
+                return view(*args, **kwargs)
+            try:
+                etag = response_etag(banks(**kwargs))
+            except OSError:
+                return view(*args, **kwargs)
+            matched = matching_etag(etag)
+            if matched:
+                return not_modified_response(matched, REVALIDATE_CACHE_CONTROL)
+            cache = body_cache if body_cache is not None and page_cache_enabled() else None
+            cached = cache.get(etag) if cache is not None else None
+            if cached is not None:
+                response = cached_page_response(cached)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                if (cache is not None and response.status_code == 200
+                        and response.mimetype == 'text/html' and not response.is_streamed):
+                    cache.put(etag, cached_page_bytes(response))
+            if response.status_code == 200 and not response.get_etag()[0]:
+                response.set_etag(etag)
+                response.headers.setdefault('Cache-Control', REVALIDATE_CACHE_CONTROL)
+            return response
+        return wrapper
+    return decorator
+
+
+def negotiate_encoding():
+    accept = request.accept_encodings
+    if brotli is not None and accept.quality('br') > 0:
+        return 'br'
+    if accept.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress_body(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=5)
+    return gzip.compress(data, compresslevel=6)
+
+
+@app.after_request
+def compress_response(response):
+    if (response.status_code != 200 or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding()
+    if encoding is None:
+        return response
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_BYTES:
+        return response
+    etag, weak = response.get_etag()
+    encoded = None
+    if etag and not weak:
+        cache_key = f'{etag}-{encoding}'
+        encoded = COMPRESSED_BODIES.get(cache_key)
+        if encoded is None:
+            encoded = compress_body(data, encoding)
+            COMPRESSED_BODIES.put(cache_key, encoded)
+        # Each encoding is a distinct representation, so it needs its own strong validator.
+        response.set_etag(cache_key)
+    else:
+        encoded = compress_body(data, encoding)
+    response.set_data(encoded)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# ==================== ACT PRE-RENDERED PAGES ====================
+#
+# The deployment's build step (scripts/build-act-page-images.py, run by
+# vercel.json's buildCommand) renders every image variant the viewer asks
+# for into static/rendered/act/ and records them in act-protocol-pages.json.
+# Both are build outputs and gitignored, so the manifest exists only where
+# the images do. The function bundle leaves the images out: pdf-info lists
+# their static URLs so the viewer loads them straight from the CDN, and
+# pdf-page redirects to them. Only PDFs changed since the build, and
+# variants outside this list, are rendered live.
+
+ACT_PAGE_MANIFEST_PATH = BASE_DIR / 'static/data/act-protocol-pages.json'
+PageRect = namedtuple('PageRect', 'x0 y0 x1 y1')
+ACT_PRERENDERED_VARIANTS = OrderedDict([
+    ('full', {'scale': 2.0, 'format': 'png'}),
+    ('preview', {'scale': 0.5, 'format': 'jpeg', 'quality': 50}),
+    ('tile', {'scale': 2.0, 'format': 'jpeg', 'quality': 80, 'tiles': True}),
+])
+
+
+def get_act_page_manifest():
+    """Pre-rendered page manifest (scripts/build-act-page-images.py) keyed by PDF web path."""
+    if not ACT_PAGE_MANIFEST_PATH.exists():
+        return {}
+    try:
+        return QUESTION_BANKS.derived(
+            ACT_PAGE_MANIFEST_PATH, 'by_file',
+            lambda path: {entry['file']: entry for entry in load_module_json(path).get('protocols', [])},
+        )
+    except Exception as e:
+        print(f"[ACT pages] Error reading {ACT_PAGE_MANIFEST_PATH}: {e}")
+        return {}
+
+
+def act_prerendered_entry(pdf_path):
+    """Manifest entry for pdf_path, or None if the PDF changed since it was rendered."""
+    web_path = '/' + pdf_path.relative_to(BASE_DIR.resolve()).as_posix()
+    entry = get_act_page_manifest().get(web_path)
+    if entry and entry.get('sha256') == file_digest(pdf_path):
+        return entry
+    return None
+
+
+def act_prerendered_name(page_number, scale, fmt='png', quality=None, tile=None):
+    variant = pdf_render_variant(fmt, quality, tile)
+    return f'page-{page_number}@{scale:g}x{"-" + variant if variant else ""}.{"jpg" if fmt == "jpeg" else "png"}'
+
+
+def act_prerendered_image(entry, page_number, scale, fmt='png', quality=None, tile=None):
+    """Web path of a pre-rendered page or tile, or None if the build did not render it."""
+    if not entry or page_number > entry['pageCount']:
+        return None
+    for variant in entry.get('variants', []):
+        if (variant['scale'] == scale and variant['format'] == fmt and variant.get('quality') in (None, quality)
+                and bool(variant.get('tiles')) == (tile is not None)):
+            if tile is not None:
+                size = entry['pages'][page_number - 1]
+                if pdf_tile_clip(PageRect(0, 0, size['width'], size['height']), scale, *tile) is None:
+                    return None
+            return f"{entry['imageDir']}/{act_prerendered_name(page_number, scale, fmt, variant.get('quality'), tile)}"
+    return None
+
+
+def act_prerendered_bytes(entry, page_number, scale, fmt='png'):
+    """Size the build recorded for a pre-rendered full page, or None."""
+    if not entry or page_number > entry['pageCount']:
+        return None
+    for variant in entry.get('variants', []):
+        if variant['scale'] == scale and variant['format'] == fmt and not variant.get('tiles'):
+            return entry['pages'][page_number - 1].get('bytes', {}).get(variant['name'])
+    return None
+
+
+def act_prerendered_urls(entry):
+    """{variant name: URL template with {page} (and {column}, {row} for tiles)}."""
+    urls = {}
+    for variant in (entry or {}).get('variants', []):
+        tile = ('{column}', '{row}') if variant.get('tiles') else None
+        name = act_prerendered_name('{page}', variant['scale'], variant['format'], variant.get('quality'), tile)
+        urls[variant['name']] = f"{quote(entry['imageDir'])}/{name}"
+    return urls
+
+
+# ==================== ACT TEXT SEARCH ====================
+#
+# /api/act/search ranks ACT protocol pages with a positional inverted index
+# over the page text in act-protocol-search.json: term -> [(page, positions)].
+# Page scores are BM25 over the query terms. A page that holds the query as an
+# exact phrase, or one of the medication aliases the query names (e.g. "ntg"
+# -> nitroglycerin), gets a phrase bonus; phrases are found by intersecting
+# positions. The ACT protocols page asks this endpoint for PDF text matches.
+# scripts/act_text_index.py writes the same index, sharded by the first
+# character of each term, under static/data/act-text-index/; the page falls
+# back to those shards offline and fetches only the ones for the terms typed.
+# ActTextIndex and the tokenizer live in api/_act_text.py, which the build
+# scripts import without loading this app.
+
+ACT_ALIASES_PATH = BASE_DIR / 'static/data/act-medication-aliases.json'
+ACT_SNIPPET_BEFORE = 55
+ACT_SNIPPET_AFTER = 95
+ACT_PAGES_PER_HIT = 3
+ACT_SEARCH_DEFAULT_LIMIT = 20
+ACT_SEARCH_MAX_LIMIT = 108
+
+
+def load_act_alias_phrases(path):
+    """Normalized alias -> token lists of every alias of the same medication."""
+    phrases = {}
+    for record in load_module_json(path):
+        aliases = {' '.join(search_tokens(alias)) for alias in record.get('normalizedAliases') or record.get('aliases', [])}
+        aliases.discard('')
+        names = [alias.split() for alias in sorted(aliases)]
+        for alias in aliases:
+            phrases.setdefault(alias, []).extend(names)
+    return phrases
+
+
+def get_act_text_index():
+    return QUESTION_BANKS.derived(
+        ACT_SEARCH_PATH, 'act_text_index', lambda path: ActTextIndex.build(load_module_json(path)))
+
+
+def get_act_alias_phrases():
+    if not ACT_ALIASES_PATH.exists():
+        return {}
+    return QUESTION_BANKS.derived(ACT_ALIASES_PATH, 'alias_phrases', load_act_alias_phrases)
+
+
+def act_page_snippet(text, position):
+    """Text around the position-th token of a page, trimmed like the client's snippets."""
+    for index, match in enumerate(SEARCH_TOKEN_RE.finditer(text.lower())):
+        if index == position:
+            start = match.start()
+            return f'… {text[max(0, start - ACT_SNIPPET_BEFORE):start + ACT_SNIPPET_AFTER]} …'
+    return text[:ACT_SNIPPET_BEFORE + ACT_SNIPPET_AFTER]
+
+
+@app.route('/api/act/search')
+def api_act_search():
+    """Rank ACT protocols by their PDF text.
+
+    Query parameters: q (required); category; limit (default 20), offset.
+    Each hit lists its best pages with a snippet around the first match.
+    """
+    try:
+        query = request.args.get('q', '').strip()
+        if not search_tokens(query):
+            return jsonify({'error': 'q must contain at least one searchable term'}), 400
+        try:
+            limit = min(int(request.args.get('limit', ACT_SEARCH_DEFAULT_LIMIT)), ACT_SEARCH_MAX_LIMIT)
+            offset = int(request.args.get('offset', 0))
+        except ValueError:
+            return jsonify({'error': 'Invalid limit or offset'}), 400
+        if limit < 1 or offset < 0:
+            return jsonify({'error': 'Invalid limit or offset'}), 400
+        category = request.args.get('category')
+        accept = (lambda protocol: protocol['category'] == category) if category else None
+
+        index = get_act_text_index()
+        phrases = get_act_alias_phrases().get(' '.join(search_tokens(query)), [])
+        ranked = index.rank_protocols(query, index.search(query, phrases, accept))
+
+        records = load_module_json(ACT_SEARCH_PATH)
+        hits = []
+        for protocol_index, score, pages in ranked[offset:offset + limit]:
+            texts = {page['page']: page.get('text', '') for page in records[protocol_index].get('pages', ())}
+            hits.append({
+                **index.protocols[protocol_index],
+                'score': round(score, 4),
+                'matchedPages': len(pages),
+                'pages': [{
+                    'page': index.pages[page_id][1],
+                    'score': round(score, 4),
+                    'snippet': act_page_snippet(texts.get(index.pages[page_id][1], ''), position),
+                } for score, page_id, position in pages[:ACT_PAGES_PER_HIT]],
+            })
+        return jsonify({'query': query, 'total': len(ranked), 'offset': offset, 'hits': hits})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+# ==================== ACT HIT HIGHLIGHTS ====================
+#
+# The ACT index builders record every word on a PDF page with its bounding
+# box (act_word_boxes) and scripts/act_word_index.py writes them as one
+# compact file per PDF under static/data/act-protocol-words/. Words are
+# [x0, y0, x1, y1, line, text] in PDF points on the displayed page; line
+# numbers the page's text lines. /act-protocols/pdf-highlights matches a
+# query against a page's word tokens and returns one rectangle per line of
+# each hit, so the viewer can scroll to and mark the dose line. A PDF that
+# changed since the build is read live instead. act_word_boxes and
+# act_word_index_path come from api/_act_text.py.
+
+ACT_HIGHLIGHT_MAX_MATCHES = 50
+
+
+class ActPageWords:
+    """One page's word boxes with its word tokens in reading order."""
+
+    def __init__(self, width, height, words):
+        self.width = width
+        self.height = height
+        self.words = words
+        self.tokens, self.owners, self.positions = [], [], {}
+        for index, word in enumerate(words):
+            for token in SEARCH_TOKEN_RE.findall(word[5].lower()):
+                self.positions.setdefault(token, []).append(len(self.tokens))
+                self.tokens.append(token)
+                self.owners.append(index)
+
+    def spans(self, phrases):
+        """Sorted (first word, last word) spans where a phrase occurs; spans inside another are dropped."""
+        found = set()
+        for phrase in phrases:
+            size = len(phrase)
+            for start in self.positions.get(phrase[0], ()) if phrase else ():
+                if self.tokens[start:start + size] == phrase:
+                    found.add((self.owners[start], self.owners[start + size - 1]))
+        kept = []
+        for first, last in sorted(found, key=lambda span: (span[0], -span[1])):
+            if kept and last <= kept[-1][1]:
+                continue
+            kept.append((first, last))
+        return kept
+
+    def rects(self, first, last):
+        """One [x0, y0, x1, y1] per text line covered by words first..last."""
+        by_line = {}
+        for x0, y0, x1, y1, line, _ in self.words[first:last + 1]:
+            box = by_line.get(line)
+            by_line[line] = [x0, y0, x1, y1] if box is None else [
+                min(box[0], x0), min(box[1], y0), max(box[2], x1), max(box[3], y1)]
+        return list(by_line.values())
+
+    def highlights(self, phrases, limit=ACT_HIGHLIGHT_MAX_MATCHES):
+        return [{
+            'text': ' '.join(word[5] for word in self.words[first:last + 1]),
+            'rects': self.rects(first, last),
+        } for first, last in self.spans(phrases)[:limit]]
+
+
+def load_act_word_index(path):
+    data = load_module_json(path)
+    return {
+        'sha256': data.get('sha256'),
+        'pages': {page['page']: ActPageWords(page['width'], page['height'], page['words'])
+                  for page in data.get('pages', [])},
+    }
+
+
+def act_page_words(pdf_path, page_number):
+    """ActPageWords for one page, or None if the PDF has no such page."""
+    index_path = act_word_index_path('/' + pdf_path.relative_to(BASE_DIR.resolve()).as_posix(), ACT_WORD_INDEX_DIR)
+    if index_path.exists():
+        entry = QUESTION_BANKS.derived(index_path, 'page_words', load_act_word_index)
+        if entry['sha256'] == file_digest(pdf_path):
+            return entry['pages'].get(page_number)
+    with ACT_DOCUMENTS.document(pdf_path) as doc:
+        if page_number > doc.page_count:
+            return None
+        boxes = act_word_boxes(doc.load_page(page_number - 1))
+    return ActPageWords(boxes['width'], boxes['height'], boxes['words'])
+
+
+@app.route('/act-protocols/pdf-highlights')
+def act_protocol_pdf_highlights():
+    """Highlight rectangles for q on one page of an ACT protocol PDF.
+
+    Query parameters: file, page (default 1), q. The query and the other
+    aliases of a medication it names are matched as phrases; if none occurs
+    on the page, each query term is highlighted on its own. Rectangles are in
+    PDF points; width and height give the page size to scale them by.
+    """
+    requested_file = request.args.get('file', '')
+    if not requested_file:
+        return act_protocol_pdf_error('Missing ACT protocol PDF file parameter.', 400)
+    pdf_path = resolve_act_protocol_pdf(requested_file)
+    if not pdf_path:
+        return act_protocol_pdf_error('Invalid ACT protocol PDF path.', 404)
+    try:
+        page_number = int(request.args.get('page', '1'))
+    except ValueError:
+        return act_protocol_pdf_error('Invalid page number.', 400)
+    if page_number < 1:
+        return act_protocol_pdf_error('Invalid page number.', 400)
+    query = request.args.get('q', '').strip()
+    tokens = search_tokens(query)
+    if not tokens:
+        return act_protocol_pdf_error('q must contain at least one searchable term.', 400)
+    try:
+        page = act_page_words(pdf_path, page_number)
+        if page is None:
+            return act_protocol_pdf_error('Page out of range.', 404)
+        mode = 'phrase'
+        matches = page.highlights([tokens, *get_act_alias_phrases().get(' '.join(tokens), [])])
+        if not matches and len(tokens) > 1:
+            mode = 'terms'
+            matches = page.highlights([[token] for token in dict.fromkeys(tokens)])
+        return jsonify({
+            'success': True,
+            'page': page_number,
+            'query': query,
+            'width': page.width,
+            'height': page.height,
+            'mode': mode,
+            'matches': matches,
+        })
+    except Exception as e:
+        print(f"Error reading ACT protocol PDF highlights: {e}")
+        return act_protocol_pdf_error('Unable to read ACT protocol PDF highlights.', 500)
+
+
+def act_pdf_info(pdf_path):
+    """The pdf-info body: page count, page sizes and tile size."""
+    entry = act_prerendered_entry(pdf_path)
+    if entry:
+        page_count = entry['pageCount']
+        pages = [{'width': page['width'], 'height': page['height']} for page in entry.get('pages', [])]
+    else:
+        with ACT_DOCUMENTS.document(pdf_path) as doc:
+            page_count = doc.page_count
+            pages = [{'width': round(page.rect.width, 2), 'height': round(page.rect.height, 2)} for page in doc]
+    return {'success': True, 'page_count': page_count, 'pageCount': page_count, 'pages': pages,
+            'tileSize': PDF_TILE_PIXELS, 'images': act_prerendered_urls(entry)}
+
+
+def pdf_render_variant(fmt, quality, tile):
+    return '-'.join(([f'q{quality}'] if fmt == 'jpeg' else []) + ([f't{tile[0]}-{tile[1]}'] if tile else []))
+
+
+def act_pdf_page_image(pdf_path, page_number, scale, fmt='png', quality=PDF_JPEG_QUALITY, tile=None):
+    """Image bytes of a page or tile: pre-rendered, cached or rendered now. None when out of range."""
+    entry = act_prerendered_entry(pdf_path)
+    if entry and page_number > entry['pageCount']:
+        return None
+    image_path = act_prerendered_image(entry, page_number, scale, fmt, quality, tile)
+    if image_path and (BASE_DIR / image_path.lstrip('/')).is_file():
+        return (BASE_DIR / image_path.lstrip('/')).read_bytes()
+    key = pdf_render_key(pdf_path, page_number, scale, fmt, pdf_render_variant(fmt, quality, tile))
+    image = PDF_RENDER_CACHE.get(key)
+    if image is None:
+        image = render_pdf_image(pdf_path, page_number, scale, fmt, quality, tile)
+        if image is not None:
+            PDF_RENDER_CACHE.put(key, image)
+    return image
+
+
 @app.route('/act-protocols/pdf-info')
 def act_protocol_pdf_info():
     requested_file = request.args.get('file', '')
@@ -543,9 +2594,7 @@ def act_protocol_pdf_info():
     if not pdf_path:
         return act_protocol_pdf_error('Invalid ACT protocol PDF path.', 404)
     try:
-        import fitz
-        with fitz.open(pdf_path) as doc:
-            return jsonify({'success': True, 'page_count': doc.page_count, 'pageCount': doc.page_count})
+        return jsonify(act_pdf_info(pdf_path))
     except Exception as e:
         print(f"Error reading ACT protocol PDF info: {e}")
         return act_protocol_pdf_error('Unable to read ACT protocol PDF.', 500)
@@ -553,6 +2602,12 @@ def act_protocol_pdf_info():
 
 @app.route('/act-protocols/pdf-page')
 def act_protocol_pdf_page():
+    """One rendered page image.
+
+    Query parameters: file, page, scale (0.5-3, default 2); format png
+    (default) or jpeg, with quality (20-95, default 75) for jpeg; tile
+    'column,row' renders only that PDF_TILE_PIXELS square of the page.
+    """
     requested_file = request.args.get('file', '')
     if not requested_file:
         return act_protocol_pdf_error('Missing ACT protocol PDF file parameter.', 400)
@@ -562,28 +2617,197 @@ def act_protocol_pdf_page():
     try:
         page_number = int(request.args.get('page', '1'))
         scale = float(request.args.get('scale', '2'))
+        quality = int(request.args.get('quality', PDF_JPEG_QUALITY))
+        tile = parse_pdf_tile(request.args.get('tile'))
     except ValueError:
-        return act_protocol_pdf_error('Invalid page or scale.', 400)
+        return act_protocol_pdf_error('Invalid page, scale, quality or tile.', 400)
     if page_number < 1:
         return act_protocol_pdf_error('Invalid page number.', 400)
-    scale = min(3.0, max(1.0, scale))
+    fmt = request.args.get('format', 'png').lower()
+    fmt = 'jpeg' if fmt == 'jpg' else fmt
+    if fmt not in PDF_IMAGE_MIMETYPES:
+        return act_protocol_pdf_error('Unsupported image format.', 400)
+    scale = quantize_pdf_scale(scale)
+    quality = quantize_jpeg_quality(quality)
     try:
-        import fitz
-        with fitz.open(pdf_path) as doc:
-            if page_number > doc.page_count:
-                return act_protocol_pdf_error('Page out of range.', 404)
-            page = doc.load_page(page_number - 1)
-            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
-            png = BytesIO(pix.tobytes('png'))
-            png.seek(0)
-            response = send_file(png, mimetype='image/png', download_name=f'{pdf_path.stem}-page-{page_number}.png')
-            response.headers['Cache-Control'] = 'public, max-age=604800'
-            return response
+        etag = pdf_render_key(pdf_path, page_number, scale, fmt, pdf_render_variant(fmt, quality, tile))
+        tile_name = f'-tile-{tile[0]}-{tile[1]}' if tile else ''
+        download_name = f'{pdf_path.stem}-page-{page_number}{tile_name}.{"jpg" if fmt == "jpeg" else "png"}'
+        mimetype = PDF_IMAGE_MIMETYPES[fmt]
+        if request.if_none_match.contains(etag):
+            PDF_RENDER_CACHE.record_not_modified()
+            return not_modified_response(etag)
+        entry = act_prerendered_entry(pdf_path)
+        image_path = act_prerendered_image(entry, page_number, scale, fmt, quality, tile)
+        if image_path:
+            return redirect(quote(image_path, safe='/@'))
+        image = act_pdf_page_image(pdf_path, page_number, scale, fmt, quality, tile)
+        if image is None:
+            return act_protocol_pdf_error('Page or tile out of range.', 404)
+        return cached_image_response(image, mimetype, download_name, etag)
     except Exception as e:
         print(f"Error rendering ACT protocol PDF page: {e}")
         return act_protocol_pdf_error('Unable to render ACT protocol PDF page.', 500)
 
 
+# ==================== ACT OFFLINE BUNDLES ====================
+#
+# Saving protocols offline used to take three kinds of request per protocol:
+# one for the PDF, one for pdf-info and one per page image, so hundreds for
+# the full set. /act-protocols/bundle returns all of that for a list of
+# protocols, or a whole category, as uncompressed tar parts. Each part's
+# first member, manifest.json, says which cache entry each later member
+# fills and carries the start token of the next part (null on the last).
+# A part stops before it would pass ACT_BUNDLE_MAX_BYTES, which keeps each
+# response under Vercel's 4.5 MB body limit and bounds how much one request
+# renders. Entries are sized before they are read where possible: PDFs by
+# stat, pre-rendered pages by the sizes the build recorded. Page images come
+# from the same path as pdf-page (pre-rendered, cached or rendered through
+# the document pool).
+
+ACT_BUNDLE_SCALE = 2.0
+ACT_BUNDLE_MANIFEST = 'manifest.json'
+ACT_BUNDLE_MAX_BYTES = 4 * 1024 * 1024
+
+
+def tar_member(name, data):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    return info.tobuf(format=tarfile.USTAR_FORMAT) + data + b'\0' * (-len(data) % tarfile.BLOCKSIZE)
+
+
+def act_bundle_entries(protocols):
+    """protocols: [(web path, pdf path, pdf-info body)] -> [(protocol index, entry)] in bundle order."""
+    entries = []
+    for number, (_, _, info) in enumerate(protocols):
+        prefix = f'{number:03d}'
+        entries.append((number, {'name': f'{prefix}/document.pdf', 'kind': 'pdf', 'contentType': 'application/pdf'}))
+        entries.append((number, {'name': f'{prefix}/info.json', 'kind': 'info', 'contentType': 'application/json'}))
+        entries.extend((number, {'name': f'{prefix}/page-{page}.png', 'kind': 'page', 'page': page,
+                                 'contentType': 'image/png'})
+                       for page in range(1, info['pageCount'] + 1))
+    return entries
+
+
+def act_bundle_entry_data(protocol, entry):
+    _, pdf_path, info = protocol
+    if entry['kind'] == 'pdf':
+        return pdf_path.read_bytes()
+    if entry['kind'] == 'info':
+        return json.dumps(info, separators=(',', ':')).encode('utf-8')
+    data = act_pdf_page_image(pdf_path, entry['page'], ACT_BUNDLE_SCALE)
+    if data is None:
+        raise ValueError(f'{pdf_path.name} has no page {entry["page"]}')
+    return data
+
+
+def act_bundle_entry_size(protocol, entry):
+    """Bytes an entry will take, when known without reading or rendering it."""
+    _, pdf_path, info = protocol
+    if entry['kind'] == 'pdf':
+        return pdf_path.stat().st_size
+    if entry['kind'] == 'info':
+        return len(json.dumps(info, separators=(',', ':')).encode('utf-8'))
+    return act_prerendered_bytes(act_prerendered_entry(pdf_path), entry['page'], ACT_BUNDLE_SCALE)
+
+
+def tar_member_size(size):
+    return tarfile.BLOCKSIZE + size + (-size % tarfile.BLOCKSIZE)
+
+
+class BundleMemberTooLarge(ValueError):
+    """One bundle entry is bigger than ACT_BUNDLE_MAX_BYTES on its own."""
+
+
+def act_bundle_part(protocols, start=0):
+    """Tar bytes of the part that begins at entry start.
+
+    An entry whose size is known up front (PDFs, pdf-info, pages the build
+    pre-rendered) is only read once it is known to fit; a page rendered live
+    is sized after rendering, and one that does not fit stays in
+    PDF_RENDER_CACHE for the next part. An entry that cannot fit in any part
+    raises BundleMemberTooLarge.
+    """
+    entries = act_bundle_entries(protocols)
+    members, records, size, next_start = [], {}, 0, None
+    for position in range(start, len(entries)):
+        number, entry = entries[position]
+        known = act_bundle_entry_size(protocols[number], entry)
+        if known is not None and tar_member_size(known) > ACT_BUNDLE_MAX_BYTES:
+            raise BundleMemberTooLarge(f'{entry["name"]} of {protocols[number][0]} is {known} bytes')
+        if known is not None and members and size + tar_member_size(known) > ACT_BUNDLE_MAX_BYTES:
+            next_start = position
+            break
+        member = tar_member(entry['name'], act_bundle_entry_data(protocols[number], entry))
+        if len(member) > ACT_BUNDLE_MAX_BYTES:
+            raise BundleMemberTooLarge(f'{entry["name"]} of {protocols[number][0]} is {len(member)} bytes')
+        if members and size + len(member) > ACT_BUNDLE_MAX_BYTES:
+            next_start = position
+            break
+        members.append(member)
+        size += len(member)
+        web_path, _, info = protocols[number]
+        records.setdefault(number, {'file': web_path, 'pageCount': info['pageCount'], 'entries': []})
+        records[number]['entries'].append(entry)
+    manifest = {'version': 2, 'scale': ACT_BUNDLE_SCALE, 'protocols': list(records.values()), 'next': next_start}
+    return b''.join([tar_member(ACT_BUNDLE_MANIFEST, json.dumps(manifest, separators=(',', ':')).encode('utf-8')),
+                     *members, b'\0' * (2 * tarfile.BLOCKSIZE)])
+
+
+@app.route('/act-protocols/bundle')
+def act_protocol_bundle():
+    """One part of an offline bundle of ACT protocols: PDFs, their pdf-info and scale-2 page images.
+
+    Query parameters: file (repeatable) or category (case-insensitive), and
+    start, the next token from the previous part's manifest. Listed files
+    that are not ACT protocol PDFs are a 404; a category skips protocols
+    whose PDF is missing; an entry too large for any part is a 413. The
+    response is a tar whose first member is manifest.json.
+    """
+    files = list(dict.fromkeys(request.args.getlist('file')))
+    category = request.args.get('category', '').strip()
+    start = request.args.get('start', '0')
+    if bool(files) == bool(category):
+        return act_protocol_pdf_error('Pass either file (repeatable) or category.', 400)
+    if not start.isdigit():
+        return act_protocol_pdf_error('start must be a non-negative integer.', 400)
+    allowed = get_act_protocol_allowlist()
+    if category:
+        listed = [p for p in load_module_json(ACT_PROTOCOLS_PATH)
+                  if p.get('category', '').casefold() == category.casefold()]
+        if not listed:
+            return act_protocol_pdf_error('Unknown ACT protocol category.', 404)
+        category = listed[0]['category']
+        files = [p['file'] for p in listed if p['file'] in allowed]
+    pdf_paths = []
+    for web_path in files:
+        pdf_path = resolve_act_protocol_pdf(web_path)
+        if not pdf_path:
+            return act_protocol_pdf_error(f'Invalid ACT protocol PDF path: {web_path}', 404)
+        pdf_paths.append((web_path if web_path in allowed else unquote(web_path), pdf_path))
+    try:
+        protocols = [(web_path, pdf_path, act_pdf_info(pdf_path)) for web_path, pdf_path in pdf_paths]
+    except Exception as e:
+        print(f"Error reading ACT protocol PDF info for bundle: {e}")
+        return act_protocol_pdf_error('Unable to read ACT protocol PDF.', 500)
+    start = int(start)
+    if start and start >= len(act_bundle_entries(protocols)):
+        return act_protocol_pdf_error('start is past the end of the bundle.', 400)
+    try:
+        body = act_bundle_part(protocols, start)
+    except BundleMemberTooLarge as e:
+        print(f"ACT protocol bundle entry over the part limit: {e}")
+        return act_protocol_pdf_error('A bundle entry is larger than the bundle part limit; save it on its own.', 413)
+    except Exception as e:
+        print(f"Error building ACT protocol bundle: {e}")
+        return act_protocol_pdf_error('Unable to build ACT protocol bundle.', 500)
+    name = category or (pdf_paths[0][1].stem if len(pdf_paths) == 1 else 'protocols')
+    name = re.sub(r'[^A-Za-z0-9_-]+', '-', name)
+    response = Response(body, mimetype='application/x-tar')
+    response.headers['Content-Disposition'] = f'attachment; filename="act-{name}.tar"'
+    return response
+
+
 @app.route('/paper-prompt-builder')
 def paper_prompt_builder():
     try:
@@ -592,7 +2816,29 @@ def paper_prompt_builder():
         print(f"Error in paper_prompt_builder route: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/')
+@conditional_get(no_bank_paths, body_cache=RENDERED_PAGES)
+def home():
+    try:
+        return render_template('home.html')
+    except Exception as e:
+        print(f"Error in home route: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/nurse-study-hub')
+@conditional_get(body_cache=RENDERED_PAGES)
+def nurse_study_hub():
+    try:
+        categories = get_categories()
+        return render_template('nurse-study-hub.html', categories=categories)
+    except Exception as e:
+        print(f"Error in nurse_study_hub route: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/category/<category>')
+@conditional_get(body_cache=RENDERED_PAGES)
 def category(category):
     try:
         category = unquote(category)
@@ -630,6 +2876,7 @@ def category(category):
                                    category_stats=category_stats,
                                    nclex_categories=NCLEX_CATEGORIES,
                                    total_questions=total_questions,
+                                   exam_length=NCLEX_EXAM_DEFAULT_LENGTH,
                                    quizzes=quizzes)
 
         if category == 'Lab_Values' and has_mc and has_fb:
@@ -658,6 +2905,7 @@ def category(category):
 
 
 @app.route('/category/NCLEX/category/<category_name>')
+@conditional_get(lambda **_: [NCLEX_MASTER_PATH], quiz_request_is_deterministic)
 def nclex_category_quiz(category_name):
     try:
         category_name = unquote(category_name)
@@ -665,8 +2913,8 @@ def nclex_category_quiz(category_name):
         if category_name not in NCLEX_CATEGORIES:
             return redirect(url_for('category', category='NCLEX'))
 
-        questions = load_nclex_master_questions()
-        filtered_questions = [q for q in questions if q.get('category') == category_name]
+        index = get_bank_index(NCLEX_MASTER_PATH)
+        filtered_questions = index.questions_in(category_name) if index else []
 
         if not filtered_questions:
             return redirect(url_for('category', category='NCLEX'))
@@ -675,6 +2923,7 @@ def nclex_category_quiz(category_name):
             'module': f'NCLEX_{category_name.replace(" ", "_")}',
             'questions': filtered_questions
         }
+        quiz_data, quiz_seed = sample_quiz_data(quiz_data)
 
         quiz_length = request.args.get('quiz_length', 'full')
         autostart = request.args.get('autostart', 'false').lower() == 'true'
@@ -687,7 +2936,8 @@ def nclex_category_quiz(category_name):
                                back_label='NCLEX Learning Page',
                                autostart=autostart,
                                is_category_quiz=True,
-                               quiz_length=quiz_length)
+                               quiz_length=quiz_length,
+                               quiz_seed=quiz_seed)
     except Exception as e:
         print(f"Error in nclex_category_quiz route: {e}")
         import traceback
@@ -695,7 +2945,52 @@ def nclex_category_quiz(category_name):
         return jsonify({'error': str(e)}), 500
 
 
+NCLEX_EXAM_DEFAULT_LENGTH = 85
+
+
+@app.route('/category/NCLEX/exam')
+@conditional_get(lambda **_: [NCLEX_MASTER_PATH], lambda: parse_quiz_seed(request.args.get('seed')) is not None)
+def nclex_exam():
+    """A quiz_length-question NCLEX exam weighted by the test plan, drawn server-side.
+
+    Only the selected questions are decoded and rendered; the same seed
+    always yields the same exam.
+    """
+    try:
+        index = get_bank_index(NCLEX_MASTER_PATH)
+        if index is None:
+            return redirect(url_for('category', category='NCLEX'))
+        quiz_length = request.args.get('quiz_length', '')
+        length = int(quiz_length) if quiz_length.isdigit() else NCLEX_EXAM_DEFAULT_LENGTH
+        length = max(1, min(length, index.size))
+        seed = parse_quiz_seed(request.args.get('seed'))
+        if seed is None:
+            seed = random.randrange(1, 2 ** 31)
+
+        positions = assemble_exam_positions(index.by_category, length, seed, NCLEX_CATEGORIES)
+        quiz_data = {
+            'module': 'NCLEX_Exam',
+            'questions': [index.question(position) for position in positions],
+            'total_questions': index.size,
+        }
+        autostart = request.args.get('autostart', 'false').lower() == 'true'
+
+        return render_template('quiz.html',
+                               quiz_data=quiz_data,
+                               module_name=f'NCLEX Exam - {len(positions)} Questions',
+                               category='NCLEX',
+                               back_url='/category/NCLEX',
+                               back_label='NCLEX Learning Page',
+                               autostart=autostart,
+                               quiz_length=str(len(positions)),
+                               quiz_seed=seed)
+    except Exception as e:
+        print(f"Error in nclex_exam route: {e}")
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/category/Nursing_Certifications/CCRN')
+@conditional_get(lambda **_: [CCRN_COMPREHENSIVE_PATH], body_cache=RENDERED_PAGES)
 def ccrn_page():
     try:
         category_stats = get_ccrn_category_stats()
@@ -710,6 +3005,7 @@ def ccrn_page():
 
 
 @app.route('/category/Nursing_Certifications/CCRN/category/<category_name>')
+@conditional_get(lambda **_: [CCRN_COMPREHENSIVE_PATH], quiz_request_is_deterministic)
 def ccrn_category_quiz(category_name):
     try:
         category_name = unquote(category_name)
@@ -717,8 +3013,8 @@ def ccrn_category_quiz(category_name):
         if category_name not in CCRN_CATEGORIES:
             return redirect(url_for('ccrn_page'))
 
-        questions = load_ccrn_comprehensive_questions()
-        filtered_questions = [q for q in questions if q.get('category') == category_name]
+        index = get_bank_index(CCRN_COMPREHENSIVE_PATH)
+        filtered_questions = index.questions_in(category_name) if index else []
 
         if not filtered_questions:
             return redirect(url_for('ccrn_page'))
@@ -727,6 +3023,7 @@ def ccrn_category_quiz(category_name):
             'module': f'CCRN_{category_name.replace(" ", "_").replace("/", "_")}',
             'questions': filtered_questions
         }
+        quiz_data, quiz_seed = sample_quiz_data(quiz_data)
 
         quiz_length = request.args.get('quiz_length', 'full')
         autostart = request.args.get('autostart', 'false').lower() == 'true'
@@ -739,7 +3036,8 @@ def ccrn_category_quiz(category_name):
                                back_label='CCRN Practice System',
                                autostart=autostart,
                                is_category_quiz=True,
-                               quiz_length=quiz_length)
+                               quiz_length=quiz_length,
+                               quiz_seed=quiz_seed)
     except Exception as e:
         print(f"Error in ccrn_category_quiz route: {e}")
         import traceback
@@ -748,27 +3046,23 @@ def ccrn_category_quiz(category_name):
 
 
 @app.route('/category/Nursing_Certifications/CFRN')
+@conditional_get(cfrn_bank_paths, body_cache=RENDERED_PAGES)
 def cfrn_page():
     try:
         category_stats = get_cfrn_category_stats()
         domain_totals, total_questions = get_cfrn_domain_totals()
-        response = render_template('cfrn.html',
-                                   category_stats=category_stats,
-                                   cfrn_categories=CFRN_CATEGORIES,
-                                   total_questions=total_questions,
-                                   domain_totals=domain_totals)
-        from flask import make_response
-        resp = make_response(response)
-        resp.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-        resp.headers['Pragma'] = 'no-cache'
-        resp.headers['Expires'] = '0'
-        return resp
+        return render_template('cfrn.html',
+                               category_stats=category_stats,
+                               cfrn_categories=CFRN_CATEGORIES,
+                               total_questions=total_questions,
+                               domain_totals=domain_totals)
     except Exception as e:
         print(f"Error in cfrn_page route: {e}")
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/category/Nursing_Certifications/CFRN/domain/<domain_name>')
+@conditional_get(cfrn_bank_paths, quiz_request_is_deterministic)
 def cfrn_domain_quiz(domain_name):
     try:
         domain_name = unquote(domain_name)
@@ -786,6 +3080,7 @@ def cfrn_domain_quiz(domain_name):
             'module': f'CFRN_{safe_name}',
             'questions': filtered_questions
         }
+        quiz_data, quiz_seed = sample_quiz_data(quiz_data)
 
         quiz_length = request.args.get('quiz_length', 'full')
         autostart = request.args.get('autostart', 'false').lower() == 'true'
@@ -798,7 +3093,8 @@ def cfrn_domain_quiz(domain_name):
                                back_label='CFRN Practice System',
                                autostart=autostart,
                                is_category_quiz=True,
-                               quiz_length=quiz_length)
+                               quiz_length=quiz_length,
+                               quiz_seed=quiz_seed)
     except Exception as e:
         print(f"Error in cfrn_domain_quiz route: {e}")
         import traceback
@@ -807,6 +3103,7 @@ def cfrn_domain_quiz(domain_name):
 
 
 @app.route('/category/Nursing_Certifications/CFRN/category/<category_name>')
+@conditional_get(cfrn_bank_paths, quiz_request_is_deterministic)
 def cfrn_category_quiz(category_name):
     try:
         category_name = unquote(category_name)
@@ -814,10 +3111,8 @@ def cfrn_category_quiz(category_name):
         if category_name not in CFRN_CATEGORIES:
             return redirect(url_for('cfrn_page'))
 
-        domain_name = category_name.split(';')[0].strip()
-
-        domain_questions = load_cfrn_domain_questions(domain_name)
-        filtered_questions = [q for q in domain_questions if q.get('category') == category_name]
+        index = get_cfrn_category_index(category_name)
+        filtered_questions = index.questions_in(category_name) if index else []
 
         if not filtered_questions:
             return redirect(url_for('cfrn_page'))
@@ -826,6 +3121,7 @@ def cfrn_category_quiz(category_name):
             'module': f'CFRN_{category_name.replace(" ", "_").replace(";", "").replace("/", "_")}',
             'questions': filtered_questions
         }
+        quiz_data, quiz_seed = sample_quiz_data(quiz_data)
 
         quiz_length = request.args.get('quiz_length', 'full')
         autostart = request.args.get('autostart', 'false').lower() == 'true'
@@ -839,7 +3135,8 @@ def cfrn_category_quiz(category_name):
                                back_label='CFRN Practice System',
                                autostart=autostart,
                                is_category_quiz=True,
-                               quiz_length=quiz_length)
+                               quiz_length=quiz_length,
+                               quiz_seed=quiz_seed)
     except Exception as e:
         print(f"Error in cfrn_category_quiz route: {e}")
         import traceback
@@ -848,24 +3145,16 @@ def cfrn_category_quiz(category_name):
 
 
 @app.route('/category/Adult_Health/module/comprehensive')
+@conditional_get(lambda **_: [ADULT_HEALTH_PATH], quiz_request_is_deterministic)
 def adult_health_comprehensive_quiz():
     try:
-        all_questions = load_adult_health_questions()
-        combined_questions = []
-        seen_ids = set()
-
-        for module_num in ADULT_HEALTH_MODULES.keys():
-            filtered = filter_adult_health_questions(all_questions, module_num)
-            for q in filtered:
-                q_id = q.get('id', q.get('stem', ''))
-                if q_id not in seen_ids:
-                    combined_questions.append(q)
-                    seen_ids.add(q_id)
+        combined_questions = get_adult_health_comprehensive_questions()
 
         if not combined_questions:
             return redirect(url_for('category', category='Adult_Health'))
 
         quiz_data = {'module': 'Adult_Health_Comprehensive', 'questions': combined_questions}
+        quiz_data, quiz_seed = sample_quiz_data(quiz_data)
         quiz_length = request.args.get('quiz_length', '10')
         autostart = request.args.get('autostart', 'false').lower() == 'true'
 
@@ -877,7 +3166,8 @@ def adult_health_comprehensive_quiz():
                                back_label='Adult Health',
                                autostart=autostart,
                                is_category_quiz=True,
-                               quiz_length=quiz_length)
+                               quiz_length=quiz_length,
+                               quiz_seed=quiz_seed)
     except Exception as e:
         print(f"Error in adult_health_comprehensive_quiz route: {e}")
         import traceback
@@ -886,19 +3176,20 @@ def adult_health_comprehensive_quiz():
 
 
 @app.route('/category/Adult_Health/module/<int:module_num>')
+@conditional_get(lambda **_: [ADULT_HEALTH_PATH], quiz_request_is_deterministic)
 def adult_health_module_quiz(module_num):
     try:
         if module_num not in ADULT_HEALTH_MODULES:
             return redirect(url_for('category', category='Adult_Health'))
 
-        questions = load_adult_health_questions()
-        filtered_questions = filter_adult_health_questions(questions, module_num)
+        filtered_questions = get_adult_health_module_questions(module_num)
 
         if not filtered_questions:
             return redirect(url_for('category', category='Adult_Health'))
 
         module_def = ADULT_HEALTH_MODULES[module_num]
         quiz_data = {'module': f'Adult_Health_Module_{module_num}', 'questions': filtered_questions}
+        quiz_data, quiz_seed = sample_quiz_data(quiz_data)
         quiz_length = request.args.get('quiz_length', '10')
         autostart = request.args.get('autostart', 'false').lower() == 'true'
 
@@ -910,7 +3201,8 @@ def adult_health_module_quiz(module_num):
                                back_label='Adult Health',
                                autostart=autostart,
                                is_category_quiz=True,
-                               quiz_length=quiz_length)
+                               quiz_length=quiz_length,
+                               quiz_seed=quiz_seed)
     except Exception as e:
         print(f"Error in adult_health_module_quiz route: {e}")
         import traceback
@@ -935,6 +3227,7 @@ def pharmacology_categories():
 
 
 @app.route('/quiz/<category>/<module>')
+@conditional_get(module_bank_paths, quiz_request_is_deterministic)
 def quiz(category, module):
     try:
         category = unquote(category)
@@ -954,12 +3247,14 @@ def quiz(category, module):
         if not module_path.exists():
             return redirect(url_for('category', category=category))
 
-        with open(module_path, 'r', encoding='utf-8') as f:
-            quiz_data = json.load(f)
+        quiz_data = load_module_json(module_path)
 
         if isinstance(quiz_data, list):
             quiz_data = {'questions': quiz_data}
 
+        is_nclex_master = category == 'NCLEX' and module == 'NCLEX_Comprehensive_Master_Categorized'
+        quiz_data, quiz_seed = sample_quiz_data(quiz_data, NCLEX_CATEGORIES if is_nclex_master else None)
+
         autostart = request.args.get('autostart', 'false').lower() == 'true'
         is_comprehensive = request.args.get('is_comprehensive', 'false').lower() == 'true'
         quiz_length = request.args.get('quiz_length', 'full')
@@ -992,13 +3287,15 @@ def quiz(category, module):
                                back_label=back_label,
                                autostart=autostart,
                                is_comprehensive=is_comprehensive,
-                               quiz_length=quiz_length)
+                               quiz_length=quiz_length,
+                               quiz_seed=quiz_seed)
     except Exception as e:
         print(f"Error in quiz route: {e}")
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/quiz-fill-blank/<category>/<module>')
+@conditional_get(fill_blank_bank_paths)
 def quiz_fill_blank(category, module):
     try:
         category = unquote(category)
@@ -1016,8 +3313,7 @@ def quiz_fill_blank(category, module):
         if not module_path.exists():
             return redirect(url_for('category', category=category))
 
-        with open(module_path, 'r', encoding='utf-8') as f:
-            quiz_data = json.load(f)
+        quiz_data = load_module_json(module_path)
 
         metadata = CATEGORY_METADATA.get(category, {})
         back_url = f'/category/{category}'
@@ -1051,6 +3347,7 @@ def quiz_fishbone_fill():
 
 
 @app.route('/api/categories')
+@conditional_get()
 def api_categories():
     try:
         categories_list = get_categories()
@@ -1071,6 +3368,7 @@ def api_categories():
 
 
 @app.route('/api/category/<category>/quizzes')
+@conditional_get()
 def api_category_quizzes(category):
     try:
         category = unquote(category)
@@ -1084,6 +3382,7 @@ def api_category_quizzes(category):
 
 
 @app.route('/api/nclex/category-stats')
+@conditional_get(lambda **_: [NCLEX_MASTER_PATH])
 def api_nclex_category_stats():
     try:
         stats = get_nclex_category_stats()
@@ -1093,6 +3392,7 @@ def api_nclex_category_stats():
 
 
 @app.route('/api/cfrn/count')
+@conditional_get(cfrn_bank_paths)
 def api_cfrn_count():
     try:
         return jsonify({'count': get_cfrn_valid_count()})
@@ -1101,6 +3401,7 @@ def api_cfrn_count():
 
 
 @app.route('/api/cfrn/domain-counts')
+@conditional_get(cfrn_bank_paths)
 def api_cfrn_domain_counts():
     try:
         domain_totals, grand_total = get_cfrn_domain_totals()
@@ -1113,6 +3414,7 @@ def api_cfrn_domain_counts():
 
 
 @app.route('/api/ccrn/count')
+@conditional_get(lambda **_: [CCRN_COMPREHENSIVE_PATH])
 def api_ccrn_count():
     try:
         return jsonify({'count': get_ccrn_valid_count()})
@@ -1120,6 +3422,446 @@ def api_ccrn_count():
         return jsonify({'error': str(e)}), 500
 
 
+QUESTION_PAGE_DEFAULT_LIMIT = 25
+QUESTION_PAGE_MAX_LIMIT = 200
+
+
+def project_question(question, fields=None, omit=()):
+    if fields:
+        projected = {key: question[key] for key in fields if key in question}
+        projected.setdefault('id', question.get('id'))
+    else:
+        projected = dict(question)
+    for key in omit:
+        projected.pop(key, None)
+    return projected
+
+
+def parse_field_list(value):
+    return [field.strip() for field in (value or '').split(',') if field.strip()]
+
+
+@app.route('/api/questions')
+@conditional_get()
+def api_questions():
+    """Serve a module's questions page by page, by id, or as streamed NDJSON.
+
+    Query parameters: category, module (required); question_category to narrow
+    to one category; ids to fetch specific questions (e.g. rationales once
+    answered); cursor/limit for paging; fields/omit for projection;
+    format=ndjson to stream everything from the cursor onward.
+    """
+    try:
+        category = request.args.get('category', '')
+        module = request.args.get('module', '')
+        module_path = resolve_module_path(category, module)
+        if not module_path:
+            return jsonify({'error': 'Module not found'}), 404
+        index = get_bank_index(module_path)
+        if index is None:
+            return jsonify({'error': 'Unable to read module'}), 500
+
+        fields = parse_field_list(request.args.get('fields'))
+        omit = parse_field_list(request.args.get('omit'))
+        try:
+            cursor = int(request.args.get('cursor', '0') or 0)
+            limit = int(request.args.get('limit', QUESTION_PAGE_DEFAULT_LIMIT))
+        except ValueError:
+            return jsonify({'error': 'Invalid cursor or limit'}), 400
+        if cursor < 0 or limit < 1:
+            return jsonify({'error': 'Invalid cursor or limit'}), 400
+        limit = min(limit, QUESTION_PAGE_MAX_LIMIT)
+
+        if request.args.get('ids'):
+            questions = index.questions_by_id(parse_field_list(request.args.get('ids')))
+            return jsonify({'questions': [project_question(q, fields, omit) for q in questions]})
+
+        question_category = request.args.get('question_category')
+        if question_category:
+            positions = index.by_category.get(question_category, [])
+        else:
+            positions = range(index.size)
+
+        if request.args.get('format') == 'ndjson':
+            def generate():
+                for position in positions[cursor:]:
+                    question = project_question(index.question(position), fields, omit)
+                    yield json.dumps(question, ensure_ascii=False) + '\n'
+            response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+            response.headers['X-Total-Count'] = str(len(positions))
+            return response
+
+        page = [index.question(position) for position in positions[cursor:cursor + limit]]
+        next_cursor = cursor + limit if cursor + limit < len(positions) else None
+        return jsonify({
+            'questions': [project_question(q, fields, omit) for q in page],
+            'total': len(positions),
+            'next_cursor': str(next_cursor) if next_cursor is not None else None,
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/next-questions', methods=['POST'])
+def api_next_questions():
+    """Return the next questions to study from a bank, scheduled by SM-2.
+
+    JSON body: category, module (required); history, the client's review log
+    as [[id, grade, reviewed_at], ...]; count (default 10, max 100); now
+    (epoch seconds, default server time); fields/omit for projection.
+    """
+    try:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({'error': 'Expected a JSON object body'}), 400
+        module_path = resolve_module_path(str(body.get('category', '')), str(body.get('module', '')))
+        if not module_path:
+            return jsonify({'error': 'Module not found'}), 404
+        try:
+            reviews = parse_review_history(body.get('history'))
+            count = int(body.get('count', NEXT_QUESTIONS_DEFAULT_COUNT))
+            now = float(body['now']) if body.get('now') is not None else time.time()
+        except (TypeError, ValueError) as e:
+            return jsonify({'error': str(e)}), 400
+        if count < 1:
+            return jsonify({'error': 'count must be at least 1'}), 400
+        count = min(count, NEXT_QUESTIONS_MAX_COUNT)
+
+        index = get_bank_index(module_path)
+        if index is None:
+            return jsonify({'error': 'Unable to read module'}), 500
+        schedule = get_review_schedule_index(module_path)
+        states = schedule.replay(reviews)
+        chosen, due_count = schedule.next_positions(states, count, now)
+
+        fields = parse_field_list(str(body.get('fields') or ''))
+        omit = parse_field_list(str(body.get('omit') or ''))
+        questions, slots = [], []
+        for position, kind in chosen:
+            question = index.question(position)
+            questions.append(project_question(question, fields, omit))
+            state = states.get(position)
+            slots.append({
+                'id': question.get('id'),
+                'state': kind,
+                'due': state.due if state else None,
+                'interval': state.interval if state else None,
+                'ease': round(state.ease, 2) if state else None,
+                'reps': state.reps if state else 0,
+            })
+        return jsonify({
+            'questions': questions,
+            'schedule': slots,
+            'counts': {
+                'due': due_count,
+                'reviewed': len(states),
+                'new': schedule.size - len(states),
+                'total': schedule.size,
+            },
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/cat/next', methods=['POST'])
+def api_cat_next():
+    """Score an adaptive test so far and pick its next question.
+
+    JSON body: exam (NCLEX or CFRN); responses, the answers so far as
+    [[id, correct], ...] in order; seed, which varies the pick among the
+    closest-difficulty items; min_items/max_items to shorten a practice run.
+    The reply carries the ability estimate, then either the next question or
+    done with a stop reason and pass/fail against the passing standard.
+    """
+    try:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({'error': 'Expected a JSON object body'}), 400
+        exam = CAT_EXAMS.get(str(body.get('exam', '')).upper())
+        if exam is None:
+            return jsonify({'error': f'exam must be one of {", ".join(CAT_EXAMS)}'}), 400
+        if not exam['path'].exists():
+            return jsonify({'error': 'Question bank not found'}), 404
+        exam = dict(exam)
+        try:
+            if body.get('max_items') is not None:
+                exam['max_items'] = max(1, min(int(body['max_items']), exam['max_items']))
+            if body.get('min_items') is not None:
+                exam['min_items'] = int(body['min_items'])
+            exam['min_items'] = max(1, min(exam['min_items'], exam['max_items']))
+            seed = int(body.get('seed', 0))
+        except (TypeError, ValueError):
+            return jsonify({'error': 'min_items, max_items and seed must be integers'}), 400
+
+        items = get_cat_item_index(exam['path'])
+        responses = body.get('responses') or []
+        if not isinstance(responses, list) or len(responses) > exam['max_items']:
+            return jsonify({'error': 'responses must be a list no longer than max_items'}), 400
+        administered, outcomes = [], []
+        for entry in responses:
+            if not isinstance(entry, list) or len(entry) != 2 or not isinstance(entry[1], bool):
+                return jsonify({'error': 'each response must be [id, correct]'}), 400
+            position = items.by_id.get(str(entry[0]))
+            if position is None:
+                return jsonify({'error': f'Unknown question id: {entry[0]}'}), 400
+            administered.append(position)
+            outcomes.append(entry[1])
+
+        theta, se = estimate_ability([items.difficulties[p] for p in administered], outcomes)
+        used = set(administered)
+        weights = exam['weights'] or Counter(category for category in items.category_of)
+        stop = cat_stop_reason(len(administered), theta, se, exam, len(items.ids) - len(used))
+        position = None
+        if stop is None:
+            category = items.next_category(weights, administered)
+            candidates = items.nearest(category, theta, used, CAT_RANDOMESQUE) if category is not None else []
+            if candidates:
+                position = random.Random(seed * 1000003 + len(administered)).choice(candidates)
+            else:
+                stop = 'pool_exhausted'
+
+        result = {
+            'ability': {'theta': round(theta, 3), 'se': round(se, 3), 'passing_theta': exam['passing_theta']},
+            'administered': len(administered),
+            'done': stop is not None,
+            'stop_reason': stop,
+            'result': None,
+            'question': None,
+        }
+        if stop is not None:
+            result['result'] = 'pass' if theta >= exam['passing_theta'] else 'fail'
+        else:
+            question = dict(get_bank_index(exam['path']).question(position))
+            question['difficulty'] = round(items.difficulties[position], 3)
+            result['question'] = question
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/grade', methods=['POST'])
+def api_grade():
+    """Grade a whole quiz submission against the module's answer keys.
+
+    JSON body: category, module (required); answers, {id: response}, where a
+    response is the chosen option letters (or indices) for select questions
+    and the text typed into each blank for fill-in-the-blank questions.
+    """
+    try:
+        body = request.get_json(silent=True)
+        if not isinstance(body, dict):
+            return jsonify({'error': 'Expected a JSON object body'}), 400
+        module_path = resolve_module_path(str(body.get('category', '')), str(body.get('module', '')))
+        if not module_path:
+            return jsonify({'error': 'Module not found'}), 404
+        answers = body.get('answers')
+        if not isinstance(answers, dict) or len(answers) > GRADE_MAX_ANSWERS:
+            return jsonify({'error': f'answers must be an object of at most {GRADE_MAX_ANSWERS} entries'}), 400
+
+        keys = get_answer_key_index(module_path)
+        results, ungraded = [], []
+        by_category = OrderedDict()
+        correct_count = 0
+        for question_id, response in answers.items():
+            graded = keys.grade(question_id, response)
+            if graded is None:
+                ungraded.append(question_id)
+                continue
+            correct, blanks = graded
+            result = {'id': question_id, 'correct': correct}
+            if blanks is not None:
+                result['blanks'] = blanks
+            results.append(result)
+            correct_count += correct
+            tally = by_category.setdefault(keys.categories[question_id] or 'Uncategorized', {'correct': 0, 'total': 0})
+            tally['correct'] += correct
+            tally['total'] += 1
+        return jsonify({
+            'results': results,
+            'score': {
+                'correct': correct_count,
+                'total': len(results),
+                'percent': round(100 * correct_count / len(results), 1) if results else None,
+            },
+            'by_category': by_category,
+            'ungraded': ungraded,
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+
+
+@app.route('/api/search')
+def api_search():
+    """Rank questions across every bank for a free-text query.
+
+    Query parameters: q (required); category/module to restrict to one bank;
+    question_category and book to filter on question fields; limit/offset for
+    paging; prefix=0 to disable type-ahead expansion of the last term.
+    """
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'error': 'Missing search query'}), 400
+    try:
+        limit = min(max(int(request.args.get('limit', SEARCH_DEFAULT_LIMIT)), 1), SEARCH_MAX_LIMIT)
+        offset = max(int(request.args.get('offset', 0)), 0)
+    except ValueError:
+        return jsonify({'error': 'Invalid limit or offset'}), 400
+    filters = {
+        0: request.args.get('category', ''),
+        1: request.args.get('module', ''),
+        3: request.args.get('question_category', ''),
+        4: request.args.get('book', ''),
+    }
+    filters = {slot: value for slot, value in filters.items() if value}
+    accept = (lambda doc: all(doc[slot] == value for slot, value in filters.items())) if filters else None
+    try:
+        started = time.perf_counter()
+        search_index = get_question_search_index()
+        total, hits = search_index.search(query, limit, offset, accept, prefix=request.args.get('prefix') != '0')
+        took_ms = (time.perf_counter() - started) * 1000
+        results = []
+        for score, (category, module, position, question_category, book) in hits:
+            question = get_bank_index(MODULES_DIR / category / f'{module}.json').question(position)
+            results.append({
+                'category': category,
+                'module': module,
+                'position': position,
+                'id': question.get('id'),
+                'stem': question.get('stem') or question.get('question'),
+                'question_category': question_category,
+                'book': book,
+                'score': round(score, 4),
+            })
+        return jsonify({'query': query, 'total': total, 'results': results, 'took_ms': round(took_ms, 2)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/cache-stats')
+def api_cache_stats():
+    try:
+        return jsonify({
+            'question_banks': QUESTION_BANKS.stats(),
+            'act_pdf_pages': PDF_RENDER_CACHE.stats(),
+            'act_pdf_documents': ACT_DOCUMENTS.stats(),
+            'compressed_bodies': COMPRESSED_BODIES.stats(),
+            'rendered_pages': RENDERED_PAGES.stats(),
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+# ==================== WARMUP ====================
+
+WARMUP_ENV_VAR = 'QUIZ_WARMUP'
+WARMUP_BANK_PATHS = (NCLEX_MASTER_PATH, CCRN_COMPREHENSIVE_PATH, CFRN_LEGACY_PATH, ADULT_HEALTH_PATH)
+_WARMUP_LOCK = threading.Lock()
+COLD_START = {
+    'import_seconds': None,
+    'first_request': None,
+    'warmup': None,
+}
+
+
+def warm_question_banks():
+    # Indexing maps the compiled artifact and reads only its header and record
+    # table; question records stay undecoded until a request selects them.
+    for path in WARMUP_BANK_PATHS:
+        get_bank_index(path)
+    get_cfrn_domain_indexes()
+    get_categories()
+
+
+def warm_templates():
+    for name in app.jinja_env.list_templates(extensions=['html']):
+        app.jinja_env.get_template(name)
+
+
+def warm_pymupdf():
+    import fitz  # noqa: F401
+
+
+WARMUP_STEPS = OrderedDict([
+    ('banks', warm_question_banks),
+    ('templates', warm_templates),
+    ('pymupdf', warm_pymupdf),
+    ('search', get_question_search_index),
+])
+
+
+def parse_warmup_steps(value):
+    """'1'/'true'/'all' selects every step; otherwise a comma-separated subset."""
+    value = (value or '').strip().lower()
+    if value in ('', '1', 'true', 'yes', 'all'):
+        return list(WARMUP_STEPS)
+    steps = [step.strip() for step in value.split(',') if step.strip()]
+    unknown = [step for step in steps if step not in WARMUP_STEPS]
+    if unknown:
+        raise ValueError(f"Unknown warmup step(s): {', '.join(unknown)}")
+    return steps
+
+
+def warm_up(steps=None, force=False):
+    """Run the selected warmup steps once per process and record their timing."""
+    steps = list(WARMUP_STEPS) if steps is None else steps
+    with _WARMUP_LOCK:
+        previous = COLD_START['warmup'] or {'steps': {}}
+        results = dict(previous['steps'])
+        started = time.perf_counter()
+        for name in steps:
+            if name in results and results[name]['ok'] and not force:
+                continue
+            step_started = time.perf_counter()
+            try:
+                WARMUP_STEPS[name]()
+                results[name] = {'ok': True}
+            except Exception as e:
+                print(f"[Warmup] Step {name} failed: {e}")
+                results[name] = {'ok': False, 'error': str(e)}
+            results[name]['seconds'] = round(time.perf_counter() - step_started, 4)
+        COLD_START['warmup'] = {
+            'steps': results,
+            'seconds': round(time.perf_counter() - started, 4),
+            'since_process_start': round(time.perf_counter() - PROCESS_STARTED_AT, 4),
+        }
+        return COLD_START['warmup']
+
+
+@app.before_request
+def record_first_request_start():
+    if COLD_START['first_request'] is None:
+        g.cold_request_started = time.perf_counter()
+
+
+@app.after_request
+def record_first_request_timing(response):
+    started = g.pop('cold_request_started', None)
+    if started is not None and COLD_START['first_request'] is None:
+        COLD_START['first_request'] = {
+            'path': request.path,
+            'seconds': round(time.perf_counter() - started, 4),
+            'since_process_start': round(time.perf_counter() - PROCESS_STARTED_AT, 4),
+        }
+    return response
+
+
+@app.route('/api/warmup')
+def api_warmup():
+    try:
+        steps = parse_warmup_steps(request.args.get('steps'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        warm_up(steps, force=request.args.get('force') == '1')
+        return jsonify({**COLD_START, 'cache': {'question_banks': QUESTION_BANKS.stats()}})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/modules')
 def modules():
     try:
@@ -1137,3 +3879,11 @@ def modules():
 def serve_images(filename):
     images_dir = BASE_DIR / 'images'
     return send_from_directory(images_dir, filename)
+
+
+COLD_START['import_seconds'] = round(time.perf_counter() - PROCESS_STARTED_AT, 4)
+if os.environ.get(WARMUP_ENV_VAR, '').strip().lower() not in ('', '0', 'false', 'no', 'off'):
+    try:
+        warm_up(parse_warmup_steps(os.environ[WARMUP_ENV_VAR]))
+    except ValueError as e:
+        print(f"[Warmup] Ignoring {WARMUP_ENV_VAR}: {e}")
@@ -0,0 +1,56 @@
+"""Single-pass medication alias matcher for the ACT index build scripts.
+
+Replaces compiling one regex per alias and rescanning each page per alias.
+Aliases are loaded into a character trie and matched in one scan of the
+text. A walk starts only where an alias may begin, meaning the previous
+character is not [a-z0-9]. A match is accepted only if the next character is
+also not [a-z0-9]. This is the same word-boundary rule as
+`(?<![a-z0-9])alias(?![a-z0-9])`, and overlapping matches are reported (e.g.
+both "calcium" and "calcium chloride").
+
+Text must already be normalize_text()'d: lower-case with single spaces. That
+makes a literal space in an alias equivalent to the old `\\s+`.
+"""
+from __future__ import annotations
+
+import re
+
+_END = object()
+
+
+def _is_word_char(ch: str) -> bool:
+    return ('a' <= ch <= 'z') or ('0' <= ch <= '9')
+
+
+class AliasMatcher:
+    def __init__(self, aliases):
+        self.trie = {}
+        for alias in aliases:
+            if not alias:
+                continue
+            node = self.trie
+            for ch in alias:
+                node = node.setdefault(ch, {})
+            node[_END] = alias
+        starts = ''.join(sorted(ch for ch in self.trie if ch is not _END))
+        self._starts = re.compile(rf'(?<![a-z0-9])[{re.escape(starts)}]') if starts else None
+
+    def finditer(self, text: str):
+        """Yield (start, end, alias) for every boundary-delimited alias occurrence."""
+        if self._starts is None:
+            return
+        length = len(text)
+        for candidate in self._starts.finditer(text):
+            node = self.trie
+            pos = candidate.start()
+            while pos < length:
+                node = node.get(text[pos])
+                if node is None:
+                    break
+                pos += 1
+                alias = node.get(_END)
+                if alias is not None and (pos == length or not _is_word_char(text[pos])):
+                    yield candidate.start(), pos, alias
+
+    def aliases_in(self, text: str) -> set[str]:
+        return {alias for _, _, alias in self.finditer(text)}
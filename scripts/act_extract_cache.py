@@ -0,0 +1,116 @@
+"""Shared PDF extraction runner for the ACT index build scripts.
+
+Per-PDF extraction results are cached under .cache/act-extract/, keyed by the
+PDF's SHA-256 and the calling script's extractor version, so a rebuild only
+re-extracts PDFs that changed. Cache misses run across a process pool.
+
+An extractor is a module-level function taking a PDF path (str) and returning
+a JSON-serialisable dict with 'pages' and a 'report' fragment; fragments are
+merged into the script's report with merge_report(). Results flagged
+'cacheable': False (e.g. OCR failed for lack of Tesseract) are retried next run.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+CACHE_DIR = ROOT / '.cache/act-extract'
+
+
+def sha256_file(path: Path) -> str:
+    return hashlib.sha256(Path(path).read_bytes()).hexdigest()
+
+
+def cache_path(version: str, digest: str) -> Path:
+    return CACHE_DIR / version / f'{digest}.json'
+
+
+def read_cached(version: str, digest: str):
+    try:
+        return json.loads(cache_path(version, digest).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return None
+
+
+def write_cached(version: str, digest: str, result: dict) -> None:
+    path = cache_path(version, digest)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    tmp_path.write_text(json.dumps(result), encoding='utf-8')
+    os.replace(tmp_path, path)
+
+
+def _run_timed(extractor, path: str):
+    started = time.perf_counter()
+    try:
+        result, error = extractor(path), None
+    except Exception as exc:
+        result, error = None, str(exc)
+    return result, error, time.perf_counter() - started
+
+
+def extract_all(paths, extractor, version: str, workers: int | None = None, use_cache: bool = True):
+    """Extract every PDF in paths, reusing cached results for unchanged files.
+
+    Returns (results, timings): results maps each path to the extractor's dict,
+    or to {'error': message} when extraction failed; timings lists one
+    {'file', 'seconds', 'cached', 'pages'} entry per path in input order.
+    """
+    paths = [Path(p) for p in paths]
+    digests = {path: sha256_file(path) for path in paths}
+    results, seconds, cached = {}, {}, set()
+    pending = []
+    for path in paths:
+        hit = read_cached(version, digests[path]) if use_cache else None
+        if hit is not None:
+            results[path] = hit
+            seconds[path] = 0.0
+            cached.add(path)
+        else:
+            pending.append(path)
+
+    workers = workers if workers is not None else (os.cpu_count() or 1)
+    if workers > 1 and len(pending) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            outcomes = pool.map(_run_timed, [extractor] * len(pending), [str(p) for p in pending])
+            outcomes = list(outcomes)
+    else:
+        outcomes = [_run_timed(extractor, str(p)) for p in pending]
+
+    for path, (result, error, elapsed) in zip(pending, outcomes):
+        seconds[path] = elapsed
+        if error is not None:
+            results[path] = {'error': error}
+            continue
+        results[path] = result
+        if use_cache and result.get('cacheable', True):
+            write_cached(version, digests[path], result)
+
+    timings = [{
+        'file': '/' + path.relative_to(ROOT).as_posix(),
+        'seconds': round(seconds[path], 4),
+        'cached': path in cached,
+        'pages': len(results[path].get('pages', [])),
+    } for path in paths]
+    return results, timings
+
+
+def merge_report(report: dict, fragment: dict) -> None:
+    """Fold a per-file report fragment into the build report (lists extend, counts add)."""
+    for key, value in fragment.items():
+        if isinstance(value, list):
+            report.setdefault(key, []).extend(value)
+        elif isinstance(value, (int, float)):
+            report[key] = report.get(key, 0) + value
+
+
+def add_worker_args(parser) -> None:
+    parser.add_argument('--workers', type=int, default=None,
+                        help='extraction processes (default: CPU count; 1 runs serially)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='ignore and do not write the per-PDF extraction cache')
@@ -0,0 +1,83 @@
+"""Sharded offline copy of the ACT positional text index.
+
+Writes static/data/act-text-index/: meta.json (protocols, pages and the
+shard list) plus one terms-<c>.json shard per leading character of the
+indexed terms. A shard maps term -> [[page id, first position, gap, gap, ...],
+...]: positions are delta-encoded token offsets within the page. An offline
+client loads meta.json once and then only the shards for the terms typed,
+so search cost no longer grows with the total PDF text.
+
+The index itself is api._act_text.ActTextIndex, the one /api/act/search uses.
+Both ACT index builders call write_text_index() after writing
+act-protocol-search.json; run this module directly to rebuild the shards
+from the committed JSON.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import shutil
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from api._act_text import ACT_SEARCH_PATH, ACT_TEXT_INDEX_DIR, ActTextIndex  # noqa: E402
+
+FORMAT_VERSION = 1
+
+
+def shard_name(term: str) -> str:
+    return f'terms-{term[0]}.json'
+
+
+def encode_postings(postings) -> list:
+    encoded = []
+    for page_id, positions in postings:
+        gaps = [positions[0], *(b - a for a, b in zip(positions, positions[1:]))]
+        encoded.append([page_id, *gaps])
+    return encoded
+
+
+def render_text_index(records, source_sha256: str) -> dict[str, str]:
+    """{file name: JSON text} for every file of the sharded index."""
+    index = ActTextIndex.build(records)
+    shards = {}
+    for term in index.vocabulary:
+        shards.setdefault(shard_name(term), {})[term] = encode_postings(index.postings[term])
+    meta = {
+        'version': FORMAT_VERSION,
+        'sourceSha256': source_sha256,
+        'protocols': index.protocols,
+        'pages': [list(page) for page in index.pages],
+        'averagePageLength': round(index.average_length, 3),
+        'termCount': len(index.vocabulary),
+        'shards': {name: len(terms) for name, terms in sorted(shards.items())},
+    }
+    files = {'meta.json': json.dumps(meta, separators=(',', ':')) + '\n'}
+    for name, terms in shards.items():
+        files[name] = json.dumps(terms, separators=(',', ':')) + '\n'
+    return files
+
+
+def current_files() -> dict[str, str]:
+    source = ACT_SEARCH_PATH.read_bytes()
+    return render_text_index(json.loads(source), hashlib.sha256(source).hexdigest())
+
+
+def write_text_index(out_dir: Path = ACT_TEXT_INDEX_DIR) -> int:
+    files = current_files()
+    if out_dir.exists():
+        shutil.rmtree(out_dir)
+    out_dir.mkdir(parents=True)
+    for name, text in files.items():
+        (out_dir / name).write_text(text, encoding='utf-8')
+    total = sum(len(text.encode('utf-8')) for text in files.values())
+    print(f'Wrote {len(files) - 1} shards and meta.json to {out_dir.relative_to(ROOT)} ({total / 1e3:.0f} KB)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(write_text_index())
@@ -0,0 +1,66 @@
+"""Per-PDF word bounding boxes for ACT hit highlighting.
+
+Both ACT index builders record each page's words with act_word_boxes() during
+extraction and pass them to write_word_index(). That writes one file per
+PDF under static/data/act-protocol-words/, mirroring static/protocols/act/:
+
+  {"version": 1, "file": web path, "sha256": PDF digest,
+   "pages": [{"page", "width", "height", "words": [[x0, y0, x1, y1, line, text], ...]}]}
+
+The boxes stay out of act-protocol-search.json and the text index shards.
+/act-protocols/pdf-highlights loads the file for the PDF being viewed and
+ignores it once the PDF's digest changes.
+"""
+from __future__ import annotations
+
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+# api/_act_text.py owns the extraction and the file layout: /act-protocols/pdf-highlights
+# reads a PDF changed since the build live with the same act_word_boxes().
+from api._act_text import ACT_WORD_INDEX_DIR, act_word_boxes, act_word_index_path  # noqa: E402,F401
+
+FORMAT_VERSION = 1
+
+
+def split_word_boxes(pages: list[dict]) -> tuple[list[dict], list[dict]]:
+    """Split extracted pages into (search pages, word-box pages)."""
+    search_pages, box_pages = [], []
+    for page in pages:
+        box_pages.append({'page': page['page'], 'width': page.get('width'), 'height': page.get('height'),
+                          'words': page.get('words', [])})
+        search_pages.append({k: v for k, v in page.items() if k not in {'width', 'height', 'words'}})
+    return search_pages, box_pages
+
+
+def render_word_index(file: str, sha256: str, pages: list[dict]) -> str:
+    # One page per line keeps diffs of a re-extracted PDF readable.
+    rows = ',\n'.join(json.dumps(page, separators=(',', ':')) for page in pages)
+    head = json.dumps({'version': FORMAT_VERSION, 'file': file, 'sha256': sha256}, separators=(',', ':'))[:-1]
+    return f'{head},"pages":[\n{rows}\n]}}\n'
+
+
+def write_word_index(entries: list[dict], out_dir: Path = ACT_WORD_INDEX_DIR) -> int:
+    """entries: [{'file', 'sha256', 'pages'}]. Files of PDFs no longer listed are removed."""
+    written = set()
+    total = 0
+    for entry in entries:
+        path = act_word_index_path(entry['file'], out_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        text = render_word_index(entry['file'], entry['sha256'], entry['pages'])
+        path.write_text(text, encoding='utf-8')
+        written.add(path)
+        total += len(text.encode('utf-8'))
+    if out_dir.exists():
+        for stale in out_dir.rglob('*.json'):
+            if stale not in written:
+                stale.unlink()
+    words = sum(len(page['words']) for entry in entries for page in entry['pages'])
+    print(f'Wrote word boxes for {len(entries)} PDFs ({words} words, {total / 1e6:.1f} MB) '
+          f'to {out_dir.relative_to(ROOT) if out_dir.is_relative_to(ROOT) else out_dir}')
+    return 0
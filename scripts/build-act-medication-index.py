@@ -6,11 +6,15 @@ Outputs:
 - static/data/act-medication-aliases.json
 - static/data/act-protocol-search.json
 - static/data/act-protocol-search-report.json
+- static/data/act-protocol-words/ (per-page word bounding boxes)
 """
 from __future__ import annotations
 
+import argparse
 import json
 import re
+import sys
+import time
 from collections import defaultdict
 from datetime import datetime, timezone
 from pathlib import Path
@@ -22,6 +26,12 @@ ALIASES_OUT = ROOT / 'static/data/act-medication-aliases.json'
 SEARCH_OUT = ROOT / 'static/data/act-protocol-search.json'
 REPORT_OUT = ROOT / 'static/data/act-protocol-search-report.json'
 LITTLE_TEXT_CHARS = 40
+EXTRACTOR_VERSION = f'medication-v2-{LITTLE_TEXT_CHARS}'
+
+# Sibling modules, then api._act_text (via act_word_index and act_text_index).
+for path in (ROOT / 'scripts', ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
 
 try:
     import fitz  # PyMuPDF
@@ -31,6 +41,11 @@ except Exception as exc:  # pragma: no cover - depends on local environment
 else:
     FITZ_IMPORT_ERROR = None
 
+from act_alias_matcher import AliasMatcher
+from act_extract_cache import add_worker_args, extract_all, merge_report, sha256_file
+from act_text_index import write_text_index
+from act_word_index import act_word_boxes, split_word_boxes, write_word_index
+
 PUNCT_TRANSLATION = str.maketrans({
     '\u2010': '-', '\u2011': '-', '\u2012': '-', '\u2013': '-', '\u2014': '-', '\u2212': '-',
     '\u2018': "'", '\u2019': "'", '\u201c': '"', '\u201d': '"', '\u00a0': ' ',
@@ -117,14 +132,6 @@ def unique(values):
     return out
 
 
-def alias_regex(alias: str) -> re.Pattern:
-    normalized = normalize_text(alias)
-    if not normalized:
-        return re.compile(r'a^')
-    escaped = re.escape(normalized).replace(r'\ ', r'\s+')
-    return re.compile(rf'(?<![a-z0-9]){escaped}(?![a-z0-9])')
-
-
 def web_to_local(web_path: str) -> Path:
     return ROOT / web_path.lstrip('/')
 
@@ -165,17 +172,26 @@ def extract_pages(path: Path, report: dict) -> list[dict]:
             possible_scanned = len(text) < LITTLE_TEXT_CHARS
             if possible_scanned:
                 report['pagesWithLittleOrNoText'].append({'file': '/' + str(path.relative_to(ROOT)), 'page': page_number})
-            pages.append({'page': page_number, 'text': text, 'possibleScannedPage': possible_scanned})
+            pages.append({'page': page_number, 'text': text, 'possibleScannedPage': possible_scanned,
+                          **act_word_boxes(page)})
     return pages
 
 
-def find_medications(text: str, medications: list[dict]) -> list[tuple[dict, list[str]]]:
+def extract_file(path: str) -> dict:
+    fragment = {'pagesWithLittleOrNoText': [], 'warnings': []}
+    pages = extract_pages(Path(path), fragment)
+    return {'pages': pages, 'report': fragment}
+
+
+def build_alias_matcher(medications: list[dict]) -> AliasMatcher:
+    return AliasMatcher(alias for medication in medications for alias in medication['normalizedAliases'])
+
+
+def find_medications(text: str, medications: list[dict], matcher: AliasMatcher | None = None) -> list[tuple[dict, list[str]]]:
+    found_aliases = (matcher or build_alias_matcher(medications)).aliases_in(text)
     found = []
     for medication in medications:
-        matched = []
-        for alias in medication['normalizedAliases']:
-            if alias_regex(alias).search(text):
-                matched.append(alias)
+        matched = [alias for alias in medication['normalizedAliases'] if alias in found_aliases]
         if matched:
             found.append((medication, sorted(set(matched))))
     return found
@@ -197,13 +213,15 @@ def page_ranges(pages: list[int]) -> str:
     return ', '.join(ranges)
 
 
-def build():
+def build(workers: int | None = None, use_cache: bool = True):
     manifest = json.loads(MANIFEST.read_text(encoding='utf-8'))
     medications = build_seed_records()
+    matcher = build_alias_matcher(medications)
     by_key = {m['canonicalKey']: m for m in medications}
     found_by_med = {m['canonicalKey']: {'protocols': {}, 'matchedAliases': set()} for m in medications}
     manifest_by_normalized_id = {normalize_id(p['id']): p['id'] for p in manifest}
     search_records = []
+    word_entries = []
     report = {
         'generatedAt': datetime.now(timezone.utc).isoformat(),
         'totalProtocolsInManifest': len(manifest),
@@ -218,10 +236,20 @@ def build():
         'medicationsDetected': [],
         'protocolsWithMedicationMatches': [],
         'warnings': [],
+        'extractionSeconds': 0,
+        'cachedPdfCount': 0,
+        'fileTimings': [],
     }
     if fitz is None:
         report['warnings'].append(f'PyMuPDF import failed: {FITZ_IMPORT_ERROR}. JSON outputs will contain seed aliases but no PDF matches.')
 
+    started = time.perf_counter()
+    present = [web_to_local(p['file']) for p in manifest if web_to_local(p['file']).exists()]
+    extracted, timings = extract_all(present, extract_file, EXTRACTOR_VERSION, workers, use_cache and fitz is not None)
+    report['extractionSeconds'] = round(time.perf_counter() - started, 3)
+    report['cachedPdfCount'] = sum(1 for timing in timings if timing['cached'])
+    report['fileTimings'] = timings
+
     for protocol in manifest:
         local_path = web_to_local(protocol['file'])
         missing = not local_path.exists()
@@ -231,18 +259,19 @@ def build():
             report['missingPdfs'].append({'id': protocol['id'], 'title': protocol['title'], 'file': protocol['file']})
         else:
             report['totalPdfsFound'] += 1
-            try:
-                pages = extract_pages(local_path, report)
-            except Exception as exc:
-                report['warnings'].append(f'Failed extracting {protocol["file"]}: {exc}')
+            result = extracted[local_path]
+            if 'error' in result:
+                report['warnings'].append(f'Failed extracting {protocol["file"]}: {result["error"]}')
+            else:
+                pages, word_pages = split_word_boxes(result['pages'])
+                word_entries.append({'file': protocol['file'], 'sha256': sha256_file(local_path), 'pages': word_pages})
+                merge_report(report, result['report'])
         report['totalPagesScanned'] += len(pages)
         normalized_text = normalize_text(' '.join(page['text'] for page in pages))
         detected = []
-        for medication, aliases in find_medications(normalized_text, medications):
-            page_nums = []
-            for page in pages:
-                if any(alias_regex(alias).search(page['text']) for alias in aliases):
-                    page_nums.append(page['page'])
+        page_aliases = [matcher.aliases_in(page['text']) for page in pages]
+        for medication, aliases in find_medications(normalized_text, medications, matcher):
+            page_nums = [page['page'] for page, found in zip(pages, page_aliases) if found.intersection(aliases)]
             pages_sorted = sorted(set(page_nums))
             detected.append({
                 'canonical': medication['canonical'],
@@ -326,6 +355,10 @@ def build():
     print(f'Wrote {ALIASES_OUT.relative_to(ROOT)}')
     print(f'Wrote {SEARCH_OUT.relative_to(ROOT)}')
     print(f'Wrote {REPORT_OUT.relative_to(ROOT)}')
+    write_text_index()
+    if fitz is not None:
+        write_word_index(word_entries)
+    print(f'Extracted {len(timings) - report["cachedPdfCount"]} PDFs, {report["cachedPdfCount"]} from cache, in {report["extractionSeconds"]}s')
     if report['warnings']:
         print('Warnings:')
         for warning in report['warnings'][:10]:
@@ -333,4 +366,7 @@ def build():
 
 
 if __name__ == '__main__':
-    build()
+    parser = argparse.ArgumentParser(description='Build ACT protocol medication search indexes.')
+    add_worker_args(parser)
+    args = parser.parse_args()
+    build(workers=args.workers, use_cache=not args.no_cache)
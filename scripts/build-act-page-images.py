@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""Pre-render ACT protocol PDF pages to static images at build time.
+
+Renders every variant in api.index.ACT_PRERENDERED_VARIANTS (the scale-2 PNG
+that "save offline" stores, the viewer's 0.5-scale JPEG preview and its
+512 px scale-2 JPEG tiles) under static/rendered/act/, and writes a manifest
+(static/data/act-protocol-pages.json) recording each PDF's SHA-256, page
+count, page sizes, variants and the byte size of each full-page image, which
+/act-protocols/bundle uses to size its parts. vercel.json runs this as the
+deployment's buildCommand. pdf-info lists the images' static URLs for the viewer and
+pdf-page redirects to them, falling back to live rendering only for PDFs whose
+digest no longer matches.
+
+Unchanged PDFs (same digest and variants, images present) are skipped, so
+re-running after adding a protocol only renders the new file. Pass --force to
+re-render all.
+"""
+from __future__ import annotations
+
+import argparse, hashlib, json, sys, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from api.index import ACT_PRERENDERED_VARIANTS, act_prerendered_name, pdf_tile_clip  # noqa: E402
+
+MANIFEST = ROOT / 'static/data/act-protocols.json'
+PAGES_OUT = ROOT / 'static/data/act-protocol-pages.json'
+RENDER_DIR = ROOT / 'static/rendered/act'
+FORMAT_VERSION = 3
+
+try:
+    import fitz  # PyMuPDF
+except Exception as exc:  # pragma: no cover - environment dependent
+    fitz = None
+    FITZ_IMPORT_ERROR = exc
+else:
+    FITZ_IMPORT_ERROR = None
+
+
+def web_to_local(web_path: str) -> Path:
+    return ROOT / web_path.lstrip('/')
+
+
+def image_dir_for(web_path: str) -> Path:
+    relative = Path(web_path.lstrip('/')).relative_to('static/protocols/act')
+    return RENDER_DIR / relative.parent / relative.stem
+
+
+def sha256_file(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def variant_list() -> list[dict]:
+    return [{'name': name, **spec} for name, spec in ACT_PRERENDERED_VARIANTS.items()]
+
+
+def page_tiles(rect, scale: float):
+    """(column, row) of every tile that lies on the page."""
+    tiles, row = [], 0
+    while pdf_tile_clip(rect, scale, 0, row):
+        column = 0
+        while pdf_tile_clip(rect, scale, column, row):
+            tiles.append((column, row))
+            column += 1
+        row += 1
+    return tiles
+
+
+def image_names(page: int, rect, variant: dict) -> list[str]:
+    args = (variant['scale'], variant['format'], variant.get('quality'))
+    if variant.get('tiles'):
+        return [act_prerendered_name(page, *args, tile) for tile in page_tiles(rect, variant['scale'])]
+    return [act_prerendered_name(page, *args)]
+
+
+def is_current(entry: dict | None, digest: str, variants, out_dir: Path) -> bool:
+    if not entry or entry.get('sha256') != digest or entry.get('variants') != variants:
+        return False
+    return all((out_dir / image_name).exists()
+               for number, size in enumerate(entry['pages'], 1)
+               for variant in variants
+               for image_name in image_names(number, fitz.Rect(0, 0, size['width'], size['height']), variant))
+
+
+def render_pdf(path: Path, out_dir: Path, variants) -> tuple[list, int]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    pages, written = [], 0
+    with fitz.open(path) as doc:
+        for page in doc:
+            sizes = {}
+            pages.append({'width': round(page.rect.width, 2), 'height': round(page.rect.height, 2), 'bytes': sizes})
+            for variant in variants:
+                scale, fmt = variant['scale'], variant['format']
+                matrix = fitz.Matrix(scale, scale)
+                tiles = page_tiles(page.rect, scale) if variant.get('tiles') else [None]
+                for tile in tiles:
+                    clip = fitz.Rect(pdf_tile_clip(page.rect, scale, *tile)) if tile else None
+                    pix = page.get_pixmap(matrix=matrix, clip=clip, alpha=False)
+                    data = pix.tobytes('jpeg', jpg_quality=variant['quality']) if fmt == 'jpeg' else pix.tobytes('png')
+                    name = act_prerendered_name(page.number + 1, scale, fmt, variant.get('quality'), tile)
+                    (out_dir / name).write_bytes(data)
+                    if tile is None:
+                        sizes[variant['name']] = len(data)
+                    written += len(data)
+    return pages, written
+
+
+def load_previous() -> dict:
+    if not PAGES_OUT.exists():
+        return {}
+    try:
+        manifest = json.loads(PAGES_OUT.read_text(encoding='utf-8'))
+        if manifest.get('version') != FORMAT_VERSION:
+            return {}
+        return {entry['file']: entry for entry in manifest['protocols']}
+    except (ValueError, KeyError) as exc:
+        print(f'Ignoring unreadable {PAGES_OUT.relative_to(ROOT)}: {exc}')
+        return {}
+
+
+def build(force=False) -> int:
+    if fitz is None:
+        print(f'PyMuPDF import failed: {FITZ_IMPORT_ERROR}. Install requirements and rebuild.')
+        return 1
+    variants = variant_list()
+    protocols = json.loads(MANIFEST.read_text(encoding='utf-8'))
+    previous = {} if force else load_previous()
+    entries, rendered, skipped, total_bytes, missing = [], 0, 0, 0, []
+    started = time.perf_counter()
+    for proto in protocols:
+        local = web_to_local(proto['file'])
+        if not local.exists():
+            missing.append(proto['file'])
+            continue
+        digest = sha256_file(local)
+        out_dir = image_dir_for(proto['file'])
+        entry = previous.get(proto['file'])
+        if is_current(entry, digest, variants, out_dir):
+            entries.append(entry)
+            skipped += 1
+            continue
+        pages, written = render_pdf(local, out_dir, variants)
+        total_bytes += written
+        rendered += 1
+        entries.append({
+            'file': proto['file'],
+            'sha256': digest,
+            'pageCount': len(pages),
+            'pages': pages,
+            'variants': variants,
+            'imageDir': '/' + out_dir.relative_to(ROOT).as_posix(),
+        })
+    PAGES_OUT.write_text(json.dumps({'version': FORMAT_VERSION, 'protocols': entries}, indent=2) + '\n', encoding='utf-8')
+    elapsed = time.perf_counter() - started
+    print(f'Rendered {rendered} PDFs ({total_bytes / 1e6:.1f} MB), {skipped} unchanged, '
+          f'{sum(e["pageCount"] for e in entries)} pages total in {elapsed:.1f}s')
+    print(f'Wrote {PAGES_OUT.relative_to(ROOT)} and images under {RENDER_DIR.relative_to(ROOT)}/')
+    if missing:
+        print('Missing PDFs:', *missing, sep='\n- ')
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--force', action='store_true', help='re-render every PDF')
+    args = parser.parse_args(argv)
+    return build(force=args.force)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,7 +2,7 @@
 """Build offline ACT protocol PDF text and medication search indexes."""
 from __future__ import annotations
 
-import json, re, sys, subprocess
+import argparse, json, re, sys, subprocess, time
 from collections import defaultdict
 from datetime import datetime, timezone
 from pathlib import Path
@@ -14,6 +14,12 @@ SEARCH_OUT = ROOT / 'static/data/act-protocol-search.json'
 ALIAS_OUT = ROOT / 'static/data/act-medication-aliases.json'
 REPORT_OUT = ROOT / 'static/data/act-protocol-search-report.json'
 LITTLE_TEXT_CHARS = 40
+EXTRACTOR_VERSION = f'search-v2-{LITTLE_TEXT_CHARS}'
+
+# Sibling modules, then api._act_text (via act_word_index and act_text_index).
+for path in (ROOT / 'scripts', ROOT):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
 
 try:
     import fitz  # PyMuPDF
@@ -23,6 +29,11 @@ except Exception as exc:  # pragma: no cover - environment dependent
 else:
     FITZ_IMPORT_ERROR = None
 
+from act_alias_matcher import AliasMatcher
+from act_extract_cache import add_worker_args, extract_all, merge_report, sha256_file
+from act_text_index import write_text_index
+from act_word_index import act_word_boxes, split_word_boxes, write_word_index
+
 PUNCT_TRANSLATION = str.maketrans({
     '\u2010':'-', '\u2011':'-', '\u2012':'-', '\u2013':'-', '\u2014':'-', '\u2212':'-',
     '\u2018':"'", '\u2019':"'", '\u201c':'"', '\u201d':'"', '\u00a0':' ',
@@ -48,15 +59,6 @@ def unique(values):
             seen.add(clean); out.append(clean)
     return out
 
-def alias_regex(alias: str) -> re.Pattern:
-    a = normalize_text(alias)
-    if not a:
-        return re.compile(r'a^')
-    escaped = re.escape(a).replace('\\ ', r'\s+')
-    if re.fullmatch(r'[a-z0-9]+', a):
-        return re.compile(rf'(?<![a-z0-9]){escaped}(?![a-z0-9])')
-    return re.compile(rf'(?<![a-z0-9]){escaped}(?![a-z0-9])')
-
 def load_seed():
     seed = json.loads(SEED.read_text(encoding='utf-8'))
     meds = {}
@@ -84,6 +86,7 @@ def extract_with_fitz(path: Path, report: dict):
     doc = fitz.open(path)
     for idx, page in enumerate(doc, start=1):
         raw = page.get_text('text') or ''
+        word_textpage = None
         possible = len(normalize_text(raw)) < LITTLE_TEXT_CHARS
         ocr_attempted = ocr_succeeded = ocr_failed = False
         if possible and hasattr(page, 'get_textpage_ocr'):
@@ -92,7 +95,7 @@ def extract_with_fitz(path: Path, report: dict):
                 textpage = page.get_textpage_ocr()
                 ocr_text = page.get_text('text', textpage=textpage) or ''
                 if len(normalize_text(ocr_text)) > len(normalize_text(raw)):
-                    raw = ocr_text; possible = len(normalize_text(raw)) < LITTLE_TEXT_CHARS
+                    raw = ocr_text; word_textpage = textpage; possible = len(normalize_text(raw)) < LITTLE_TEXT_CHARS
                 ocr_succeeded = True; report['ocrSucceededCount'] += 1
             except Exception as exc:
                 ocr_failed = True; report['ocrFailedCount'] += 1
@@ -100,23 +103,32 @@ def extract_with_fitz(path: Path, report: dict):
         text = normalize_text(raw)
         if possible:
             report['pagesWithLittleOrNoText'].append({'file': '/' + str(path.relative_to(ROOT)), 'page': idx})
-        pages.append({'page': idx, 'text': text, 'possibleScannedPage': possible, 'ocrAttempted': ocr_attempted, 'ocrSucceeded': ocr_succeeded, 'ocrFailed': ocr_failed})
+        pages.append({'page': idx, 'text': text, 'possibleScannedPage': possible, 'ocrAttempted': ocr_attempted, 'ocrSucceeded': ocr_succeeded, 'ocrFailed': ocr_failed,
+                      **act_word_boxes(page, word_textpage)})
     return pages
 
-def find_matches(text: str, meds: dict):
+def extract_file(path: str) -> dict:
+    fragment = {'pagesWithLittleOrNoText': [], 'warnings': [],
+                'ocrAttemptedCount': 0, 'ocrSucceededCount': 0, 'ocrFailedCount': 0}
+    pages = extract_with_fitz(Path(path), fragment)
+    return {'pages': pages, 'report': fragment, 'cacheable': not fragment['ocrFailedCount']}
+
+def build_alias_matcher(meds: dict) -> AliasMatcher:
+    return AliasMatcher(alias for med in meds.values() for alias in med['aliases'])
+
+def find_matches(text: str, meds: dict, matcher: AliasMatcher | None = None):
+    found_aliases = (matcher or build_alias_matcher(meds)).aliases_in(text)
     found = []
     for canonical, med in meds.items():
-        aliases = []
-        for alias in med['aliases']:
-            if alias_regex(alias).search(text):
-                aliases.append(alias)
+        aliases = [alias for alias in med['aliases'] if alias in found_aliases]
         if aliases:
             found.append((canonical, sorted(set(aliases))))
     return found
 
-def build():
+def build(workers=None, use_cache=True):
     manifest = json.loads(MANIFEST.read_text(encoding='utf-8'))
     meds = load_seed()
+    matcher = build_alias_matcher(meds)
     report = {
         'generatedAt': datetime.now(timezone.utc).isoformat(),
         'totalProtocolsInManifest': len(manifest), 'totalPdfsFound': 0, 'totalPdfsMissing': 0,
@@ -124,11 +136,18 @@ def build():
         'ocrAttemptedCount': 0, 'ocrSucceededCount': 0, 'ocrFailedCount': 0,
         'totalMedicationAliasesLoaded': sum(len(m['aliases']) for m in meds.values()),
         'totalMedicationsDetected': 0, 'medicationsDetected': [], 'protocolsWithMedicationMatches': [],
-        'possibleMedicationCandidatesNotMatched': [], 'warnings': []
+        'possibleMedicationCandidatesNotMatched': [], 'warnings': [],
+        'extractionSeconds': 0, 'cachedPdfCount': 0, 'fileTimings': []
     }
     if fitz is None:
         report['warnings'].append(f'PyMuPDF import failed: {FITZ_IMPORT_ERROR}. Install requirements and rebuild for PDF text extraction.')
-    search_records = []
+    started = time.perf_counter()
+    present = [web_to_local(p['file']) for p in manifest if web_to_local(p['file']).exists()]
+    extracted, timings = extract_all(present, extract_file, EXTRACTOR_VERSION, workers, use_cache and fitz is not None)
+    report['extractionSeconds'] = round(time.perf_counter() - started, 3)
+    report['cachedPdfCount'] = sum(1 for t in timings if t['cached'])
+    report['fileTimings'] = timings
+    search_records, word_entries = [], []
     found_by_med = {c: {'foundInProtocols': set(), 'foundPagesByProtocol': defaultdict(set), 'matchedAliases': set()} for c in meds}
     for proto in manifest:
         local = web_to_local(proto['file'])
@@ -139,18 +158,18 @@ def build():
             report['missingPdfs'].append({'id': proto['id'], 'title': proto['title'], 'file': proto['file']})
         else:
             report['totalPdfsFound'] += 1
-            try:
-                pages = extract_with_fitz(local, report)
-            except Exception as exc:
-                report['warnings'].append(f'Failed extracting {proto["file"]}: {exc}')
+            result = extracted[local]
+            if 'error' in result:
+                report['warnings'].append(f'Failed extracting {proto["file"]}: {result["error"]}')
+            else:
+                pages, word_pages = split_word_boxes(result['pages']); merge_report(report, result['report'])
+                word_entries.append({'file': proto['file'], 'sha256': sha256_file(local), 'pages': word_pages})
         report['totalPagesScanned'] += len(pages)
         normalized = normalize_text(' '.join(p['text'] for p in pages))
         detected = []
-        for canonical, aliases in find_matches(normalized, meds):
-            page_nums = []
-            for page in pages:
-                if any(alias_regex(alias).search(page['text']) for alias in aliases):
-                    page_nums.append(page['page'])
+        page_aliases = [matcher.aliases_in(page['text']) for page in pages]
+        for canonical, aliases in find_matches(normalized, meds, matcher):
+            page_nums = [page['page'] for page, found in zip(pages, page_aliases) if found.intersection(aliases)]
             detected.append({'canonical': canonical, 'matchedAliases': aliases, 'pages': page_nums})
             found_by_med[canonical]['foundInProtocols'].add(proto['id'])
             found_by_med[canonical]['matchedAliases'].update(aliases)
@@ -183,8 +202,15 @@ def build():
     ALIAS_OUT.write_text(json.dumps(alias_records, indent=2) + '\n', encoding='utf-8')
     REPORT_OUT.write_text(json.dumps(report, indent=2) + '\n', encoding='utf-8')
     print(f'Wrote {SEARCH_OUT.relative_to(ROOT)}, {ALIAS_OUT.relative_to(ROOT)}, {REPORT_OUT.relative_to(ROOT)}')
+    write_text_index()
+    if fitz is not None:
+        write_word_index(word_entries)
+    print(f'Extracted {len(timings) - report["cachedPdfCount"]} PDFs, {report["cachedPdfCount"]} from cache, in {report["extractionSeconds"]}s')
     if report['warnings']:
         print('Warnings:', *report['warnings'][:5], sep='\n- ')
 
 if __name__ == '__main__':
-    build()
+    parser = argparse.ArgumentParser(description='Build offline ACT protocol PDF text and medication search indexes.')
+    add_worker_args(parser)
+    args = parser.parse_args()
+    build(workers=args.workers, use_cache=not args.no_cache)
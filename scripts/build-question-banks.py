@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Compile modules/**/*.json into precompiled .qbank artifacts.
+
+Outputs modules/.compiled/<Category>/<module>.qbank for every question bank.
+api/index.py reads these instead of the pretty-printed JSON and falls back to
+the JSON whenever an artifact is missing or its recorded source hash differs.
+
+Usage:
+  python scripts/build-question-banks.py          # (re)build stale artifacts
+  python scripts/build-question-banks.py --check  # exit 1 if any artifact is stale
+"""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from api.index import (  # noqa: E402
+    COMPILED_DIR,
+    MODULES_DIR,
+    CompiledQuestionBank,
+    compiled_bank_path,
+    encode_compiled_bank,
+)
+
+
+def source_banks() -> list[Path]:
+    return sorted(p for p in MODULES_DIR.glob('*/*.json') if not p.parent.name.startswith('.'))
+
+
+def artifact_status(source: Path) -> str:
+    artifact = compiled_bank_path(source)
+    if not artifact.exists():
+        return 'missing'
+    try:
+        compiled = CompiledQuestionBank(artifact.read_bytes())
+    except Exception:
+        return 'corrupt'
+    return 'fresh' if compiled.is_fresh(source) else 'stale'
+
+
+def orphaned_artifacts(sources: list[Path]) -> list[Path]:
+    expected = {compiled_bank_path(source) for source in sources}
+    return sorted(p for p in COMPILED_DIR.glob('*/*.qbank') if p not in expected)
+
+
+def check() -> int:
+    sources = source_banks()
+    problems = [(source, status) for source in sources if (status := artifact_status(source)) != 'fresh']
+    for source, status in problems:
+        print(f'{status}: {compiled_bank_path(source).relative_to(ROOT)} (source {source.relative_to(ROOT)})')
+    for orphan in orphaned_artifacts(sources):
+        problems.append((orphan, 'orphaned'))
+        print(f'orphaned: {orphan.relative_to(ROOT)}')
+    if problems:
+        print('Compiled question banks are out of date. Run: python scripts/build-question-banks.py')
+        return 1
+    print(f'All {len(sources)} compiled question banks are up to date.')
+    return 0
+
+
+def build() -> int:
+    sources = source_banks()
+    written = 0
+    for source in sources:
+        if artifact_status(source) == 'fresh':
+            continue
+        artifact = compiled_bank_path(source)
+        artifact.parent.mkdir(parents=True, exist_ok=True)
+        payload = encode_compiled_bank(source.read_bytes())
+        artifact.write_bytes(payload)
+        written += 1
+        print(f'Wrote {artifact.relative_to(ROOT)} ({len(payload):,} bytes from {source.stat().st_size:,})')
+    for orphan in orphaned_artifacts(sources):
+        orphan.unlink()
+        print(f'Removed {orphan.relative_to(ROOT)}')
+    print(f'{written} of {len(sources)} question banks compiled.')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(check() if '--check' in sys.argv[1:] else build())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""Calibrate Rasch item difficulties for the adaptive tests from attempt counts.
+
+Input is an aggregated export of answer outcomes per question:
+
+  {"NCLEX/NCLEX_Comprehensive_Master_Categorized": {"Q1": [correct, attempts], ...}, ...}
+
+Each question with at least --min-attempts answers gets
+b = ln((wrong + 0.5) / (correct + 0.5)), the Rasch difficulty that puts the
+average examinee in the data at theta 0. The results are written to
+modules/.compiled/item-difficulty.json. /api/cat/next uses them instead of
+its form heuristics, and questions that are still uncalibrated keep the
+heuristic.
+
+Usage:
+  python scripts/calibrate-item-difficulty.py attempts.json [--min-attempts 20]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from api.index import CAT_DIFFICULTY_LIMIT, COMPILED_DIR, ITEM_DIFFICULTY_PATH, MODULES_DIR  # noqa: E402
+
+
+def rasch_difficulty(correct: int, attempts: int) -> float:
+    wrong = attempts - correct
+    b = math.log((wrong + 0.5) / (correct + 0.5))
+    return round(max(-CAT_DIFFICULTY_LIMIT, min(CAT_DIFFICULTY_LIMIT, b)), 3)
+
+
+def calibrate(counts: dict, min_attempts: int) -> dict:
+    banks = {}
+    for bank, questions in sorted(counts.items()):
+        if not (MODULES_DIR / f'{bank}.json').exists():
+            print(f'Skipping unknown bank {bank}')
+            continue
+        calibrated = {}
+        for question_id, (correct, attempts) in questions.items():
+            if attempts >= min_attempts and 0 <= correct <= attempts:
+                calibrated[str(question_id)] = rasch_difficulty(correct, attempts)
+        banks[bank] = dict(sorted(calibrated.items()))
+        print(f'{bank}: {len(calibrated)} of {len(questions)} questions calibrated')
+    return banks
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Calibrate CAT item difficulties from attempt counts.')
+    parser.add_argument('attempts', type=Path, help='JSON of {bank: {id: [correct, attempts]}}')
+    parser.add_argument('--min-attempts', type=int, default=20,
+                        help='answers needed before a question is calibrated (default 20)')
+    args = parser.parse_args(argv)
+    counts = json.loads(args.attempts.read_text(encoding='utf-8'))
+    output = {
+        'version': 1,
+        'generatedAt': datetime.now(timezone.utc).isoformat(),
+        'minAttempts': args.min_attempts,
+        'banks': calibrate(counts, args.min_attempts),
+    }
+    COMPILED_DIR.mkdir(parents=True, exist_ok=True)
+    ITEM_DIFFICULTY_PATH.write_text(json.dumps(output, indent=1) + '\n', encoding='utf-8')
+    print(f'Wrote {ITEM_DIFFICULTY_PATH.relative_to(ROOT)}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Find duplicate and near-duplicate questions across every question bank.
+
+Each question's stem and options are shingled into word 3-grams and sketched
+with MinHash. Locality-sensitive hashing (banding) proposes candidate pairs,
+which are then verified by exact Jaccard similarity. Outputs:
+
+- .cache/question-duplicates.json: clusters of duplicate questions (exact
+  copies and near-duplicates above --threshold; members are
+  [bank, position, id]) plus per-bank-pair overlap counts, for editors
+  deciding what to merge or retire. It is generated on demand and not
+  committed.
+- modules/.compiled/question-content-keys.json (committed): the content
+  address of every question that is stored verbatim in more than one bank.
+  The app uses it to keep a single shared copy of each such question in
+  memory. The banks on disk, and what the service worker precaches, are
+  unchanged.
+
+Usage:
+  python scripts/find-duplicate-questions.py [--threshold 0.8]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from api.index import (  # noqa: E402
+    CONTENT_KEYS_PATH,
+    COMPILED_DIR,
+    MODULES_DIR,
+    question_content_key,
+    questions_of,
+)
+
+REPORT_OUT = ROOT / '.cache' / 'question-duplicates.json'
+NUM_PERM = 32
+BANDS = 8
+SHINGLE_SIZE = 3
+TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def source_banks() -> list[Path]:
+    return sorted(p for p in MODULES_DIR.glob('*/*.json') if not p.parent.name.startswith('.'))
+
+
+def bank_name(path: Path) -> str:
+    return path.relative_to(MODULES_DIR).with_suffix('').as_posix()
+
+
+def question_text(question: dict) -> str:
+    options = question.get('options')
+    if isinstance(options, dict):
+        options = list(options.values())
+    parts = [question.get('stem') or question.get('question') or '', *(options or [])]
+    return ' '.join(str(part) for part in parts)
+
+
+def shingles(text: str) -> set[int]:
+    tokens = TOKEN_RE.findall(text.lower())
+    if len(tokens) < SHINGLE_SIZE:
+        grams = [' '.join(tokens)] if tokens else []
+    else:
+        grams = [' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)]
+    return {int.from_bytes(hashlib.blake2b(g.encode(), digest_size=8).digest(), 'little') for g in grams}
+
+
+def minhash_masks(num_perm: int = NUM_PERM, seed: int = 1) -> list[int]:
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(num_perm)]
+
+
+def minhash(shingle_set: set[int], masks: list[int]) -> tuple[int, ...]:
+    # XOR with a random mask permutes the 64-bit hash space; the minimum
+    # under each mask is one MinHash component.
+    return tuple(min(h ^ mask for h in shingle_set) for mask in masks)
+
+
+def jaccard(a: set[int], b: set[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+def candidate_pairs(signatures: list[tuple[int, ...]], bands: int = BANDS) -> set[tuple[int, int]]:
+    rows = len(signatures[0]) // bands if signatures else 0
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for doc, signature in enumerate(signatures):
+            if signature:
+                buckets[signature[band * rows:(band + 1) * rows]].append(doc)
+        for members in buckets.values():
+            if len(members) > 1:
+                for i, a in enumerate(members):
+                    for b in members[i + 1:]:
+                        pairs.add((a, b))
+    return pairs
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, x: int) -> int:
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a: int, b: int) -> None:
+        self.parent[self.find(a)] = self.find(b)
+
+
+def find_duplicates(docs: list[dict], threshold: float):
+    """docs: [{'bank', 'position', 'id', 'question'}]. Returns (clusters, verified pairs, content keys)."""
+    sets = [shingles(question_text(doc['question'])) for doc in docs]
+    masks = minhash_masks()
+    signatures = [minhash(s, masks) if s else () for s in sets]
+    keys = [question_content_key(doc['question']) for doc in docs]
+
+    # Exact copies are grouped by content address even when their text is too
+    # short to shingle; near-duplicates come from verified LSH candidates.
+    by_key = defaultdict(list)
+    for doc, key in enumerate(keys):
+        by_key[key].append(doc)
+    verified = {}
+    for members in by_key.values():
+        for other in members[1:]:
+            verified[(members[0], other)] = 1.0
+    for a, b in candidate_pairs(signatures):
+        if (a, b) not in verified and keys[a] != keys[b]:
+            similarity = jaccard(sets[a], sets[b])
+            if similarity >= threshold:
+                verified[(a, b)] = similarity
+
+    union = UnionFind(len(docs))
+    for a, b in verified:
+        union.union(a, b)
+    groups = defaultdict(list)
+    for a, b in verified:
+        groups[union.find(a)].append((a, b))
+    clusters = []
+    for pairs in groups.values():
+        members = sorted({doc for pair in pairs for doc in pair})
+        clusters.append({
+            'exact': len({keys[doc] for doc in members}) == 1,
+            'minSimilarity': round(min(verified[pair] for pair in pairs), 3),
+            'members': [[docs[doc]['bank'], docs[doc]['position'], docs[doc]['id']] for doc in members],
+        })
+    clusters.sort(key=lambda c: (not c['exact'], c['members'][0][0], c['members'][0][1]))
+    return clusters, verified, keys
+
+
+def load_docs(banks: list[Path]) -> list[dict]:
+    docs = []
+    for path in banks:
+        data = json.loads(path.read_text(encoding='utf-8'))
+        for position, question in enumerate(questions_of(data)):
+            if isinstance(question, dict):
+                docs.append({'bank': bank_name(path), 'position': position, 'id': question.get('id'),
+                             'question': question})
+    return docs
+
+
+def build(threshold: float) -> int:
+    banks = source_banks()
+    docs = load_docs(banks)
+    clusters, verified, keys = find_duplicates(docs, threshold)
+
+    overlap = defaultdict(lambda: {'exact': 0, 'near': 0})
+    for (a, b), similarity in verified.items():
+        pair = tuple(sorted((docs[a]['bank'], docs[b]['bank'])))
+        overlap[pair]['exact' if keys[a] == keys[b] else 'near'] += 1
+
+    key_counts = defaultdict(int)
+    for key in keys:
+        key_counts[key] += 1
+    shared = defaultdict(dict)
+    for doc, key in zip(docs, keys):
+        if key_counts[key] > 1:
+            shared[doc['bank']][str(doc['position'])] = key
+    digests = {bank_name(p): hashlib.sha256(p.read_bytes()).hexdigest() for p in banks}
+    content_keys = {
+        'version': 1,
+        'banks': {bank: {'source_sha256': digests[bank], 'keys': positions} for bank, positions in sorted(shared.items())},
+    }
+
+    redundant = sum(count - 1 for count in key_counts.values() if count > 1)
+    report = {
+        'threshold': threshold,
+        'numPerm': NUM_PERM,
+        'bands': BANDS,
+        'totalQuestions': len(docs),
+        'uniqueQuestions': len(key_counts),
+        'redundantExactCopies': redundant,
+        'exactClusters': sum(1 for c in clusters if c['exact']),
+        'nearDuplicateClusters': sum(1 for c in clusters if not c['exact']),
+        'bankOverlap': [
+            {'banks': list(pair), **counts}
+            for pair, counts in sorted(overlap.items(), key=lambda item: -(item[1]['exact'] + item[1]['near']))
+        ],
+        'clusters': clusters,
+    }
+    COMPILED_DIR.mkdir(parents=True, exist_ok=True)
+    REPORT_OUT.parent.mkdir(parents=True, exist_ok=True)
+    # One cluster per line keeps the report readable without indenting every member.
+    body = json.dumps({**report, 'clusters': []}, indent=2)[:-len('[]\n}')]
+    rows = ',\n'.join('    ' + json.dumps(cluster, separators=(',', ':')) for cluster in clusters)
+    REPORT_OUT.write_text(f'{body}[\n{rows}\n  ]\n}}\n', encoding='utf-8')
+    CONTENT_KEYS_PATH.write_text(json.dumps(content_keys, separators=(',', ':')) + '\n', encoding='utf-8')
+    print(f'{len(docs)} questions, {len(key_counts)} unique; {redundant} redundant exact copies, '
+          f'{report["nearDuplicateClusters"]} near-duplicate clusters (Jaccard >= {threshold})')
+    for row in report['bankOverlap'][:10]:
+        print(f'  {row["banks"][0]} <-> {row["banks"][1]}: {row["exact"]} exact, {row["near"]} near')
+    print(f'Wrote {REPORT_OUT.relative_to(ROOT)} and {CONTENT_KEYS_PATH.relative_to(ROOT)}')
+    return 0
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Find duplicate and near-duplicate questions across banks.')
+    parser.add_argument('--threshold', type=float, default=0.8, help='minimum Jaccard similarity (default 0.8)')
+    args = parser.parse_args()
+    sys.exit(build(args.threshold))
@@ -8,15 +8,24 @@
     return {
       file: params.get('file') || '',
       title: params.get('title') || 'ACT Protocol PDF',
+      query: (params.get('q') || '').trim(),
       requestedPage: positiveInteger(params.get('page'), 1)
     };
   }
   const viewerParams = parseViewerHashParams();
   const file = viewerParams.file;
   const title = viewerParams.title;
+  const query = viewerParams.query;
   let requestedPage = viewerParams.requestedPage;
   const safeFilePattern = /^\/static\/protocols\/act\/.+\.pdf$/i;
   const zoomSteps = ['fit', 125, 150, 175, 200, 250, 300];
+  // Full pages at scale 2 are what "save offline" caches; previews and tiles
+  // are only fetched online and fall back to the full page on any failure.
+  // When the build pre-rendered them, pdf-info lists their static URL
+  // templates and they are loaded directly instead of through pdf-page.
+  const FULL_PAGE = { scale: '2' };
+  const PREVIEW_PAGE = { scale: '0.5', format: 'jpeg', quality: '50' };
+  const TILE_PAGE = { scale: '2', format: 'jpeg', quality: '80' };
 
   const titleEl = document.getElementById('viewerTitle');
   const pagesEl = document.getElementById('pdfPages');
@@ -28,6 +37,7 @@
   const backButton = document.getElementById('pdfBackButton');
   let zoomIndex = 0;
   let pdfUrl = '';
+  let prerendered = {};
   let pinchStartDistance = 0;
   let pinchStartZoomIndex = 0;
   const PINCH_STEP_PX = 42;
@@ -50,11 +60,102 @@
     pagesEl.style.width = zoom === 'fit' ? '100%' : `${zoom}%`;
   }
 
-  function pageImageUrl(pageNumber) {
-    const query = new URLSearchParams({ file, page: String(pageNumber), scale: '2' });
+  function pageImageUrl(pageNumber, options = FULL_PAGE) {
+    const query = new URLSearchParams({ file, page: String(pageNumber), ...options });
     return `/act-protocols/pdf-page?${query.toString()}`;
   }
 
+  function previewUrl(pageNumber) {
+    const template = prerendered.preview;
+    return template ? template.replace('{page}', pageNumber) : pageImageUrl(pageNumber, PREVIEW_PAGE);
+  }
+
+  function tileUrl(pageNumber, column, row) {
+    const template = prerendered.tile;
+    return template
+      ? template.replace('{page}', pageNumber).replace('{column}', column).replace('{row}', row)
+      : pageImageUrl(pageNumber, { ...TILE_PAGE, tile: `${column},${row}` });
+  }
+
+  function showFullPage(frame, img, pageNumber) {
+    if (frame.dataset.fullPage) return;
+    frame.dataset.fullPage = 'true';
+    frame.querySelector('.pdf-page-tiles')?.remove();
+    img.src = pageImageUrl(pageNumber);
+  }
+
+  function loadTiles(frame, img, pageNumber, size, tileSize) {
+    const scale = Number(TILE_PAGE.scale);
+    const side = tileSize / scale;
+    const columns = Math.ceil(size.width / side);
+    const rows = Math.ceil(size.height / side);
+    const layer = document.createElement('div');
+    layer.className = 'pdf-page-tiles';
+    for (let row = 0; row < rows; row += 1) {
+      for (let column = 0; column < columns; column += 1) {
+        const tile = document.createElement('img');
+        tile.className = 'pdf-page-tile';
+        tile.alt = '';
+        tile.decoding = 'async';
+        tile.style.left = `${(column * side / size.width) * 100}%`;
+        tile.style.top = `${(row * side / size.height) * 100}%`;
+        tile.style.width = `${(Math.min(side, size.width - column * side) / size.width) * 100}%`;
+        tile.style.height = `${(Math.min(side, size.height - row * side) / size.height) * 100}%`;
+        tile.addEventListener('error', () => showFullPage(frame, img, pageNumber), { once: true });
+        tile.src = tileUrl(pageNumber, column, row);
+        layer.append(tile);
+      }
+    }
+    frame.append(layer);
+  }
+
+  function progressivePages(info) {
+    const tileSize = Number(info.tileSize || 0);
+    const sizes = Array.isArray(info.pages) ? info.pages : [];
+    if (!tileSize || !navigator.onLine || !('IntersectionObserver' in window)) return null;
+    const observer = new IntersectionObserver((entries) => {
+      entries.forEach((entry) => {
+        if (!entry.isIntersecting) return;
+        observer.unobserve(entry.target);
+        const pageNumber = Number(entry.target.dataset.page);
+        const img = entry.target.querySelector('.pdf-page-image');
+        loadTiles(entry.target, img, pageNumber, sizes[pageNumber - 1], tileSize);
+      });
+    }, { rootMargin: '400px 0px' });
+    return {
+      sizeOf: (pageNumber) => sizes[pageNumber - 1],
+      observe: (frame) => observer.observe(frame)
+    };
+  }
+
+
+  async function highlightRequestedPage() {
+    if (!query) return false;
+    const target = pagesEl.querySelector(`[data-page="${requestedPage}"] .pdf-page-frame`);
+    if (!target) return false;
+    const highlightQuery = new URLSearchParams({ file, page: String(requestedPage), q: query });
+    const response = await fetch(`/act-protocols/pdf-highlights?${highlightQuery.toString()}`);
+    if (!response.ok) return false;
+    const result = await response.json();
+    if (!result.matches?.length || !result.width || !result.height) return false;
+    target.style.aspectRatio = `${result.width} / ${result.height}`;
+    let first = null;
+    result.matches.forEach((match) => {
+      match.rects.forEach(([x0, y0, x1, y1]) => {
+        const mark = document.createElement('span');
+        mark.className = 'pdf-page-highlight';
+        mark.title = match.text;
+        mark.style.left = `${(x0 / result.width) * 100}%`;
+        mark.style.top = `${(y0 / result.height) * 100}%`;
+        mark.style.width = `${((x1 - x0) / result.width) * 100}%`;
+        mark.style.height = `${((y1 - y0) / result.height) * 100}%`;
+        target.append(mark);
+        first = first || mark;
+      });
+    });
+    requestAnimationFrame(() => first.scrollIntoView({ block: 'center', behavior: 'auto' }));
+    return true;
+  }
 
   function touchDistance(touches) {
     const [first, second] = touches;
@@ -117,16 +218,30 @@
     const pageCount = Number(info.page_count || info.pageCount || 0);
     if (!pageCount) throw new Error('PDF has no pages.');
     requestedPage = Math.min(Math.max(1, requestedPage), pageCount);
+    prerendered = info.images || {};
 
+    const progressive = progressivePages(info);
     pagesEl.innerHTML = '';
     for (let pageNumber = 1; pageNumber <= pageCount; pageNumber += 1) {
       const pageWrap = document.createElement('figure');
       pageWrap.className = 'pdf-page-wrap';
       pageWrap.dataset.page = String(pageNumber);
 
+      const frame = document.createElement('div');
+      frame.className = 'pdf-page-frame';
+      frame.dataset.page = String(pageNumber);
+      const size = progressive?.sizeOf(pageNumber);
+
       const img = document.createElement('img');
       img.className = 'pdf-page-image';
-      img.src = pageImageUrl(pageNumber);
+      if (size?.width && size?.height) {
+        frame.style.aspectRatio = `${size.width} / ${size.height}`;
+        img.addEventListener('error', () => showFullPage(frame, img, pageNumber), { once: true });
+        img.src = previewUrl(pageNumber);
+        progressive.observe(frame);
+      } else {
+        img.src = pageImageUrl(pageNumber);
+      }
       img.alt = `${title} page ${pageNumber} of ${pageCount}`;
       img.loading = pageNumber === 1 || pageNumber === requestedPage ? 'eager' : 'lazy';
       img.decoding = 'async';
@@ -135,12 +250,16 @@
       caption.className = 'pdf-page-caption';
       caption.textContent = `Page ${pageNumber} of ${pageCount}`;
 
-      pageWrap.append(img, caption);
+      frame.append(img);
+      pageWrap.append(frame, caption);
       pagesEl.append(pageWrap);
     }
 
     updateZoomControls();
     requestAnimationFrame(scrollToRequestedPage);
+    highlightRequestedPage().catch((err) => {
+      console.warn('[ACT Protocol Viewer] Hit highlighting unavailable', err);
+    });
   }
 
   if (!file || !safeFilePattern.test(file)) {
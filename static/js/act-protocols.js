@@ -1,6 +1,9 @@
 (() => {
   const MANIFEST_URL = '/static/data/act-protocols.json';
-  const SEARCH_URL = '/static/data/act-protocol-search.json';
+  const TEXT_SEARCH_URL = '/api/act/search';
+  const TEXT_INDEX_URL = '/static/data/act-text-index/';
+  const TEXT_SEARCH_LIMIT = 108;
+  const TEXT_PREFIX_EXPANSIONS = 20;
   const ALIAS_URL = '/static/data/act-medication-aliases.json';
   const MEDICATION_MAP_URL = '/static/data/act-medication-protocol-map.json';
   const CACHE_NAME = 'act-protocol-pdfs-v5';
@@ -9,7 +12,7 @@
   const PROTOCOL_ID_COLLATOR = new Intl.Collator(undefined, { numeric: true, sensitivity: 'base' });
   const INSTALL_DISMISSED_KEY = 'act-protocols-install-dismissed';
   const RETURN_STATE_KEY = 'act-protocols-return-state';
-  const state = { protocols: [], searchIndex: new Map(), aliases: [], aliasLookup: new Map(), medicationMap: new Map(), protocolIdLookup: new Map(), category: 'All', query: '', suggestions: [], activeSuggestionIndex: -1, saved: new Set(), caching: new Set(), missing: new Set(), resultMeta: new Map(), searchReady: false, aliasesReady: false, autoCacheStarted: false, refreshInProgress: false, currentDownloadTitle: '', downloadTotal: 0, downloadCompleted: 0, downloadInProgress: false, opening: new Set(), deferredInstallPrompt: null };
+  const state = { protocols: [], textIndex: null, textShards: new Map(), textHits: new Map(), textQuery: '', textSearchSeq: 0, aliases: [], aliasLookup: new Map(), medicationMap: new Map(), protocolIdLookup: new Map(), category: 'All', query: '', suggestions: [], activeSuggestionIndex: -1, saved: new Set(), caching: new Set(), missing: new Set(), resultMeta: new Map(), searchReady: false, aliasesReady: false, autoCacheStarted: false, refreshInProgress: false, currentDownloadTitle: '', downloadTotal: 0, downloadCompleted: 0, downloadInProgress: false, opening: new Set(), deferredInstallPrompt: null };
   const els = {
     grid: document.getElementById('protocolGrid'), search: document.getElementById('protocolSearch'), filters: document.getElementById('categoryFilters'),
     count: document.getElementById('resultCount'), offlineSummary: document.getElementById('offlineSummary'), suggestions: document.getElementById('protocolSearchSuggestions'),
@@ -107,21 +110,87 @@
     const protocols = mapRecord?.protocols?.length ? mapRecord.protocols : (med.foundInProtocols || []).map(id => ({ id, pages: med.foundPagesByProtocol?.[id] || [], matchedAliases: med.matchedAliases || [] }));
     return protocols.map((entry) => ({ ...entry, manifestId: state.protocolIdLookup.get(normalizeProtocolId(entry.manifestId || entry.id)) || entry.manifestId || entry.id }));
   }
-  function firstSnippet(record, terms) {
-    const pages = record?.pages || [];
-    for (const page of pages) {
-      const text = page.text || ''; const idx = terms.map(t => text.indexOf(t)).filter(i => i >= 0).sort((a, b) => a - b)[0];
-      if (idx >= 0) return { page: page.page, snippet: `… ${text.slice(Math.max(0, idx - 55), idx + 95)} …` };
+  // PDF text matches come from /api/act/search (ranked, with snippets). When
+  // the request fails, e.g. offline, the same positional index is read from
+  // the static shards under act-text-index/: meta.json lists pages and
+  // shards, terms-<c>.json maps term -> [[page id, first position, gap, ...]].
+  function textTokens(text) { return normalize(text).match(/[a-z0-9]+/g) || []; }
+  function textShardUrls() { return Object.keys(state.textIndex?.shards || {}).map(name => `${TEXT_INDEX_URL}${name}`); }
+  function loadTextShard(term) {
+    const name = `terms-${term[0]}.json`;
+    if (!state.textIndex?.shards?.[name]) return Promise.resolve({});
+    if (!state.textShards.has(name)) {
+      state.textShards.set(name, loadJson(`${TEXT_INDEX_URL}${name}`).catch((err) => { state.textShards.delete(name); throw err; }));
     }
-    return null;
+    return state.textShards.get(name);
+  }
+  function decodePostings(encoded) {
+    return (encoded || []).map(([pageId, ...gaps]) => { let position = 0; return [pageId, gaps.map(gap => (position += gap))]; });
+  }
+  async function phrasePages(tokens, allowPrefix) {
+    // Page id -> whether every token matched whole; the last token may match as a prefix.
+    const shards = await Promise.all(tokens.map(loadTextShard));
+    let starts = null; let exact = true;
+    tokens.forEach((token, offset) => {
+      let terms = shards[offset][token] ? [token] : [];
+      if (!terms.length && allowPrefix && offset === tokens.length - 1 && token.length >= 3) {
+        terms = Object.keys(shards[offset]).filter(term => term.startsWith(token)).sort().slice(0, TEXT_PREFIX_EXPANSIONS);
+        exact = false;
+      }
+      const next = new Map();
+      terms.forEach((term) => decodePostings(shards[offset][term]).forEach(([pageId, positions]) => {
+        const previous = starts?.get(pageId);
+        if (starts && !previous) return;
+        const kept = positions.map(p => p - offset).filter(p => !previous || previous.has(p));
+        if (kept.length) next.set(pageId, new Set([...(next.get(pageId) || []), ...kept]));
+      }));
+      starts = next;
+    });
+    return new Map([...(starts || [])].map(([pageId]) => [pageId, exact]));
+  }
+  async function shardTextHits(q) {
+    if (!state.textIndex) throw new Error('ACT text index unavailable');
+    const hits = new Map();
+    for (const term of termsForQuery(q)) {
+      const tokens = textTokens(term);
+      if (!tokens.length) continue;
+      (await phrasePages(tokens, q.length > 4)).forEach((exact, pageId) => {
+        const [protocolIndex, page] = state.textIndex.pages[pageId];
+        const file = state.textIndex.protocols[protocolIndex].file;
+        const hit = hits.get(file) || { exact: false, pages: [] };
+        hit.exact = hit.exact || exact;
+        if (!hit.pages.includes(page)) hit.pages.push(page);
+        hits.set(file, hit);
+      });
+    }
+    hits.forEach(hit => hit.pages.sort((a, b) => a - b));
+    return hits;
+  }
+  async function apiTextHits(query) {
+    const params = new URLSearchParams({ q: query.trim(), limit: String(TEXT_SEARCH_LIMIT) });
+    const response = await fetch(`${TEXT_SEARCH_URL}?${params.toString()}`);
+    if (!response.ok) throw new Error(`${TEXT_SEARCH_URL}: ${response.status}`);
+    const { hits } = await response.json();
+    return new Map(hits.map(hit => [hit.file, { exact: true, pages: hit.pages.map(p => p.page), snippet: hit.pages[0]?.snippet }]));
+  }
+  async function updateTextHits(query) {
+    const seq = ++state.textSearchSeq;
+    const q = normalize(query);
+    let hits = new Map();
+    if (q.length >= 2 && textTokens(q).length) {
+      try { hits = await apiTextHits(query); } catch (err) {
+        try { hits = await shardTextHits(q); } catch (shardErr) { console.warn('[ACT Protocols] PDF text search unavailable', shardErr); }
+      }
+    }
+    if (seq !== state.textSearchSeq) return;
+    state.textHits = hits;
+    render();
   }
   function matchProtocol(protocol, q) {
-    const record = state.searchIndex.get(protocol.id) || state.searchIndex.get(normalizeProtocolId(protocol.id));
     const hayMeta = normalize(metadataText(protocol));
     if (!q) return { score: 0, reasons: [] };
     const knownAlias = state.aliasLookup.has(q);
     if (q.length < 2 && !knownAlias) return null;
-    const terms = termsForQuery(q);
     const isShortQuery = q.length <= 4;
     const reasons = []; let score = -1;
     if (exactProtocolIdMatch(protocol, q)) {
@@ -144,33 +213,20 @@
       });
       score = Math.max(score, 120);
     });
-    (record?.detectedMedications || []).forEach((med) => {
-      const aliases = (med.matchedAliases || []).map(normalize);
-      const canon = normalize(med.canonicalKey || med.canonical);
-      const expanded = terms.includes(canon) || aliases.some(a => terms.includes(a));
-      if (expanded && !reasons.some(r => r.type === 'Medication match' && normalize(r.text).includes(canon))) {
-        reasons.push({ type: 'Medication match', text: `"${state.query.trim()}" → ${med.canonical}`, pages: (med.pages || []).slice(0, 4), pageRanges: med.pageRanges });
-        score = Math.max(score, 115);
-      }
-    });
     if (normalize(protocol.title).includes(q) && (!isShortQuery || hasToken(protocol.title, q))) { reasons.push({ type: 'Title match', text: protocol.title }); score = Math.max(score, 100); }
     if ((protocol.tags || []).some(t => normalize(t) === q || (!isShortQuery && normalize(t).includes(q)))) { reasons.push({ type: 'Tag match', text: q }); score = Math.max(score, 95); }
     if (!isShortQuery && hayMeta.includes(q)) score = Math.max(score, 55);
-    const pdfText = record?.normalizedText || '';
-    if (pdfText) {
-      const exact = terms.some(t => new RegExp(`(^|[^a-z0-9])${t.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')}([^a-z0-9]|$)`).test(pdfText));
-      const partial = !exact && !isShortQuery && terms.some(t => t.length >= 3 && pdfText.includes(t));
-      if (exact || partial) {
-        const snippet = firstSnippet(record, terms);
-        reasons.push({ type: 'PDF text match', text: snippet?.snippet || q, pages: snippet?.page ? [snippet.page] : [] });
-        score = Math.max(score, exact ? 60 : 45);
-      }
+    const textHit = state.textHits.get(protocol.file);
+    if (textHit) {
+      reasons.push({ type: 'PDF text match', text: textHit.snippet || q, pages: textHit.pages.slice(0, 4) });
+      score = Math.max(score, textHit.exact ? 60 : 45);
     }
     if (score < 0) return null;
     return { score, reasons };
   }
   function filtered() {
     const q = normalize(state.query);
+    if (q !== state.textQuery) { state.textQuery = q; state.textHits = new Map(); updateTextHits(state.query); }
     state.resultMeta.clear();
     const matches = [];
     for (const p of state.protocols) {
@@ -444,6 +500,96 @@
     state.saved.add(protocol.file);
     state.missing.delete(protocol.file);
   }
+  // Yields tar members as the response arrives, so a part is never held whole.
+  async function* readTar(body) {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    const chunks = [];
+    let queued = 0;
+    const fill = async (length) => {
+      while (queued < length) {
+        const { done, value } = await reader.read();
+        if (done) return false;
+        chunks.push(value);
+        queued += value.length;
+      }
+      return true;
+    };
+    const take = (length) => {
+      const bytes = new Uint8Array(length);
+      for (let filled = 0; filled < length;) {
+        const head = chunks[0];
+        const count = Math.min(head.length, length - filled);
+        bytes.set(head.subarray(0, count), filled);
+        filled += count;
+        if (count === head.length) chunks.shift(); else chunks[0] = head.subarray(count);
+      }
+      queued -= length;
+      return bytes;
+    };
+    try {
+      while (await fill(512)) {
+        const header = take(512);
+        const field = (start, length) => decoder.decode(header.subarray(start, start + length)).replace(/\0[\s\S]*$/, '');
+        const name = field(0, 100);
+        if (!name) return;
+        const size = Number.parseInt(field(124, 12).trim(), 8);
+        const padded = Math.ceil(size / 512) * 512;
+        if (!(await fill(padded))) throw new Error(`Bundle truncated at ${name}`);
+        yield { name, body: take(padded).subarray(0, size) };
+      }
+    } finally {
+      await reader.cancel();
+    }
+  }
+  function bundleUrl(protocols, start) {
+    const category = protocols[0].category;
+    const wholeCategory = state.protocols.filter(p => p.category === category);
+    const query = new URLSearchParams();
+    if (protocols.length === wholeCategory.length && protocols.every(p => p.category === category)) {
+      query.set('category', category);
+    } else {
+      protocols.forEach(p => query.append('file', p.file));
+    }
+    if (start) query.set('start', start);
+    return `/act-protocols/bundle?${query.toString()}`;
+  }
+  function bundleEntryUrl(file, entry) {
+    if (entry.kind === 'pdf') return encoded(file);
+    if (entry.kind === 'info') return pdfInfoUrl(file);
+    return pdfPageUrl(file, entry.page);
+  }
+  // Caches one bundle part; returns the start token of the next part, or null after the last.
+  async function cacheBundlePart(protocols, start, cache) {
+    const response = await fetch(bundleUrl(protocols, start), { cache: 'no-cache' });
+    if (!response.ok || !response.body) throw new Error(`Bundle failed: ${response.status}`);
+    const members = readTar(response.body);
+    const first = (await members.next()).value;
+    if (first?.name !== 'manifest.json') throw new Error('Bundle has no manifest.');
+    const manifest = JSON.parse(new TextDecoder().decode(first.body));
+    const targets = new Map();
+    manifest.protocols.forEach(record => record.entries.forEach(entry => targets.set(entry.name, { file: record.file, entry })));
+    for await (const member of members) {
+      const target = targets.get(member.name);
+      if (!target) continue;
+      const headers = { 'Content-Type': target.entry.contentType };
+      await cache.put(bundleEntryUrl(target.file, target.entry), new Response(member.body, { status: 200, headers }));
+    }
+    return manifest.next ?? null;
+  }
+  // A few size-capped parts per category instead of one request per PDF page; returns the files now saved.
+  async function cacheBundle(protocols) {
+    const cache = await caches.open(CACHE_NAME);
+    let start = 0;
+    do {
+      start = await cacheBundlePart(protocols, start, cache);
+    } while (start !== null);
+    const saved = new Set();
+    for (const protocol of protocols) {
+      if (await hasCachedViewerResources(protocol.file)) saved.add(protocol.file);
+    }
+    return saved;
+  }
   function notifyServiceWorker(urls) { if (navigator.serviceWorker?.controller) navigator.serviceWorker.controller.postMessage({ type: 'CACHE_URLS', urls }); }
   async function isCached(file) {
     if (!('caches' in window)) return false;
@@ -475,6 +621,7 @@
     saveReturnState(protocol);
     const meta = state.resultMeta.get(protocol.id); const page = meta?.reasons?.find(r => r.pages?.length)?.pages?.[0];
     const params = new URLSearchParams({ file: protocol.file, title: `${protocol.id} ${protocol.title}` }); if (page) params.set('page', page);
+    if (state.query.trim()) params.set('q', state.query.trim());
     window.location.href = `/act-protocols/viewer#${params.toString()}`;
   }
   async function handleOpen(protocol) {
@@ -516,7 +663,28 @@
     state.downloadInProgress = true;
     protocols.forEach(p => { state.caching.add(p.file); state.missing.delete(p.file); });
     render();
-    for (const protocol of protocols) {
+    const byCategory = new Map();
+    protocols.forEach(p => byCategory.set(p.category, [...(byCategory.get(p.category) || []), p]));
+    const remaining = [];
+    for (const [category, group] of byCategory) {
+      state.currentDownloadTitle = category;
+      render();
+      let saved = new Set();
+      try {
+        saved = await cacheBundle(group);
+      } catch (err) {
+        console.warn(`[ACT Protocols] Bundle download failed for ${category}; saving protocols one by one`, err);
+      }
+      group.forEach(protocol => {
+        if (!saved.has(protocol.file)) { remaining.push(protocol); return; }
+        state.saved.add(protocol.file);
+        state.caching.delete(protocol.file);
+        state.downloadCompleted += 1;
+      });
+      state.currentDownloadTitle = '';
+      render();
+    }
+    for (const protocol of remaining) {
       state.currentDownloadTitle = protocol.title;
       render();
       try {
@@ -641,6 +809,6 @@
     setupInstallGuidance();
   }
   async function loadJson(url) { const response = await fetch(url, { cache: 'no-cache' }); if (!response.ok) throw new Error(`${url}: ${response.status}`); return response.json(); }
-  async function init() { applyDisplayModeClass(); window.matchMedia?.('(display-mode: standalone)').addEventListener?.('change', applyDisplayModeClass); bind(); const savedReturnState = loadReturnState(); try { const [manifest, search, aliases, medicationMap] = await Promise.allSettled([loadJson(MANIFEST_URL), loadJson(SEARCH_URL), loadJson(ALIAS_URL), loadJson(MEDICATION_MAP_URL)]); if (manifest.status !== 'fulfilled') throw manifest.reason; state.protocols = manifest.value; buildProtocolIdLookup(); if (search.status === 'fulfilled') { state.searchReady = true; search.value.forEach(r => { state.searchIndex.set(r.id, r); state.searchIndex.set(normalizeProtocolId(r.id), r); }); } else console.warn('[ACT Protocols] Search index unavailable; using metadata fallback', search.reason); if (aliases.status === 'fulfilled') { state.aliasesReady = true; state.aliases = aliases.value; buildAliasLookup(); } else console.warn('[ACT Protocols] Medication aliases unavailable', aliases.reason); if (medicationMap.status === 'fulfilled') buildMedicationMap(medicationMap.value); else console.warn('[ACT Protocols] Medication protocol map unavailable', medicationMap.reason); applyRestoredFilters(savedReturnState); await refreshSaved(); render(); restoreScrollPosition(savedReturnState); notifyServiceWorker([MANIFEST_URL, SEARCH_URL, ALIAS_URL, MEDICATION_MAP_URL]); autoCacheProtocols(); } catch (err) { console.error('[ACT Protocols] Failed to load protocol manifest', err); els.count.textContent = 'Unable to load protocols.'; els.grid.innerHTML = '<div class="error-state">Unable to load ACT protocols. Please try again when the app is online.</div>'; } }
+  async function init() { applyDisplayModeClass(); window.matchMedia?.('(display-mode: standalone)').addEventListener?.('change', applyDisplayModeClass); bind(); const savedReturnState = loadReturnState(); try { const [manifest, textIndex, aliases, medicationMap] = await Promise.allSettled([loadJson(MANIFEST_URL), loadJson(`${TEXT_INDEX_URL}meta.json`), loadJson(ALIAS_URL), loadJson(MEDICATION_MAP_URL)]); if (manifest.status !== 'fulfilled') throw manifest.reason; state.protocols = manifest.value; buildProtocolIdLookup(); if (textIndex.status === 'fulfilled') { state.searchReady = true; state.textIndex = textIndex.value; } else console.warn('[ACT Protocols] Text index unavailable; using metadata fallback', textIndex.reason); if (aliases.status === 'fulfilled') { state.aliasesReady = true; state.aliases = aliases.value; buildAliasLookup(); } else console.warn('[ACT Protocols] Medication aliases unavailable', aliases.reason); if (medicationMap.status === 'fulfilled') buildMedicationMap(medicationMap.value); else console.warn('[ACT Protocols] Medication protocol map unavailable', medicationMap.reason); applyRestoredFilters(savedReturnState); await refreshSaved(); render(); restoreScrollPosition(savedReturnState); notifyServiceWorker([MANIFEST_URL, `${TEXT_INDEX_URL}meta.json`, ...textShardUrls(), ALIAS_URL, MEDICATION_MAP_URL]); autoCacheProtocols(); } catch (err) { console.error('[ACT Protocols] Failed to load protocol manifest', err); els.count.textContent = 'Unable to load protocols.'; els.grid.innerHTML = '<div class="error-state">Unable to load ACT protocols. Please try again when the app is online.</div>'; } }
   document.addEventListener('DOMContentLoaded', init);
 })();
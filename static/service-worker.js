@@ -8,7 +8,7 @@
    - Question image caching support (NEW)
 ----------------------------------------------------------- */
 
-const CACHE_VERSION = 'v2.7.19';
+const CACHE_VERSION = 'v2.7.22';
 const ACT_PROTOCOL_CACHE_NAME = 'act-protocol-pdfs-v5';
 const ACT_PROTOCOL_CACHE_PREFIX = 'act-protocol-pdfs-';
 const CACHE_NAME = `study-guru-${CACHE_VERSION}`;
@@ -40,7 +40,7 @@ const STATIC_ASSETS = [
   '/static/manifest-act-protocols.json',
   '/static/data/act-protocols.json',
   '/static/data/act-medication-protocol-map.json',
-  '/static/data/act-protocol-search.json',
+  '/static/data/act-text-index/meta.json',
   '/static/data/act-medication-aliases.json',
   '/static/data/act-medication-alias-seed.json',
   '/static/data/act-protocol-search-report.json',
@@ -385,6 +385,12 @@ self.addEventListener('fetch', (event) => {
     return;
   }
 
+  // Offline bundles are unpacked into the ACT cache by the page; keeping the
+  // whole archive as well would store every protocol twice.
+  if (url.pathname === '/act-protocols/bundle') {
+    return;
+  }
+
   const pathname = url.pathname;
 
   // Strategy based on resource type
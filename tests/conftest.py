@@ -0,0 +1,15 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from api import index  # noqa: E402
+
+
+@pytest.fixture
+def client():
+    with index.app.test_client() as client:
+        yield client
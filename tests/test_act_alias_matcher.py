@@ -0,0 +1,50 @@
+import importlib.util
+import json
+import re
+
+from api import index
+
+DATA_DIR = index.BASE_DIR / 'static/data'
+
+
+def load_matcher_module():
+    spec = importlib.util.spec_from_file_location(
+        'act_alias_matcher', index.BASE_DIR / 'scripts' / 'act_alias_matcher.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def reference_aliases_in(text, aliases):
+    """The per-alias regex scan the indexers used before the single-pass matcher."""
+    found = set()
+    for alias in aliases:
+        escaped = re.escape(alias).replace(r'\ ', r'\s+')
+        if re.search(rf'(?<![a-z0-9]){escaped}(?![a-z0-9])', text):
+            found.add(alias)
+    return found
+
+
+def test_matcher_reports_overlapping_aliases_on_word_boundaries():
+    matcher = load_matcher_module().AliasMatcher(['calcium', 'calcium chloride', 'epi', 'd50', '1:10,000'])
+    text = 'give calcium chloride, not epinephrine; d50 or d-50 and epi 1:10,000.'
+    assert [alias for _, _, alias in matcher.finditer(text)] == [
+        'calcium', 'calcium chloride', 'd50', 'epi', '1:10,000']
+    start = text.index('1:10,000')
+    assert (start, start + len('1:10,000'), '1:10,000') in set(matcher.finditer(text))
+
+
+def test_matcher_matches_per_alias_regex_on_every_committed_protocol_page():
+    aliases = sorted({
+        alias
+        for record in json.loads((DATA_DIR / 'act-medication-aliases.json').read_text())
+        for alias in record['normalizedAliases']
+    })
+    matcher = load_matcher_module().AliasMatcher(aliases)
+    texts = []
+    for protocol in json.loads((DATA_DIR / 'act-protocol-search.json').read_text()):
+        texts.append(protocol['normalizedText'])
+        texts.extend(page['text'] for page in protocol['pages'])
+    assert any(matcher.aliases_in(text) for text in texts)
+    for text in texts:
+        assert matcher.aliases_in(text) == reference_aliases_in(text, aliases)
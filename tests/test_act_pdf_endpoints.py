@@ -0,0 +1,444 @@
+import io
+import json
+import os
+import struct
+import tarfile
+import threading
+
+import pytest
+
+from api import index
+
+PROTOCOLS = json.loads((index.BASE_DIR / 'static/data/act-protocols.json').read_text())
+PDF_FILE = PROTOCOLS[0]['file']
+
+
+@pytest.fixture(autouse=True)
+def live_rendering(tmp_path, monkeypatch):
+    """Ignore images a local build left in static/rendered/; page_manifest installs its own."""
+    monkeypatch.setattr(index, 'ACT_PAGE_MANIFEST_PATH', tmp_path / 'missing.json')
+
+
+@pytest.fixture
+def render_cache(tmp_path, monkeypatch):
+    cache = index.RenderCache(8 * 1024 * 1024, tmp_path / 'renders', 8 * 1024 * 1024)
+    monkeypatch.setattr(index, 'PDF_RENDER_CACHE', cache)
+    return cache
+
+
+def test_render_cache_evicts_least_recently_used_entries():
+    cache = index.RenderCache(10)
+    cache.put('a', b'12345')
+    cache.put('b', b'12345')
+    assert cache.get('a') == b'12345'
+    cache.put('c', b'12345')
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.stats()['bytes'] == 10
+
+
+def test_disk_tier_survives_a_cold_memory_cache(tmp_path):
+    cache = index.RenderCache(1024, tmp_path, 1024)
+    cache.put('page', b'png-bytes')
+    cold = index.RenderCache(1024, tmp_path, 1024)
+    assert cold.get('page') == b'png-bytes'
+    assert cold.stats()['disk_hits'] == 1
+
+
+def test_disk_tier_tracks_its_size_and_scans_only_to_prune(tmp_path, monkeypatch):
+    (tmp_path / 'old').write_bytes(b'x' * 400)
+    cache = index.RenderCache(1024, tmp_path, 1000)
+    assert cache.stats()['disk_bytes'] == 400
+    scans = []
+    disk_files = cache._disk_files
+    monkeypatch.setattr(cache, '_disk_files', lambda: scans.append(1) or disk_files())
+
+    cache.put('a', b'a' * 300)
+    cache.put('a', b'a' * 200)
+    assert scans == [] and cache.stats()['disk_bytes'] == 600
+    cache.put('b', b'b' * 500)
+    assert scans == [1]
+    assert not (tmp_path / 'old').exists()
+    assert cache.stats()['disk_bytes'] == sum(p.stat().st_size for p in tmp_path.iterdir()) <= 900
+
+
+def test_pdf_page_is_rendered_once_and_revalidated_with_etag(client, render_cache):
+    query = {'file': PDF_FILE, 'page': 1, 'scale': 1.1}
+    first = client.get('/act-protocols/pdf-page', query_string=query)
+    assert first.status_code == 200 and first.mimetype == 'image/png'
+    etag = first.headers['ETag']
+    assert '-s1-png' in etag
+
+    second = client.get('/act-protocols/pdf-page', query_string={**query, 'scale': 1})
+    assert second.get_data() == first.get_data()
+    assert render_cache.stats()['misses'] == 1 and render_cache.stats()['hits'] == 1
+
+    revalidated = client.get('/act-protocols/pdf-page', query_string=query, headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304
+    assert render_cache.stats()['not_modified'] == 1
+
+
+@pytest.fixture
+def page_manifest(tmp_path, monkeypatch):
+    """Point the app at a temp manifest with one pre-rendered page in each variant."""
+    pdf_path = index.resolve_act_protocol_pdf(PDF_FILE)
+    image_dir = tmp_path / 'rendered'
+    image_dir.mkdir()
+    for name in ('page-1@2x.png', 'page-1@0.5x-q50.jpg', 'page-1@2x-q80-t0-0.jpg'):
+        (image_dir / name).write_bytes(f'prerendered {name}'.encode())
+    entry = {
+        'file': PDF_FILE,
+        'sha256': index.file_digest(pdf_path),
+        'pageCount': 1,
+        'pages': [{'width': 612, 'height': 792, 'bytes': {'full': len(b'prerendered page-1@2x.png'),
+                                                           'preview': len(b'prerendered page-1@0.5x-q50.jpg')}}],
+        'variants': [{'name': name, **spec} for name, spec in index.ACT_PRERENDERED_VARIANTS.items()],
+        'imageDir': '/' + os.path.relpath(image_dir, index.BASE_DIR),
+    }
+    manifest_path = tmp_path / 'act-protocol-pages.json'
+    manifest_path.write_text(json.dumps({'version': 3, 'protocols': [entry]}))
+    monkeypatch.setattr(index, 'ACT_PAGE_MANIFEST_PATH', manifest_path)
+    return manifest_path, entry
+
+
+def test_pdf_info_answers_from_prerendered_manifest(client, page_manifest):
+    _, entry = page_manifest
+    info = client.get('/act-protocols/pdf-info', query_string={'file': PDF_FILE}).get_json()
+    assert info['pageCount'] == 1 and info['pages'] == [{'width': 612, 'height': 792}]
+    assert info['images'] == {
+        'full': f"{entry['imageDir']}/page-{{page}}@2x.png",
+        'preview': f"{entry['imageDir']}/page-{{page}}@0.5x-q50.jpg",
+        'tile': f"{entry['imageDir']}/page-{{page}}@2x-q80-t{{column}}-{{row}}.jpg",
+    }
+
+
+@pytest.mark.parametrize('query, name', [
+    ({'scale': 2}, 'page-1@2x.png'),
+    ({'scale': 0.5, 'format': 'jpeg', 'quality': 50}, 'page-1@0.5x-q50.jpg'),
+    ({'scale': 2, 'format': 'jpeg', 'quality': 80, 'tile': '0,0'}, 'page-1@2x-q80-t0-0.jpg'),
+])
+def test_pdf_page_redirects_to_prerendered_images(client, render_cache, page_manifest, query, name):
+    _, entry = page_manifest
+    response = client.get('/act-protocols/pdf-page', query_string={'file': PDF_FILE, 'page': 1, **query})
+    assert response.status_code == 302
+    assert response.headers['Location'] == f"{entry['imageDir']}/{name}"
+    assert render_cache.stats()['misses'] == 0
+
+    out_of_range = client.get('/act-protocols/pdf-page', query_string={'file': PDF_FILE, 'page': 2, **query})
+    assert out_of_range.status_code == 404
+
+
+def test_variants_not_prerendered_are_rendered_live(client, render_cache, page_manifest):
+    pdf_path = index.resolve_act_protocol_pdf(PDF_FILE)
+    assert index.act_pdf_page_image(pdf_path, 1, 2.0) == b'prerendered page-1@2x.png'
+    query = {'file': PDF_FILE, 'page': 1, 'scale': 0.5, 'format': 'jpeg', 'quality': 75}
+    response = client.get('/act-protocols/pdf-page', query_string=query)
+    assert response.status_code == 200 and response.get_data()[:2] == b'\xff\xd8'
+    assert render_cache.stats()['misses'] == 1
+    beyond = client.get('/act-protocols/pdf-page', query_string={
+        'file': PDF_FILE, 'page': 1, 'scale': 2, 'format': 'jpeg', 'quality': 80, 'tile': '3,0'})
+    assert beyond.status_code == 404
+
+
+def test_stale_prerendered_manifest_falls_back_to_live_render(client, render_cache, page_manifest):
+    manifest_path, entry = page_manifest
+    manifest_path.write_text(json.dumps({'version': 1, 'protocols': [{**entry, 'sha256': '0' * 64}]}))
+    response = client.get('/act-protocols/pdf-page', query_string={'file': PDF_FILE, 'page': 1, 'scale': 2})
+    assert response.status_code == 200 and response.get_data()[:4] == b'\x89PNG'
+    assert render_cache.stats()['misses'] == 1
+
+
+def test_cache_stats_report_pdf_render_metrics(client, render_cache):
+    stats = client.get('/api/cache-stats').get_json()
+    assert stats['act_pdf_pages']['max_bytes'] == render_cache.max_bytes
+
+
+def png_size(data):
+    return struct.unpack('>II', data[16:24])
+
+
+def test_tiles_clip_the_page_into_fixed_squares(client, render_cache):
+    info = client.get('/act-protocols/pdf-info', query_string={'file': PDF_FILE}).get_json()
+    width, height = info['pages'][0]['width'], info['pages'][0]['height']
+    assert info['tileSize'] == index.PDF_TILE_PIXELS
+
+    columns = -(-round(width * 2) // index.PDF_TILE_PIXELS)
+    query = {'file': PDF_FILE, 'page': 1, 'scale': 2}
+    first = client.get('/act-protocols/pdf-page', query_string={**query, 'tile': '0,0'})
+    assert first.status_code == 200 and png_size(first.get_data()) == (512, 512)
+    assert first.headers['ETag'].strip('"').endswith('-s2-png-t0-0')
+    last = client.get('/act-protocols/pdf-page', query_string={**query, 'tile': f'{columns - 1},0'})
+    assert png_size(last.get_data())[0] == round(width * 2) - (columns - 1) * index.PDF_TILE_PIXELS
+    beyond = client.get('/act-protocols/pdf-page', query_string={**query, 'tile': f'{columns},0'})
+    assert beyond.status_code == 404
+
+
+def test_jpeg_preview_is_keyed_by_quantized_quality(client, render_cache):
+    query = {'file': PDF_FILE, 'page': 1, 'scale': 0.5, 'format': 'jpg', 'quality': 52}
+    preview = client.get('/act-protocols/pdf-page', query_string=query)
+    assert preview.status_code == 200 and preview.mimetype == 'image/jpeg'
+    assert preview.get_data()[:2] == b'\xff\xd8'
+    assert preview.headers['ETag'].strip('"').endswith('-s0.5-jpeg-q50')
+    same = client.get('/act-protocols/pdf-page', query_string={**query, 'format': 'jpeg', 'quality': 49})
+    assert same.get_data() == preview.get_data() and render_cache.stats()['hits'] == 1
+
+
+def test_pdf_page_rejects_unsupported_formats_and_tiles(client):
+    query = {'file': PDF_FILE, 'page': 1}
+    assert client.get('/act-protocols/pdf-page', query_string={**query, 'format': 'webp'}).status_code == 400
+    assert client.get('/act-protocols/pdf-page', query_string={**query, 'tile': '-1,0'}).status_code == 400
+    assert client.get('/act-protocols/pdf-page', query_string={**query, 'tile': '1'}).status_code == 400
+
+
+HIGHLIGHT_FILE = '/static/protocols/act/cardiac/3203-C002_Asystole___Pulseless_Electrical_Activity.pdf'
+
+
+def highlights(client, **query):
+    return client.get('/act-protocols/pdf-highlights', query_string={'file': HIGHLIGHT_FILE, 'page': 1, **query})
+
+
+def test_page_words_merge_rects_per_line_and_drop_nested_spans():
+    page = index.ActPageWords(100, 100, [
+        [10, 10, 20, 15, 0, 'Calcium'],
+        [22, 10, 40, 15, 0, 'chloride'],
+        [10, 20, 30, 25, 1, '1:10,000'],
+        [32, 20, 40, 25, 1, 'IV'],
+        [10, 30, 20, 35, 2, 'calcium'],
+    ])
+    matches = page.highlights([['calcium', 'chloride'], ['calcium'], ['10', '000', 'iv']])
+    assert matches == [
+        {'text': 'Calcium chloride', 'rects': [[10, 10, 40, 15]]},
+        {'text': '1:10,000 IV', 'rects': [[10, 20, 40, 25]]},
+        {'text': 'calcium', 'rects': [[10, 30, 20, 35]]},
+    ]
+    assert page.rects(1, 2) == [[22, 10, 40, 15], [10, 20, 30, 25]]
+
+
+def test_committed_word_index_matches_the_pdf():
+    pdf_path = index.resolve_act_protocol_pdf(HIGHLIGHT_FILE)
+    data = json.loads(index.act_word_index_path(HIGHLIGHT_FILE).read_text())
+    assert data['sha256'] == index.file_digest(pdf_path)
+    import fitz
+    with fitz.open(pdf_path) as doc:
+        assert [page['page'] for page in data['pages']] == list(range(1, doc.page_count + 1))
+        assert data['pages'][0] == {'page': 1, **json.loads(json.dumps(index.act_word_boxes(doc.load_page(0))))}
+
+
+def test_highlights_cover_medication_aliases(client):
+    response = highlights(client, q='epi')
+    result = response.get_json()
+    assert response.status_code == 200 and result['mode'] == 'phrase'
+    assert 'Epinephrine' in [match['text'] for match in result['matches']]
+    for match in result['matches']:
+        for x0, y0, x1, y1 in match['rects']:
+            assert 0 <= x0 < x1 <= result['width'] and 0 <= y0 < y1 <= result['height']
+
+
+def test_highlights_fall_back_to_single_terms(client):
+    result = highlights(client, q='epinephrine unicornium').get_json()
+    assert result['mode'] == 'terms'
+    assert {match['text'] for match in result['matches']} == {'Epinephrine'}
+    assert highlights(client, q='unicornium').get_json()['matches'] == []
+
+
+def test_stale_word_index_falls_back_to_the_pdf(client, tmp_path, monkeypatch):
+    committed = highlights(client, q='epinephrine').get_json()
+    stale = index.act_word_index_path(HIGHLIGHT_FILE)
+    data = json.loads(stale.read_text())
+    monkeypatch.setattr(index, 'ACT_WORD_INDEX_DIR', tmp_path)
+    moved = index.act_word_index_path(HIGHLIGHT_FILE, tmp_path)
+    moved.parent.mkdir(parents=True)
+    moved.write_text(json.dumps({**data, 'sha256': '0' * 64, 'pages': []}))
+    assert highlights(client, q='epinephrine').get_json() == committed
+
+
+def test_highlight_request_validation(client):
+    assert highlights(client, q='').status_code == 400
+    assert highlights(client, q='epi', page='x').status_code == 400
+    assert highlights(client, q='epi', page=99).status_code == 404
+    assert client.get('/act-protocols/pdf-highlights',
+                      query_string={'file': '/static/protocols/act/../../api/index.py', 'q': 'epi'}).status_code == 404
+
+
+@pytest.fixture
+def document_pool(monkeypatch):
+    pool = index.PdfDocumentPool(2)
+    monkeypatch.setattr(index, 'ACT_DOCUMENTS', pool)
+    yield pool
+    pool.clear()
+
+
+def test_only_listed_protocol_pdfs_resolve():
+    assert index.resolve_act_protocol_pdf(PDF_FILE) == (index.BASE_DIR / PDF_FILE.lstrip('/')).resolve()
+    assert index.resolve_act_protocol_pdf(PDF_FILE.replace(' ', '%20')) == index.resolve_act_protocol_pdf(PDF_FILE)
+    assert index.resolve_act_protocol_pdf('/static/protocols/act/../../api/index.py') is None
+    assert index.resolve_act_protocol_pdf('/static/protocols/act/cardiac/unlisted.pdf') is None
+    assert index.resolve_act_protocol_pdf(None) is None
+
+
+def test_page_requests_reuse_one_open_document(client, render_cache, document_pool):
+    for tile in ('0,0', '1,0', '0,1'):
+        response = client.get('/act-protocols/pdf-page',
+                              query_string={'file': PDF_FILE, 'page': 1, 'scale': 2, 'tile': tile})
+        assert response.status_code == 200
+    assert document_pool.stats() == {'documents': 1, 'max_documents': 2, 'opens': 1, 'hits': 2}
+
+
+def test_document_pool_evicts_and_reopens_changed_files(tmp_path, document_pool):
+    source = index.resolve_act_protocol_pdf(PDF_FILE)
+    paths = []
+    for name in ('a', 'b', 'c'):
+        path = tmp_path / f'{name}.pdf'
+        path.write_bytes(source.read_bytes())
+        paths.append(path)
+    with document_pool.document(paths[0]) as first:
+        page_count = first.page_count
+    for path in paths[1:]:
+        with document_pool.document(path) as doc:
+            assert doc.page_count == page_count
+    assert first.is_closed
+    assert document_pool.stats()['documents'] == 2 and document_pool.stats()['opens'] == 3
+
+    stat = paths[2].stat()
+    os.utime(paths[2], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    with document_pool.document(paths[2]):
+        pass
+    assert document_pool.stats()['opens'] == 4
+
+
+def test_document_evicted_while_in_use_is_closed_on_release(tmp_path, document_pool):
+    source = index.resolve_act_protocol_pdf(PDF_FILE)
+    paths = [tmp_path / f'{name}.pdf' for name in 'abc']
+    for path in paths:
+        path.write_bytes(source.read_bytes())
+    with document_pool.document(paths[0]) as busy:
+        for path in paths[1:]:
+            with document_pool.document(path):
+                pass
+        assert not busy.is_closed and busy.page_count >= 1
+    assert busy.is_closed
+
+
+
+def test_documents_of_different_pdfs_are_not_used_concurrently(tmp_path, document_pool):
+    source = index.resolve_act_protocol_pdf(PDF_FILE)
+    paths = [tmp_path / f'{name}.pdf' for name in 'ab']
+    for path in paths:
+        path.write_bytes(source.read_bytes())
+    entered = threading.Event()
+
+    def open_second():
+        with document_pool.document(paths[1]):
+            entered.set()
+
+    with document_pool.document(paths[0]):
+        worker = threading.Thread(target=open_second)
+        worker.start()
+        assert not entered.wait(0.2)
+    worker.join(5)
+    assert entered.is_set()
+
+def read_bundle(response):
+    archive = tarfile.open(fileobj=io.BytesIO(response.get_data()))
+    members = archive.getmembers()
+    assert members[0].name == 'manifest.json'
+    return json.load(archive.extractfile(members[0])), {m.name: archive.extractfile(m).read() for m in members[1:]}
+
+
+def test_bundle_holds_each_pdf_its_info_and_page_images(client, render_cache):
+    second = PROTOCOLS[1]['file']
+    response = client.get('/act-protocols/bundle', query_string=[
+        ('file', PDF_FILE), ('file', second.replace(' ', '%20')), ('file', PDF_FILE)])
+    assert response.status_code == 200 and response.mimetype == 'application/x-tar'
+    manifest, members = read_bundle(response)
+    assert [record['file'] for record in manifest['protocols']] == [PDF_FILE, second]
+    assert set(members) == {entry['name'] for record in manifest['protocols'] for entry in record['entries']}
+
+    record = manifest['protocols'][0]
+    by_kind = {(entry['kind'], entry.get('page')): members[entry['name']] for entry in record['entries']}
+    assert by_kind[('pdf', None)] == index.resolve_act_protocol_pdf(PDF_FILE).read_bytes()
+    info = client.get('/act-protocols/pdf-info', query_string={'file': PDF_FILE}).get_json()
+    assert json.loads(by_kind[('info', None)]) == info
+    assert sorted(page for kind, page in by_kind if kind == 'page') == list(range(1, info['pageCount'] + 1))
+    page = client.get('/act-protocols/pdf-page', query_string={'file': PDF_FILE, 'page': 1, 'scale': 2})
+    assert by_kind[('page', 1)] == page.get_data()
+
+
+def read_bundle_parts(client, query):
+    manifests, members, start = [], {}, 0
+    while start is not None:
+        response = client.get('/act-protocols/bundle', query_string={**query, 'start': start})
+        assert response.status_code == 200
+        assert len(response.get_data()) <= index.ACT_BUNDLE_MAX_BYTES + 2 * tarfile.BLOCKSIZE + 8192
+        manifest, part = read_bundle(response)
+        manifests.append(manifest)
+        members.update(part)
+        start = manifest['next']
+    return manifests, members
+
+
+def test_category_bundle_lists_every_protocol_in_the_category(client, render_cache):
+    response = client.get('/act-protocols/bundle', query_string={'category': 'General'})
+    assert 'act-General.tar' in response.headers['Content-Disposition']
+    manifests, _ = read_bundle_parts(client, {'category': 'General'})
+    files = [record['file'] for manifest in manifests for record in manifest['protocols']]
+    assert list(dict.fromkeys(files)) == [p['file'] for p in PROTOCOLS if p['category'] == 'General']
+
+
+def test_category_lookup_ignores_case(client, render_cache):
+    response = client.get('/act-protocols/bundle', query_string={'category': 'general'})
+    assert response.status_code == 200
+    assert 'act-General.tar' in response.headers['Content-Disposition']
+
+
+def test_bundle_is_split_into_parts_under_the_size_cap(client, render_cache, monkeypatch):
+    second = PROTOCOLS[1]['file']
+    query = {'file': [PDF_FILE, second]}
+    whole_manifest, whole = read_bundle(client.get('/act-protocols/bundle', query_string=query))
+    assert whole_manifest['next'] is None
+    cap = max(len(data) for data in whole.values()) + tarfile.BLOCKSIZE * 2
+    monkeypatch.setattr(index, 'ACT_BUNDLE_MAX_BYTES', cap)
+
+    manifests, members = read_bundle_parts(client, query)
+    assert len(manifests) > 1
+    for manifest in manifests:
+        names = [entry['name'] for record in manifest['protocols'] for entry in record['entries']]
+        assert sum(len(index.tar_member(name, whole[name])) for name in names) <= cap
+    assert members == whole
+    entries = [(record['file'], entry['name']) for manifest in manifests
+               for record in manifest['protocols'] for entry in record['entries']]
+    assert entries == [(record['file'], entry['name']) for record in whole_manifest['protocols']
+                       for entry in record['entries']]
+
+
+def test_bundle_parts_are_sized_before_entries_are_read(client, page_manifest, monkeypatch):
+    pdf_size = index.resolve_act_protocol_pdf(PDF_FILE).stat().st_size
+    info = client.get('/act-protocols/pdf-info', query_string={'file': PDF_FILE}).get_json()
+    info_size = len(json.dumps(info, separators=(',', ':')))
+    monkeypatch.setattr(index, 'ACT_BUNDLE_MAX_BYTES', index.tar_member_size(pdf_size) + index.tar_member_size(info_size))
+    read = []
+    entry_data = index.act_bundle_entry_data
+    monkeypatch.setattr(index, 'act_bundle_entry_data',
+                        lambda protocol, entry: read.append(entry['kind']) or entry_data(protocol, entry))
+
+    manifests, members = read_bundle_parts(client, {'file': PDF_FILE})
+    assert [[entry['kind'] for record in m['protocols'] for entry in record['entries']] for m in manifests] == [
+        ['pdf', 'info'], ['page']]
+    assert read == ['pdf', 'info', 'page']
+    assert members['000/page-1.png'] == b'prerendered page-1@2x.png'
+
+
+def test_bundle_entry_larger_than_a_part_is_refused(client, page_manifest, monkeypatch):
+    monkeypatch.setattr(index, 'ACT_BUNDLE_MAX_BYTES', 4096)
+    monkeypatch.setattr(index, 'act_bundle_entry_data', lambda *_: pytest.fail('read an oversized entry'))
+    response = client.get('/act-protocols/bundle', query_string={'file': PDF_FILE})
+    assert response.status_code == 413
+
+
+def test_bundle_request_validation(client):
+    assert client.get('/act-protocols/bundle').status_code == 400
+    assert client.get('/act-protocols/bundle', query_string={'file': PDF_FILE, 'category': 'General'}).status_code == 400
+    assert client.get('/act-protocols/bundle', query_string={'category': 'Nope'}).status_code == 404
+    assert client.get('/act-protocols/bundle', query_string={'file': '/static/protocols/act/x.pdf'}).status_code == 404
+    assert client.get('/act-protocols/bundle', query_string={'file': PDF_FILE, 'start': '-1'}).status_code == 400
+    assert client.get('/act-protocols/bundle', query_string={'file': PDF_FILE, 'start': 10000}).status_code == 400
@@ -0,0 +1,74 @@
+import importlib.util
+import json
+import re
+import subprocess
+import sys
+
+from api import index
+
+
+def load_text_index_module():
+    spec = importlib.util.spec_from_file_location(
+        'act_text_index', index.BASE_DIR / 'scripts' / 'act_text_index.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_phrase_positions_match_a_scan_of_the_page_tokens():
+    text_index = index.get_act_text_index()
+    records = index.load_module_json(index.ACT_SEARCH_PATH)
+    page_tokens = [re.findall(r'[a-z0-9]+', page['text'].lower()) for record in records for page in record['pages']]
+    for phrase in (['chest', 'pain'], ['rapid', 'sequence', 'induction'], ['0', '4', 'mg']):
+        expected = {}
+        for page_id, tokens in enumerate(page_tokens):
+            starts = [i for i in range(len(tokens) - len(phrase) + 1) if tokens[i:i + len(phrase)] == phrase]
+            if starts:
+                expected[page_id] = starts
+        assert text_index.phrase_positions(phrase) == expected
+
+
+def test_medication_alias_query_finds_protocols_by_generic_name(client):
+    payload = client.get('/api/act/search', query_string={'q': 'NTG'}).get_json()
+    ids = [hit['id'] for hit in payload['hits']]
+    assert {'3203-C001', '3203-C010'} <= set(ids)
+    assert 'nitroglycerin' in payload['hits'][0]['pages'][0]['snippet']
+
+
+def test_title_and_phrase_matches_rank_first(client):
+    seizures = client.get('/api/act/search', query_string={'q': 'seizure', 'limit': 1}).get_json()
+    assert seizures['hits'][0]['title'] == 'Seizures'
+    chest_pain = client.get('/api/act/search', query_string={'q': 'chest pain', 'limit': 5}).get_json()
+    assert all('chest pain' in hit['pages'][0]['snippet'] for hit in chest_pain['hits'])
+    assert chest_pain['total'] > 5
+
+
+def test_category_filter_and_paging(client):
+    payload = client.get('/api/act/search', query_string={'q': 'airway', 'category': 'Pediatric', 'limit': 2}).get_json()
+    assert payload['hits'] and all(hit['category'] == 'Pediatric' for hit in payload['hits'])
+    second = client.get('/api/act/search', query_string={
+        'q': 'airway', 'category': 'Pediatric', 'limit': 2, 'offset': 2}).get_json()
+    assert {hit['id'] for hit in second['hits']}.isdisjoint(hit['id'] for hit in payload['hits'])
+    assert client.get('/api/act/search', query_string={'q': '  '}).status_code == 400
+
+
+def test_committed_offline_shards_match_the_search_index():
+    expected = load_text_index_module().current_files()
+    committed = {path.name: path.read_text(encoding='utf-8') for path in index.ACT_TEXT_INDEX_DIR.glob('*.json')}
+    assert committed == expected, 'run python scripts/act_text_index.py'
+
+    text_index = index.get_act_text_index()
+    shard = json.loads(committed['terms-a.json'])
+    for page_id, first, *gaps in shard['aspirin']:
+        positions = [first]
+        for gap in gaps:
+            positions.append(positions[-1] + gap)
+        assert (page_id, tuple(positions)) in text_index.postings['aspirin']
+
+
+def test_index_builder_helpers_do_not_load_the_app():
+    script = ("import sys; sys.path[:0] = ['scripts', '.']; import act_text_index, act_word_index; "
+              "print(sorted({'flask', 'api.index'} & set(sys.modules)))")
+    result = subprocess.run([sys.executable, '-c', script], cwd=index.BASE_DIR,
+                            capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == '[]'
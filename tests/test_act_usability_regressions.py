@@ -80,11 +80,24 @@ def test_offline_download_counter_starts_at_zero_and_advances_per_completed_pdf(
     assert 'state.downloadCompleted = 0;' in PROTOCOLS
     assert "`${state.downloadCompleted} out of ${state.downloadTotal}`" in PROTOCOLS
     cache_start = PROTOCOLS.index('async function cacheProtocols')
-    complete_start = PROTOCOLS.index('await cachePdf(protocol);', cache_start)
-    increment_start = PROTOCOLS.index('state.downloadCompleted += 1;', cache_start)
+    bundle_start = PROTOCOLS.index('await cacheBundle(group);', cache_start)
+    bundle_increment = PROTOCOLS.index('state.downloadCompleted += 1;', cache_start)
+    assert bundle_start < bundle_increment
+    complete_start = PROTOCOLS.index('await cachePdf(protocol);', bundle_increment)
+    increment_start = PROTOCOLS.index('state.downloadCompleted += 1;', bundle_increment + 1)
     assert complete_start < increment_start
 
 
+def test_offline_bundle_is_read_incrementally_part_by_part():
+    bundle_start = PROTOCOLS.index('async function cacheBundlePart')
+    bundle_body = PROTOCOLS[bundle_start:PROTOCOLS.index('function notifyServiceWorker')]
+    assert 'readTar(response.body)' in bundle_body
+    assert 'arrayBuffer()' not in bundle_body
+    assert 'for await (const member of members)' in bundle_body
+    assert 'return manifest.next ?? null;' in bundle_body
+    assert 'while (start !== null);' in bundle_body
+
+
 def test_protocol_opening_does_not_wait_for_full_background_cache_online():
     open_start = PROTOCOLS.index('function openProtocolViewer')
     handle_start = PROTOCOLS.index('async function handleOpen')
@@ -101,3 +114,13 @@ def test_pwa_checks_the_deployment_version_and_refreshes_app_caches():
     assert "type: 'CLEAR_APP_CACHES'" in PWA_UTILS
     assert "type: 'APP_CACHES_CLEARED'" in SERVICE_WORKER
     assert "name.startsWith('study-guru-') || name.startsWith('nurse-study-hub-')" in SERVICE_WORKER
+
+
+def test_pdf_text_search_uses_the_ranked_endpoint_with_shard_fallback():
+    assert "const TEXT_SEARCH_URL = '/api/act/search';" in PROTOCOLS
+    assert "const TEXT_INDEX_URL = '/static/data/act-text-index/';" in PROTOCOLS
+    assert 'act-protocol-search.json' not in PROTOCOLS
+    assert 'normalizedText' not in PROTOCOLS
+    update = PROTOCOLS[PROTOCOLS.index('async function updateTextHits'):]
+    assert update.index('await apiTextHits(query)') < update.index('await shardTextHits(q)')
+    assert "'/static/data/act-text-index/meta.json'" in SERVICE_WORKER
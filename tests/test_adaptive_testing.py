@@ -0,0 +1,95 @@
+import json
+import math
+import os
+import random
+
+import pytest
+
+from api import index
+
+
+def run_exam(client, ability, exam='NCLEX', seed=3, **options):
+    rng = random.Random(seed)
+    responses = []
+    while True:
+        reply = client.post('/api/cat/next', json={'exam': exam, 'responses': responses, 'seed': seed, **options})
+        assert reply.status_code == 200
+        reply = reply.get_json()
+        if reply['done']:
+            return reply, responses
+        b = reply['question']['difficulty']
+        responses.append([reply['question']['id'], rng.random() < 1 / (1 + math.exp(-(ability - b)))])
+
+
+def test_ability_estimate_follows_responses_and_narrows():
+    theta, se = index.estimate_ability([0.0] * 10, [True] * 8 + [False] * 2)
+    assert theta > 0.5
+    _, wider = index.estimate_ability([0.0] * 4, [True] * 3 + [False])
+    assert se < wider
+    assert index.estimate_ability([], [])[0] == 0.0
+    assert index.estimate_ability([0.0] * 20, [True] * 20)[0] < 5
+
+
+def test_nearest_items_match_a_full_scan():
+    items = index.get_cat_item_index(index.NCLEX_MASTER_PATH)
+    category = 'Management of Care'
+    administered = set(items.sorted_items[category][::3])
+    for theta in (-2.0, -0.3, 0.0, 0.41, 2.5):
+        found = items.nearest(category, theta, administered, 5)
+        pool = [p for p in items.sorted_items[category] if p not in administered]
+        distances = sorted(abs(items.difficulties[p] - theta) for p in pool)[:5]
+        assert [abs(items.difficulties[p] - theta) for p in found] == pytest.approx(distances)
+
+
+def test_adaptive_exam_separates_strong_and_weak_candidates(client):
+    strong, responses = run_exam(client, ability=1.5)
+    assert strong['result'] == 'pass' and strong['stop_reason'] == 'confidence'
+    assert strong['administered'] == len(responses) >= index.CAT_EXAMS['NCLEX']['min_items']
+    assert len({question_id for question_id, _ in responses}) == len(responses)
+
+    weak, _ = run_exam(client, ability=-1.5)
+    assert weak['result'] == 'fail'
+
+
+def test_nclex_content_follows_the_test_plan(client):
+    _, responses = run_exam(client, ability=0.0, min_items=100, max_items=100)
+    items = index.get_cat_item_index(index.NCLEX_MASTER_PATH)
+    counts = {}
+    for question_id, _ in responses:
+        category = items.category_of[items.by_id[question_id]]
+        counts[category] = counts.get(category, 0) + 1
+    for category, weight in index.NCLEX_CATEGORIES.items():
+        assert abs(counts[category] - weight * 100) <= 1
+
+
+def test_calibrated_difficulties_override_the_heuristic(client, tmp_path, monkeypatch):
+    items = index.get_cat_item_index(index.CFRN_LEGACY_PATH)
+    question_id = items.ids[0]
+    calibration = tmp_path / 'item-difficulty.json'
+    calibration.write_text(json.dumps({'version': 1, 'banks': {
+        'Nursing_Certifications/CFRN_Question_Bank': {question_id: 2.25}}}))
+    monkeypatch.setattr(index, 'ITEM_DIFFICULTY_PATH', calibration)
+    calibrated = index.get_cat_item_index(index.CFRN_LEGACY_PATH)
+    assert calibrated.difficulties[0] == 2.25
+    assert calibrated.difficulties[1] == items.difficulties[1]
+
+
+def test_recalibrating_replaces_the_cached_item_index(tmp_path, monkeypatch):
+    store = index.QuestionBankStore()
+    monkeypatch.setattr(index, 'QUESTION_BANKS', store)
+    calibration = tmp_path / 'item-difficulty.json'
+    monkeypatch.setattr(index, 'ITEM_DIFFICULTY_PATH', calibration)
+    question_id = index.get_cat_item_index(index.CFRN_LEGACY_PATH).ids[0]
+    for step, difficulty in enumerate([1.5, -0.5, 0.75], 1):
+        calibration.write_text(json.dumps({'version': 1, 'banks': {
+            'Nursing_Certifications/CFRN_Question_Bank': {question_id: difficulty}}}))
+        os.utime(calibration, ns=(step * 10**9, step * 10**9))
+        assert index.get_cat_item_index(index.CFRN_LEGACY_PATH).difficulties[0] == difficulty
+    derived = store._entries[str(index.CFRN_LEGACY_PATH)]['derived']
+    assert [name for name in derived if name.startswith('cat_items')] == ['cat_items']
+
+
+def test_invalid_cat_requests_are_rejected(client):
+    assert client.post('/api/cat/next', json={'exam': 'USMLE'}).status_code == 400
+    assert client.post('/api/cat/next', json={'exam': 'NCLEX', 'responses': [['nope', True]]}).status_code == 400
+    assert client.post('/api/cat/next', json={'exam': 'NCLEX', 'responses': [['Q1', 'yes']]}).status_code == 400
@@ -0,0 +1,50 @@
+import pytest
+
+from api import index
+
+
+def legacy_filter(questions, module_num):
+    """The per-request filter the membership map replaces."""
+    filters = index.ADULT_HEALTH_MODULES[module_num]['filters']
+    filtered = []
+    for q in questions:
+        q_chapter = index.extract_chapter_number(q.get('category', ''))
+        for f in filters:
+            if q.get('book', '') == f['book'] and any(
+                    q_chapter in (ch, ch.zfill(2), ch.lstrip('0')) for ch in f['chapters']):
+                filtered.append(q)
+                break
+    return filtered
+
+
+@pytest.fixture
+def questions():
+    return index.load_adult_health_questions()
+
+
+@pytest.mark.parametrize('module_num', sorted(index.ADULT_HEALTH_MODULES))
+def test_module_membership_matches_the_legacy_filter(questions, module_num):
+    expected = legacy_filter(questions, module_num)
+    assert expected
+    assert index.get_adult_health_module_questions(module_num) == expected
+    assert index.filter_adult_health_questions(questions, module_num) == expected
+    assert index.get_adult_health_module_stats()[module_num]['count'] == len(expected)
+
+
+def test_comprehensive_quiz_is_the_deduplicated_union(questions):
+    expected, seen = [], set()
+    for module_num in index.ADULT_HEALTH_MODULES:
+        for q in legacy_filter(questions, module_num):
+            key = q.get('id', q.get('stem', ''))
+            if key not in seen:
+                seen.add(key)
+                expected.append(q)
+    assert index.get_adult_health_comprehensive_questions() == expected
+
+
+def test_membership_is_built_once_per_bank_version(monkeypatch):
+    index.get_adult_health_membership()
+    monkeypatch.setattr(index.AdultHealthMembership, 'build',
+                        classmethod(lambda cls, path: pytest.fail('membership rebuilt')))
+    index.get_adult_health_module_stats()
+    index.get_adult_health_module_questions(1)
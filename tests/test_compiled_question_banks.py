@@ -0,0 +1,86 @@
+import importlib.util
+import json
+
+import pytest
+
+from api import index
+
+SOURCES = sorted(p for p in index.MODULES_DIR.glob('*/*.json') if not p.parent.name.startswith('.'))
+
+
+def load_build_script():
+    spec = importlib.util.spec_from_file_location(
+        'build_question_banks', index.BASE_DIR / 'scripts' / 'build-question-banks.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_committed_artifacts_are_up_to_date(capsys):
+    assert load_build_script().check() == 0, capsys.readouterr().out
+
+
+@pytest.mark.parametrize('source', SOURCES, ids=lambda p: p.stem)
+def test_artifact_round_trips_the_source_json(source):
+    compiled = index.load_compiled_question_bank(source)
+    data = json.loads(source.read_text(encoding='utf-8'))
+    questions = index.questions_of(data)
+
+    assert json.dumps(compiled.to_data()) == json.dumps(data)
+    assert compiled.categories() == [q.get('category') for q in questions]
+    if questions:
+        assert compiled.question(len(questions) - 1) == questions[-1]
+
+
+def test_stale_artifacts_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(index, 'MODULES_DIR', tmp_path)
+    monkeypatch.setattr(index, 'COMPILED_DIR', tmp_path / '.compiled')
+    source = tmp_path / 'Bank' / 'Quiz.json'
+    source.parent.mkdir()
+    source.write_text(json.dumps({'questions': [{'id': 'Q1', 'category': 'A'}]}), encoding='utf-8')
+    artifact = index.compiled_bank_path(source)
+    artifact.parent.mkdir(parents=True)
+    artifact.write_bytes(index.encode_compiled_bank(source.read_bytes()))
+    assert index.load_compiled_question_bank(source) is not None
+
+    source.write_text(json.dumps({'questions': [{'id': 'Q2', 'category': 'B'}]}), encoding='utf-8')
+    assert index.load_compiled_question_bank(source) is None
+
+
+def test_category_lookups_decode_only_the_selected_records(monkeypatch):
+    store = index.QuestionBankStore()
+    monkeypatch.setattr(index, 'QUESTION_BANKS', store)
+
+    bank_index = index.get_bank_index(index.CCRN_COMPREHENSIVE_PATH)
+    assert bank_index.count('Cardiovascular') > 0
+    assert store.stats()['misses'] == 0
+
+    selected = bank_index.questions_in('Cardiovascular')
+    assert [q['category'] for q in selected] == ['Cardiovascular'] * bank_index.count('Cardiovascular')
+    assert bank_index.questions_in('Cardiovascular')[0] is selected[0]
+    assert store.stats()['misses'] == 0
+
+    assert len(bank_index.questions) == bank_index.size
+    assert store.stats()['misses'] == 1
+
+
+def test_full_loads_come_from_the_fresh_artifact(monkeypatch):
+    store = index.QuestionBankStore()
+    decoded = []
+    to_data = index.CompiledQuestionBank.to_data
+    monkeypatch.setattr(index.CompiledQuestionBank, 'to_data', lambda self: decoded.append(self) or to_data(self))
+    data = store.load(index.CCRN_COMPREHENSIVE_PATH)
+    assert len(decoded) == 1
+    assert json.dumps(data) == json.dumps(json.loads(index.CCRN_COMPREHENSIVE_PATH.read_text(encoding='utf-8')))
+
+
+def test_freshness_checks_hash_only_when_the_source_changes(monkeypatch):
+    compiled = index.load_compiled_question_bank(index.CCRN_COMPREHENSIVE_PATH)
+
+    class NoHashing:
+        @staticmethod
+        def sha256(_):
+            raise AssertionError('source was re-hashed')
+
+    monkeypatch.setattr(index, 'hashlib', NoHashing)
+    assert compiled.is_fresh(index.CCRN_COMPREHENSIVE_PATH)
@@ -0,0 +1,73 @@
+import hashlib
+import importlib.util
+import json
+
+from api import index
+
+CFRN_TRAUMA_PATH = index.MODULES_DIR / 'Nursing_Certifications' / index.CFRN_DOMAIN_FILES['Trauma']
+
+
+def load_detector():
+    spec = importlib.util.spec_from_file_location(
+        'find_duplicate_questions', index.BASE_DIR / 'scripts' / 'find-duplicate-questions.py')
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def doc(bank, position, stem, options=('Yes', 'No'), **extra):
+    question = {'id': f'{bank}-{position}', 'stem': stem, 'options': list(options), **extra}
+    return {'bank': bank, 'position': position, 'id': question['id'], 'question': question}
+
+
+def test_detector_clusters_exact_and_near_duplicates():
+    stem = 'A client with diabetic ketoacidosis has a serum potassium of 3.1 mEq/L. What should the nurse do first?'
+    docs = [
+        doc('A', 0, stem),
+        {**doc('B', 0, stem), 'question': doc('A', 0, stem)['question']},
+        doc('C', 0, stem.replace('first', 'first of all')),
+        doc('D', 0, 'Which finding indicates a tension pneumothorax after a motor vehicle crash?'),
+    ]
+    clusters, _, keys = load_detector().find_duplicates(docs, threshold=0.7)
+    assert keys[0] == keys[1] != keys[2]
+    assert len(clusters) == 1
+    assert [member[0] for member in clusters[0]['members']] == ['A', 'B', 'C']
+    assert clusters[0]['exact'] is False and 0.7 <= clusters[0]['minSimilarity'] < 1
+
+
+def test_committed_content_keys_match_their_banks():
+    recorded = json.loads(index.CONTENT_KEYS_PATH.read_text())['banks']
+    for bank, entry in recorded.items():
+        source = index.MODULES_DIR / f'{bank}.json'
+        assert entry['source_sha256'] == hashlib.sha256(source.read_bytes()).hexdigest(), (
+            f'{bank} changed; run python scripts/find-duplicate-questions.py')
+
+
+def test_duplicate_report_is_generated_outside_the_committed_artifacts():
+    report = load_detector().REPORT_OUT
+    assert not report.is_relative_to(index.MODULES_DIR)
+    assert not (index.COMPILED_DIR / 'question-duplicates.json').exists()
+
+
+def test_store_shares_questions_duplicated_across_banks():
+    store = index.QuestionBankStore()
+    legacy = index.questions_of(store.load(index.CFRN_LEGACY_PATH))
+    trauma = index.questions_of(store.load(CFRN_TRAUMA_PATH))
+    legacy_ids = {id(q) for q in legacy}
+    assert trauma and all(id(q) in legacy_ids for q in trauma)
+    assert store.stats()['shared_copies'] == len(trauma)
+    fresh = json.loads(CFRN_TRAUMA_PATH.read_text())
+    assert trauma == index.questions_of(fresh)
+
+
+def test_stale_content_keys_are_ignored(tmp_path, monkeypatch):
+    recorded = json.loads(index.CONTENT_KEYS_PATH.read_text())
+    for entry in recorded['banks'].values():
+        entry['source_sha256'] = '0' * 64
+    stale = tmp_path / 'question-content-keys.json'
+    stale.write_text(json.dumps(recorded))
+    monkeypatch.setattr(index, 'CONTENT_KEYS_PATH', stale)
+    store = index.QuestionBankStore()
+    store.load(index.CFRN_LEGACY_PATH)
+    store.load(CFRN_TRAUMA_PATH)
+    assert store.stats()['shared_copies'] == 0
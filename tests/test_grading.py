@@ -0,0 +1,66 @@
+import time
+
+from api import index
+
+NCLEX = {'category': 'NCLEX', 'module': 'NCLEX_Comprehensive_Master_Categorized'}
+LAB_VALUES = {'category': 'Lab_Values', 'module': 'NCLEX_Lab_Values_Fill_In_The_Blank'}
+
+
+def grade(client, bank, answers):
+    return client.post('/api/grade', json={**bank, 'answers': answers})
+
+
+def test_option_masks_accept_letters_and_indices():
+    assert index.option_mask(['A', 'c']) == 0b101
+    assert index.option_mask([0, 2]) == 0b101
+    assert index.option_mask('B') == 0b10
+    assert index.option_mask(['AB']) is None
+    assert index.option_mask(True) is None
+
+
+def test_select_questions_need_the_exact_option_set(client):
+    questions = index.questions_of(index.load_module_json(index.NCLEX_MASTER_PATH))
+    single = next(q for q in questions if q['type'] == 'single_select')
+    multi = next(q for q in questions if q['type'] == 'multi_select')
+    wrong = 'A' if single['correct'] != ['A'] else 'B'
+    payload = grade(client, NCLEX, {
+        single['id']: single['correct'],
+        multi['id']: list(reversed(multi['correct'])),
+        'Q-missing': ['A'],
+    }).get_json()
+    assert [r['correct'] for r in payload['results']] == [True, True]
+    assert payload['ungraded'] == ['Q-missing']
+
+    partial = grade(client, NCLEX, {multi['id']: multi['correct'][:-1], single['id']: [wrong]}).get_json()
+    assert [r['correct'] for r in partial['results']] == [False, False]
+    assert partial['score'] == {'correct': 0, 'total': 2, 'percent': 0.0}
+
+
+def test_blanks_are_graded_per_blank_ignoring_case_and_spacing(client):
+    payload = grade(client, LAB_VALUES, {'LV001': [' 135 ', '145'], 'LV021': '200'}).get_json()
+    assert payload['results'] == [
+        {'id': 'LV001', 'correct': True, 'blanks': [True, True]},
+        {'id': 'LV021', 'correct': True, 'blanks': [True]},
+    ]
+    wrong = grade(client, LAB_VALUES, {'LV001': ['135', '150'], 'LV021': []}).get_json()
+    assert wrong['results'][0]['blanks'] == [True, False]
+    assert wrong['results'][1] == {'id': 'LV021', 'correct': False, 'blanks': [False]}
+    assert wrong['by_category'] == {'Laboratory Values': {'correct': 0, 'total': 2}}
+
+
+def test_a_full_length_exam_grades_quickly(client):
+    questions = index.questions_of(index.load_module_json(index.NCLEX_MASTER_PATH))[:150]
+    answers = {q['id']: q['correct'] for q in questions}
+    keys = index.get_answer_key_index(index.NCLEX_MASTER_PATH)
+    started = time.perf_counter()
+    graded = [keys.grade(question_id, response) for question_id, response in answers.items()]
+    assert time.perf_counter() - started < 0.01
+    assert sum(correct for correct, _ in graded) == sum(1 for q in questions if q.get('correct'))
+    payload = grade(client, NCLEX, answers).get_json()
+    assert payload['score']['total'] == len(graded)
+
+
+def test_invalid_grade_requests_are_rejected(client):
+    assert grade(client, {'category': 'NCLEX', 'module': 'nope'}, {}).status_code == 404
+    assert grade(client, NCLEX, ['Q1']).status_code == 400
+    assert client.post('/api/grade', data='x').status_code == 400
@@ -0,0 +1,141 @@
+import gzip
+import json
+
+import pytest
+
+from api import index
+
+QUIZ_URL = '/quiz/Pharmacology/Cardiovascular_Pharm'
+
+
+@pytest.fixture
+def compressed_bodies(monkeypatch):
+    cache = index.RenderCache(8 * 1024 * 1024)
+    monkeypatch.setattr(index, 'COMPRESSED_BODIES', cache)
+    return cache
+
+
+def test_json_api_revalidates_with_304(client):
+    first = client.get('/api/nclex/category-stats')
+    etag = first.headers['ETag']
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+
+    revalidated = client.get('/api/nclex/category-stats', headers={'If-None-Match': etag})
+    assert revalidated.status_code == 304 and revalidated.get_data() == b''
+
+
+def test_quiz_page_skips_rendering_when_unchanged(client, monkeypatch):
+    etag = client.get(QUIZ_URL).headers['ETag']
+    monkeypatch.setattr(index, 'render_template', lambda *a, **k: pytest.fail('re-rendered'))
+    assert client.get(QUIZ_URL, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_etag_depends_on_url_and_bank_content(client, monkeypatch):
+    etag = client.get(QUIZ_URL).headers['ETag']
+    assert client.get(QUIZ_URL + '?autostart=true').headers['ETag'] != etag
+    monkeypatch.setattr(index, 'file_digest', lambda path: 'edited')
+    assert client.get(QUIZ_URL).headers['ETag'] != etag
+
+
+def test_randomly_sampled_quiz_is_not_cached(client):
+    assert 'ETag' not in client.get('/quiz/NCLEX/NCLEX_Comprehensive_Master_Categorized?quiz_length=10').headers
+    seeded = client.get('/quiz/NCLEX/NCLEX_Comprehensive_Master_Categorized?quiz_length=10&seed=7')
+    assert 'ETag' in seeded.headers
+
+
+def test_gzip_negotiation_caches_the_compressed_body(client, compressed_bodies):
+    plain = client.get('/api/categories')
+    response = client.get('/api/categories', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.get_data())) == plain.get_json()
+    assert response.headers['ETag'] == plain.headers['ETag'][:-1] + '-gzip"'
+
+    client.get('/api/categories', headers={'Accept-Encoding': 'gzip'})
+    assert compressed_bodies.stats()['hits'] == 1
+
+    revalidated = client.get('/api/categories', headers={
+        'Accept-Encoding': 'gzip', 'If-None-Match': response.headers['ETag']})
+    assert revalidated.status_code == 304
+    assert revalidated.headers['ETag'] == response.headers['ETag']
+
+
+def test_small_responses_are_not_compressed(client):
+    small = client.get('/api/ccrn/count', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in small.headers
+
+
+@pytest.fixture
+def rendered_pages(monkeypatch):
+    # The routes bind the cache when they are decorated, so reset it in place.
+    monkeypatch.delenv(index.PAGE_CACHE_ENV_VAR, raising=False)
+    index.RENDERED_PAGES.clear()
+    yield index.RENDERED_PAGES
+    index.RENDERED_PAGES.clear()
+
+
+@pytest.mark.parametrize('url', [
+    '/', '/nurse-study-hub', '/category/NCLEX', '/category/Adult_Health',
+    '/category/Nursing_Certifications/CCRN', '/category/Nursing_Certifications/CFRN',
+])
+def test_landing_pages_are_served_from_the_rendered_page_cache(client, rendered_pages, monkeypatch, url):
+    first = client.get(url)
+    assert first.status_code == 200 and first.headers['Cache-Control'] == 'no-cache'
+    monkeypatch.setattr(index, 'render_template', lambda *a, **k: pytest.fail('re-rendered'))
+    second = client.get(url)
+    assert second.get_data() == first.get_data()
+    assert second.headers['ETag'] == first.headers['ETag']
+    assert rendered_pages.stats()['hits'] == 1
+
+
+def test_rendered_page_cache_is_invalidated_by_bank_changes(client, rendered_pages, monkeypatch):
+    client.get('/category/NCLEX')
+    monkeypatch.setattr(index, 'file_digest', lambda path: 'edited')
+    client.get('/category/NCLEX')
+    assert rendered_pages.stats()['hits'] == 0
+
+
+def test_rendered_page_cache_can_be_bypassed(client, rendered_pages, monkeypatch):
+    monkeypatch.setenv(index.PAGE_CACHE_ENV_VAR, '0')
+    client.get('/nurse-study-hub')
+    client.get('/nurse-study-hub')
+    assert rendered_pages.stats()['hits'] == 0 and rendered_pages.stats()['misses'] == 0
+
+
+def test_unknown_category_redirect_is_not_cached(client, rendered_pages):
+    assert client.get('/category/Not_A_Category').status_code == 302
+    assert rendered_pages.stats()['hits'] == 0
+
+
+def test_cfrn_etags_ignore_unrelated_bank_edits(client, monkeypatch):
+    url = '/api/cfrn/count'
+    etag = client.get(url).headers['ETag']
+    digest = index.file_digest
+    monkeypatch.setattr(index, 'file_digest',
+                        lambda path: 'edited' if path == index.ADULT_HEALTH_PATH else digest(path))
+    monkeypatch.setattr(index, 'all_bank_paths', lambda **_: pytest.fail('hashed every bank'))
+    assert client.get(url).headers['ETag'] == etag
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
+
+
+def test_rendered_page_cache_restores_the_view_headers(rendered_pages):
+    calls = []
+
+    @index.conditional_get(index.no_bank_paths, body_cache=rendered_pages)
+    def page():
+        calls.append(1)
+        response = index.app.make_response('<p>page</p>')
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.headers['X-Frame-Options'] = 'DENY'
+        return response
+
+    responses = []
+    for _ in range(2):
+        with index.app.test_request_context('/page'):
+            responses.append(page())
+    assert calls == [1] and rendered_pages.stats()['hits'] == 1
+    first, second = responses
+    assert second.get_data() == first.get_data()
+    assert second.mimetype == 'text/html'
+    assert second.headers['X-Frame-Options'] == 'DENY'
+    assert second.headers['Cache-Control'] == 'private, no-cache'
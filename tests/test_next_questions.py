@@ -0,0 +1,65 @@
+import pytest
+
+from api import index
+
+BANK = {'category': 'NCLEX', 'module': 'NCLEX_Comprehensive_Master_Categorized'}
+NOW = 1_800_000_000
+DAY = index.DAY_SECONDS
+
+
+def next_questions(client, **body):
+    return client.post('/api/next-questions', json={**BANK, 'now': NOW, **body})
+
+
+def test_sm2_intervals_grow_with_ease_and_reset_on_a_lapse():
+    state = None
+    intervals = []
+    for grade in (5, 5, 5, 1):
+        state = index.sm2_review(state, grade, 0)
+        intervals.append(state.interval)
+    assert intervals[:3] == [1, 6, 16]
+    assert state.reps == 0 and intervals[3] == 1
+    assert state.ease == pytest.approx(index.SM2_INITIAL_EASE + 0.3 - 0.54)
+
+
+def test_new_questions_are_interleaved_across_categories(client):
+    response = next_questions(client, count=40)
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert [slot['state'] for slot in payload['schedule']] == ['new'] * 40
+    assert len({q['category'] for q in payload['questions']}) > 5
+    assert payload['counts']['reviewed'] == 0 and payload['counts']['total'] == payload['counts']['new']
+
+
+def test_overdue_cards_come_first_most_overdue_first(client):
+    ids = [slot['id'] for slot in next_questions(client, count=4).get_json()['schedule']]
+    history = [
+        [ids[0], 5, NOW - 3 * DAY],    # due after 1 day: 2 intervals overdue
+        [ids[1], True, NOW - 2 * DAY],  # due after 1 day: 1 interval overdue
+        [ids[2], 4, NOW - 1000],        # not due yet
+    ]
+    payload = next_questions(client, history=history, count=4, fields='id').get_json()
+    assert [(slot['id'], slot['state']) for slot in payload['schedule'][:2]] == [(ids[0], 'due'), (ids[1], 'due')]
+    assert [slot['state'] for slot in payload['schedule'][2:]] == ['new', 'new']
+    assert ids[2] not in {slot['id'] for slot in payload['schedule']}
+    assert payload['counts'] == {'due': 2, 'reviewed': 3, 'new': payload['counts']['total'] - 3,
+                                 'total': payload['counts']['total']}
+    assert payload['questions'][0] == {'id': ids[0]}
+
+
+def test_cards_not_yet_due_fill_the_tail_once_the_bank_is_exhausted(client):
+    bank = {'category': 'Pharmacology', 'module': 'Cardiovascular_Pharm'}
+    size = index.get_bank_index(index.resolve_module_path(**bank)).size
+    history = [[f'CARD_{n}', 4, NOW - n] for n in range(1, size + 1)]
+    payload = client.post('/api/next-questions', json={**bank, 'now': NOW, 'history': history, 'count': 2}).get_json()
+    # Every card is one day out; the oldest review is due soonest.
+    assert [(slot['id'], slot['state']) for slot in payload['schedule']] == [
+        (f'CARD_{size}', 'ahead'), (f'CARD_{size - 1}', 'ahead')]
+
+
+def test_invalid_requests_are_rejected(client):
+    assert client.post('/api/next-questions', json={'category': 'NCLEX', 'module': 'nope'}).status_code == 404
+    assert next_questions(client, history=[['Q1', 9, NOW]]).status_code == 400
+    assert next_questions(client, history={'Q1': 4}).status_code == 400
+    assert next_questions(client, count=0).status_code == 400
+    assert client.post('/api/next-questions', data='not json').status_code == 400
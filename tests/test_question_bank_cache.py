@@ -0,0 +1,106 @@
+import gc
+import json
+import os
+import weakref
+
+from api import index
+
+MODULES = index.MODULES_DIR
+
+
+def test_store_parses_each_file_once_and_shares_the_object(tmp_path):
+    store = index.QuestionBankStore()
+    path = tmp_path / 'bank.json'
+    path.write_text(json.dumps({'questions': [{'id': 'Q1'}]}), encoding='utf-8')
+
+    first = store.load(path)
+    second = store.load(path)
+
+    assert first is second
+    assert store.stats() == {'entries': 1, 'hits': 1, 'misses': 1, 'compiled': 0,
+                             'shared_questions': 0, 'shared_copies': 0}
+
+
+def test_store_revalidates_when_the_file_changes(tmp_path):
+    store = index.QuestionBankStore()
+    path = tmp_path / 'bank.json'
+    path.write_text(json.dumps({'questions': [{'id': 'Q1'}]}), encoding='utf-8')
+    store.load(path)
+
+    path.write_text(json.dumps({'questions': [{'id': 'Q1'}, {'id': 'Q2'}]}), encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    assert len(store.load(path)['questions']) == 2
+    assert store.stats()['misses'] == 2
+
+
+def test_loaders_share_the_cached_bank():
+    path = MODULES / 'Nursing_Certifications' / 'CCRN_Comprehensive.json'
+    assert index.load_ccrn_comprehensive_questions() is index.load_ccrn_comprehensive_questions()
+    assert index.load_module_json(path) is index.load_ccrn_comprehensive_questions()
+
+
+def test_cache_stats_endpoint(client):
+    client.get('/api/ccrn/count')
+    response = client.get('/api/cache-stats')
+    assert response.status_code == 200
+    stats = response.get_json()['question_banks']
+    assert stats['entries'] >= 1
+    assert stats['hits'] + stats['misses'] >= 1
+
+
+def test_bank_index_counts_match_a_linear_scan():
+    path = MODULES / 'NCLEX' / 'NCLEX_Comprehensive_Master_Categorized.json'
+    questions = index.load_module_json(path)['questions']
+    bank_index = index.get_bank_index(path)
+
+    for cat in index.NCLEX_CATEGORIES:
+        expected = [q for q in questions if q.get('category') == cat]
+        assert bank_index.count(cat) == len(expected)
+        assert bank_index.questions_in(cat) == expected
+    assert bank_index is index.get_bank_index(path)
+
+
+def test_cfrn_domain_totals_match_domain_files():
+    domain_totals, grand_total = index.get_cfrn_domain_totals()
+    for domain in index.CFRN_DOMAINS:
+        assert domain_totals[domain] == len(index.load_cfrn_domain_questions(domain))
+    assert grand_total == sum(domain_totals.values())
+
+
+def write_compiled_bank(tmp_path, monkeypatch, questions):
+    monkeypatch.setattr(index, 'MODULES_DIR', tmp_path)
+    monkeypatch.setattr(index, 'COMPILED_DIR', tmp_path / '.compiled')
+    source = tmp_path / 'Bank' / 'Quiz.json'
+    source.parent.mkdir()
+    source.write_text(json.dumps({'questions': questions}), encoding='utf-8')
+    artifact = index.compiled_bank_path(source)
+    artifact.parent.mkdir(parents=True)
+    artifact.write_bytes(index.encode_compiled_bank(source.read_bytes()))
+    return source
+
+
+def test_replaced_entries_stay_readable_until_released(tmp_path, monkeypatch):
+    source = write_compiled_bank(tmp_path, monkeypatch, [{'id': 'Q1', 'category': 'A'}])
+    store = index.QuestionBankStore()
+    first = store.compiled(source)
+    mapping = weakref.ref(first._buffer)
+    stat = source.stat()
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    assert store.compiled(source) is not first
+    assert first.question(0)['id'] == 'Q1'
+
+    del first
+    gc.collect()
+    assert mapping() is None
+
+
+def test_index_keeps_a_bounded_number_of_decoded_questions(tmp_path, monkeypatch):
+    questions = [{'id': f'Q{i}', 'category': 'A'} for i in range(1, 11)]
+    source = write_compiled_bank(tmp_path, monkeypatch, questions)
+    monkeypatch.setattr(index, 'QUESTION_INDEX_DECODED_LIMIT', 3)
+    monkeypatch.setattr(index, 'QUESTION_BANKS', index.QuestionBankStore())
+    bank = index.QuestionBankIndex.build(source)
+    assert [q['id'] for q in bank.questions_in('A')] == [q['id'] for q in questions]
+    assert list(bank._decoded) == [7, 8, 9]
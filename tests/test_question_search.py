@@ -0,0 +1,66 @@
+import pytest
+
+from api import index
+
+BANKS = [
+    ('Demo', 'Cardiac', [
+        {'id': 'c1', 'stem': 'Which finding suggests heart failure?', 'options': ['Crackles', 'Bradycardia'],
+         'rationale': 'Crackles indicate pulmonary congestion.', 'category': 'Physiological Adaptation'},
+        {'id': 'c2', 'stem': 'Teach a client taking digoxin.', 'options': ['Check apical pulse', 'Eat bananas'],
+         'rationale': 'Hold digoxin if the heart rate is low.', 'category': 'Pharmacological Therapies'},
+    ]),
+    ('Demo', 'Renal', [
+        {'id': 'r1', 'stem': 'Priority for hypokalemia?', 'options': ['Cardiac monitoring', 'Fluids'],
+         'rationale': 'Low potassium causes dysrhythmias.', 'category': 'Reduction of Risk Potential',
+         'book': 'Med-Surg'},
+    ]),
+]
+
+
+@pytest.fixture(scope='module')
+def search_index():
+    return index.QuestionSearchIndex.build(BANKS)
+
+
+def ids(hits):
+    return [BANKS_BY_DOC[doc[:3]] for _, doc in hits]
+
+
+BANKS_BY_DOC = {
+    (category, module, position): question['id']
+    for category, module, questions in BANKS
+    for position, question in enumerate(questions)
+}
+
+
+def test_within_one_edit():
+    assert index.within_one_edit('digoxin', 'digoxni')
+    assert index.within_one_edit('hypokalemia', 'hypokalmia')
+    assert index.within_one_edit('heart', 'hearts')
+    assert not index.within_one_edit('heart', 'hurts')
+
+
+def test_bm25_ranks_stem_matches_first(search_index):
+    total, hits = search_index.search('heart', prefix=False)
+    assert total == 2
+    assert ids(hits) == ['c1', 'c2']
+
+
+def test_prefix_and_typo_queries(search_index):
+    assert ids(search_index.search('digox')[1]) == ['c2']
+    assert ids(search_index.search('hypokalmia', prefix=False)[1]) == ['r1']
+
+
+def test_filters_limit_and_offset(search_index):
+    total, hits = search_index.search('crackles cardiac', accept=lambda doc: doc[1] == 'Renal')
+    assert total == 1 and ids(hits) == ['r1']
+    _, page = search_index.search('heart', limit=1, offset=1, prefix=False)
+    assert ids(page) == ['c2']
+
+
+def test_search_endpoint(client):
+    assert client.get('/api/search').status_code == 400
+    body = client.get('/api/search', query_string={'q': 'hypokalemia', 'category': 'NCLEX', 'limit': 5}).get_json()
+    assert 0 < len(body['results']) <= 5 <= body['total']
+    assert all(result['category'] == 'NCLEX' for result in body['results'])
+    assert 'hypokalemia' in (body['results'][0]['stem'] or '').lower()
@@ -0,0 +1,44 @@
+import json
+
+CCRN = {'category': 'Nursing_Certifications', 'module': 'CCRN_Comprehensive'}
+
+
+def test_questions_are_paged_with_a_cursor(client):
+    first = client.get('/api/questions', query_string={**CCRN, 'limit': 100}).get_json()
+    assert first['total'] == 450
+    assert len(first['questions']) == 100
+    assert first['next_cursor'] == '100'
+
+    last = client.get('/api/questions', query_string={**CCRN, 'limit': 100, 'cursor': 400}).get_json()
+    assert len(last['questions']) == 50
+    assert last['next_cursor'] is None
+
+
+def test_projection_omits_rationale_and_ids_fetch_it_back(client):
+    page = client.get('/api/questions', query_string={**CCRN, 'limit': 2, 'omit': 'rationale'}).get_json()
+    assert all('rationale' not in q for q in page['questions'])
+
+    ids = ','.join(str(q['id']) for q in page['questions'])
+    answers = client.get('/api/questions', query_string={**CCRN, 'ids': ids, 'fields': 'rationale'}).get_json()
+    assert [q['id'] for q in answers['questions']] == [q['id'] for q in page['questions']]
+    assert all(set(q) == {'id', 'rationale'} for q in answers['questions'])
+
+
+def test_ndjson_streams_every_question_from_the_cursor(client):
+    response = client.get('/api/questions', query_string={**CCRN, 'format': 'ndjson', 'cursor': 440})
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(lines) == 10
+
+
+def test_unknown_modules_and_bad_cursors_are_rejected(client):
+    assert client.get('/api/questions', query_string={'category': 'NCLEX', 'module': '../api/index'}).status_code == 404
+    assert client.get('/api/questions', query_string={**CCRN, 'cursor': 'abc'}).status_code == 400
+
+
+def test_query_parameters_are_not_decoded_twice(client, monkeypatch):
+    from api import index
+    seen = []
+    monkeypatch.setattr(index, 'resolve_module_path', lambda category, module: seen.append((category, module)))
+    client.get('/api/questions', query_string={'category': 'NCLEX', 'module': 'Dose%2541'})
+    assert seen == [('NCLEX', 'Dose%2541')]
@@ -0,0 +1,81 @@
+import json
+import re
+
+from api import index
+
+
+def embedded_quiz_data(response):
+    html = response.get_data(as_text=True)
+    match = re.search(r'var rawQuizData = (.*?);\n', html)
+    return json.loads(match.group(1))
+
+
+def test_allocate_quotas_respects_weights_and_group_sizes():
+    quotas = index.allocate_quotas({'a': 50, 'b': 50, 'c': 2}, 20, {'a': 0.5, 'b': 0.25, 'c': 0.25})
+    assert sum(quotas.values()) == 20
+    assert quotas['c'] == 2
+    assert quotas['a'] >= quotas['b']
+
+
+def test_sample_questions_is_deterministic_per_seed():
+    questions = [{'id': f'Q{i}', 'category': f'cat{i % 4}'} for i in range(100)]
+    first = index.sample_questions(questions, 30, seed=7)
+    assert first == index.sample_questions(questions, 30, seed=7)
+    assert len({q['id'] for q in first}) == 30
+    counts = {}
+    for q in first:
+        counts[q['category']] = counts.get(q['category'], 0) + 1
+    assert set(counts.values()) == {7, 8}
+
+
+def test_quiz_route_ships_a_pool_sized_to_quiz_length(client):
+    url = '/category/Adult_Health/module/comprehensive'
+    response = client.get(url, query_string={'quiz_length': 10, 'autostart': 'true', 'seed': 42})
+    data = embedded_quiz_data(response)
+    assert len(data['questions']) == 10 * index.QUIZ_SAMPLE_POOL_FACTOR
+    assert data['total_questions'] > len(data['questions'])
+
+    again = embedded_quiz_data(client.get(url, query_string={'quiz_length': 10, 'seed': 42}))
+    assert [q['id'] for q in again['questions']] == [q['id'] for q in data['questions']]
+
+
+def test_full_length_and_filtered_quizzes_keep_the_whole_bank(client):
+    url = '/quiz/Nursing_Certifications/CCRN_Comprehensive'
+    full = embedded_quiz_data(client.get(url, query_string={'quiz_length': 'full'}))
+    filtered = embedded_quiz_data(client.get(url, query_string={'quiz_length': 10, 'filter': 'missed'}))
+    assert len(full['questions']) == len(filtered['questions']) == 450
+
+
+def test_nclex_exam_matches_the_test_plan_and_is_deterministic_per_seed(client):
+    response = client.get('/category/NCLEX/exam?quiz_length=100&seed=11')
+    assert response.status_code == 200
+    questions = embedded_quiz_data(response)['questions']
+    assert len({q['id'] for q in questions}) == 100
+    counts = {}
+    for q in questions:
+        counts[q['category']] = counts.get(q['category'], 0) + 1
+    assert counts == {cat: round(weight * 100) for cat, weight in index.NCLEX_CATEGORIES.items()}
+
+    again = embedded_quiz_data(client.get('/category/NCLEX/exam?quiz_length=100&seed=11'))['questions']
+    assert again == questions
+    other = embedded_quiz_data(client.get('/category/NCLEX/exam?quiz_length=100&seed=12'))['questions']
+    assert [q['id'] for q in other] != [q['id'] for q in questions]
+
+
+def test_unseeded_nclex_exam_reports_its_seed(client):
+    response = client.get('/category/NCLEX/exam')
+    assert 'ETag' not in response.headers
+    html = response.get_data(as_text=True)
+    seed = int(re.search(r'seed: (\d+)', html).group(1))
+    assert len(embedded_quiz_data(response)['questions']) == index.NCLEX_EXAM_DEFAULT_LENGTH
+    reproduced = client.get(f'/category/NCLEX/exam?seed={seed}')
+    assert embedded_quiz_data(reproduced)['questions'] == embedded_quiz_data(response)['questions']
+
+
+def test_nclex_landing_page_links_to_the_exam(client):
+    html = client.get('/category/NCLEX').get_data(as_text=True)
+    href = re.search(r'id="startExamLink" href="([^"]+)"', html).group(1).replace('&amp;', '&')
+    assert href == f'/category/NCLEX/exam?quiz_length={index.NCLEX_EXAM_DEFAULT_LENGTH}&autostart=true'
+    response = client.get(href)
+    assert response.status_code == 200
+    assert len(embedded_quiz_data(response)['questions']) == index.NCLEX_EXAM_DEFAULT_LENGTH
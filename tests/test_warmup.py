@@ -0,0 +1,64 @@
+import pytest
+
+from api import index
+
+
+@pytest.fixture
+def cold_start(monkeypatch):
+    state = {'import_seconds': 0.5, 'first_request': None, 'warmup': None}
+    monkeypatch.setattr(index, 'COLD_START', state)
+    return state
+
+
+def test_parse_warmup_steps():
+    assert index.parse_warmup_steps('1') == ['banks', 'templates', 'pymupdf', 'search']
+    assert index.parse_warmup_steps('templates, pymupdf') == ['templates', 'pymupdf']
+    with pytest.raises(ValueError):
+        index.parse_warmup_steps('banks,nope')
+
+
+def test_warm_up_runs_each_step_once(cold_start, monkeypatch):
+    calls = []
+    monkeypatch.setitem(index.WARMUP_STEPS, 'templates', lambda: calls.append('templates'))
+    first = index.warm_up(['templates'])
+    index.warm_up(['templates'])
+    assert calls == ['templates']
+    assert first['steps']['templates']['ok'] is True
+    index.warm_up(['templates'], force=True)
+    assert calls == ['templates', 'templates']
+
+
+def test_failed_step_is_reported_and_retried(cold_start, monkeypatch):
+    def broken():
+        raise RuntimeError('boom')
+    monkeypatch.setitem(index.WARMUP_STEPS, 'pymupdf', broken)
+    result = index.warm_up(['pymupdf'])
+    assert result['steps']['pymupdf'] == {'ok': False, 'error': 'boom', 'seconds': result['steps']['pymupdf']['seconds']}
+    monkeypatch.setitem(index.WARMUP_STEPS, 'pymupdf', lambda: None)
+    assert index.warm_up(['pymupdf'])['steps']['pymupdf']['ok'] is True
+
+
+def test_warmup_endpoint_reports_cold_start_timing(client, cold_start):
+    response = client.get('/api/warmup', query_string={'steps': 'templates'})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['import_seconds'] == 0.5
+    assert body['warmup']['steps']['templates']['ok'] is True
+    assert cold_start['first_request']['path'] == '/api/warmup'
+    assert client.get('/api/warmup', query_string={'steps': 'bogus'}).status_code == 400
+
+
+def test_bank_warmup_maps_artifacts_without_decoding_records(monkeypatch):
+    decoded = []
+    monkeypatch.setattr(index.CompiledQuestionBank, 'question',
+                        lambda self, position: decoded.append(position))
+    monkeypatch.setattr(index.CompiledQuestionBank, 'to_data', lambda self: decoded.append('all'))
+    index.QUESTION_BANKS.clear()
+    try:
+        index.warm_question_banks()
+        for path in index.WARMUP_BANK_PATHS:
+            assert index.QUESTION_BANKS.compiled(path) is not None
+            assert index.get_bank_index(path)._questions is None
+        assert decoded == []
+    finally:
+        index.QUESTION_BANKS.clear()